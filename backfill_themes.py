@@ -0,0 +1,162 @@
+#!/usr/bin/env python
+"""
+Backfills themes for feedback submissions that have none.
+
+A submission can end up without themes if extraction failed on every model and
+its job was dead-lettered, or if it predates the job queue. This tool finds
+those submissions and re-extracts their themes across a pool of worker
+processes, packing several submissions into each batched prompt:
+
+    python -m backfill_themes --concurrency 4 --batch-size 5
+
+Themes are written as each batch completes, so an interrupted run can simply
+be restarted: submissions that already have themes, or whose extraction found
+none, are skipped. Submissions with an extract_themes job still queued or
+running are left to the worker.
+"""
+
+import argparse
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from html import unescape
+from typing import Dict, List, Optional, Tuple
+
+from models import db
+from utils import logger
+
+# Keeps batched prompts well inside the themes model's context window
+BATCH_MAX_CHARS = 12000
+
+
+def find_unthemed_submissions(process_id: Optional[str] = None, limit: Optional[int] = None) -> List[Dict]:
+    """
+    Returns submissions whose themes were never extracted, oldest first. Submissions
+    extracted with no themes carry themes_extracted_at and are not returned again.
+
+    Args:
+        process_id: Only consider submissions for this feedback process.
+        limit: Maximum number of submissions to return.
+    """
+    where, params = "", []
+    if process_id:
+        where, params = "AND s.process_id=?", [process_id]
+    query = f"""
+        SELECT s.id, s.feedback_text, s.process_id FROM feedback_submission s
+        WHERE s.themes_extracted_at IS NULL
+        AND NOT EXISTS (SELECT 1 FROM feedback_theme t WHERE t.feedback_id=s.id)
+        AND NOT EXISTS (
+            SELECT 1 FROM job j
+            WHERE j.kind='extract_themes' AND j.status IN ('queued', 'running')
+            AND json_extract(j.payload, '$.submission_id')=s.id
+        )
+        {where}
+        ORDER BY s.created_at"""
+    if limit:
+        query += " LIMIT ?"
+        params.append(limit)
+    return db.q(query, params)
+
+
+def make_batches(submissions: List[Dict], batch_size: int) -> List[List[Dict]]:
+    """Groups submissions into batches of at most batch_size items and BATCH_MAX_CHARS characters."""
+    batches, current, current_chars = [], [], 0
+    for submission in submissions:
+        text_chars = len(submission["feedback_text"] or "")
+        if current and (len(current) >= batch_size or current_chars + text_chars > BATCH_MAX_CHARS):
+            batches.append(current)
+            current, current_chars = [], 0
+        current.append(submission)
+        current_chars += text_chars
+    if current:
+        batches.append(current)
+    return batches
+
+
+def extract_batch(batch: List[Dict]) -> List[Tuple[str, Optional[Dict[str, List[str]]]]]:
+    """
+    Extracts themes for one batch. Runs in a pool process and writes no theme rows,
+    so that all theme rows are written by the parent process.
+    """
+    import llm_telemetry
+    from llm_functions import convert_feedback_batch_to_themes
+
+    # Submissions are stored HTML-escaped; the model should see the original text
+    texts = [unescape(submission["feedback_text"] or "") for submission in batch]
+    results = convert_feedback_batch_to_themes(texts, [submission["process_id"] for submission in batch])
+    # Pool processes exit without running atexit handlers, so don't leave telemetry buffered
+    llm_telemetry.flush()
+    return [(submission["id"], themes) for submission, themes in zip(batch, results)]
+
+
+def run_backfill(concurrency: int = 4, batch_size: int = 5, process_id: Optional[str] = None,
+                 limit: Optional[int] = None, dry_run: bool = False) -> Dict[str, int]:
+    """
+    Extracts and stores themes for all unthemed submissions.
+
+    Args:
+        concurrency: Maximum number of batches processed at once.
+        batch_size: Maximum number of submissions per batched prompt (1 disables batching).
+        process_id: Only backfill submissions for this feedback process.
+        limit: Maximum number of submissions to backfill in this run.
+        dry_run: Only report what would be processed.
+
+    Returns:
+        Counts of submissions found, stored and failed.
+    """
+    from worker import store_submission_themes
+
+    submissions = find_unthemed_submissions(process_id, limit)
+    batches = make_batches(submissions, max(batch_size, 1))
+    counts = {"found": len(submissions), "stored": 0, "failed": 0}
+    print(f"Found {len(submissions)} submissions without themes ({len(batches)} batches)")
+    if dry_run or not submissions:
+        return counts
+
+    start = time.perf_counter()
+    # Spawn rather than fork: the parent's open SQLite connection must not be shared with children
+    with ProcessPoolExecutor(max_workers=concurrency, mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = {pool.submit(extract_batch, batch): batch for batch in batches}
+        try:
+            for future in as_completed(futures):
+                try:
+                    results = future.result()
+                except Exception as e:
+                    logger.error(f"Backfill batch failed: {str(e)}")
+                    results = [(submission["id"], None) for submission in futures[future]]
+
+                for submission_id, themes in results:
+                    if themes is None:
+                        counts["failed"] += 1
+                        continue
+                    store_submission_themes(submission_id, themes)
+                    counts["stored"] += 1
+
+                done = counts["stored"] + counts["failed"]
+                elapsed = time.perf_counter() - start
+                print(f"[{done}/{len(submissions)}] stored={counts['stored']} failed={counts['failed']} "
+                      f"elapsed={elapsed:.1f}s")
+        except KeyboardInterrupt:
+            print("Interrupted; finishing in-flight batches. Re-run to resume.")
+            pool.shutdown(wait=True, cancel_futures=True)
+            raise
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill themes for feedback submissions that have none.")
+    parser.add_argument("--concurrency", type=int, default=4, help="Maximum batches processed in parallel")
+    parser.add_argument("--batch-size", type=int, default=5, help="Maximum submissions per batched prompt (1 disables batching)")
+    parser.add_argument("--process-id", help="Only backfill submissions for this feedback process")
+    parser.add_argument("--limit", type=int, help="Maximum number of submissions to backfill")
+    parser.add_argument("--dry-run", action="store_true", help="Only report how many submissions need themes")
+    args = parser.parse_args()
+
+    counts = run_backfill(args.concurrency, args.batch_size, args.process_id, args.limit, args.dry_run)
+    print(f"Done: {counts['stored']} stored, {counts['failed']} failed, {counts['found']} found")
+    if counts["failed"]:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+"""
+Compares the "strict" (extract, then check anonymity) and "single" (one
+combined call) theme pipeline modes on the same corpus, reporting latency
+percentiles and token usage per submission:
+
+    python -m benchmarks.compare_theme_pipelines
+    python -m benchmarks.compare_theme_pipelines --corpus my_feedback.json --repeat 3
+
+The corpus is a JSON list of feedback texts. Calls go to the configured
+OPENROUTER_BASE_URL, so point it at benchmarks.llm_stub_server for offline,
+reproducible runs.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import time
+
+from llm_functions import convert_feedback_text_to_themes, track_llm_usage
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(__file__), "feedback_corpus.json")
+
+def percentile(values: list[float], pct: float) -> float:
+    values = sorted(values)
+    index = max(0, min(len(values) - 1, round(pct / 100 * len(values)) - 1))
+    return values[index]
+
+def run_mode(mode: str, corpus: list[str], repeat: int) -> dict:
+    latencies, calls, input_tokens, output_tokens, failures = [], [], [], [], 0
+    for _ in range(repeat):
+        for text in corpus:
+            with track_llm_usage() as usage:
+                start = time.perf_counter()
+                result = convert_feedback_text_to_themes(text, mode=mode)
+                latencies.append((time.perf_counter() - start) * 1000)
+            failures += result is None
+            calls.append(usage["calls"])
+            input_tokens.append(usage["input_tokens"])
+            output_tokens.append(usage["output_tokens"])
+    return {
+        "mode": mode,
+        "submissions": len(latencies),
+        "failures": failures,
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "calls_per_submission": statistics.mean(calls),
+        "input_tokens_per_submission": statistics.mean(input_tokens),
+        "output_tokens_per_submission": statistics.mean(output_tokens),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS, help="JSON list of feedback texts")
+    parser.add_argument("--repeat", type=int, default=1, help="Number of passes over the corpus per mode")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    with open(args.corpus) as f:
+        corpus = json.load(f)
+
+    results = [run_mode(mode, corpus, args.repeat) for mode in ("strict", "single")]
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'mode':<8}{'n':>5}{'fail':>6}{'p50 ms':>10}{'p95 ms':>10}{'calls':>7}{'in tok':>9}{'out tok':>9}")
+    for r in results:
+        print(f"{r['mode']:<8}{r['submissions']:>5}{r['failures']:>6}{r['p50_ms']:>10.0f}{r['p95_ms']:>10.0f}"
+              f"{r['calls_per_submission']:>7.2f}{r['input_tokens_per_submission']:>9.0f}{r['output_tokens_per_submission']:>9.0f}")
+
+if __name__ == "__main__":
+    main()
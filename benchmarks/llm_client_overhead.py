@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+"""
+Measures per-call client overhead of a fresh ChatOpenAI per call versus the
+pooled registry in llm_functions.get_llm.
+
+Runs against a minimal OpenAI-compatible stub on localhost, so the numbers
+reflect client construction and connection setup rather than model latency:
+
+    python -m benchmarks.llm_client_overhead --calls 200
+"""
+
+import argparse
+import json
+import os
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+COMPLETION = json.dumps({
+    "id": "chatcmpl-bench",
+    "object": "chat.completion",
+    "created": 0,
+    "model": "stub",
+    "choices": [{"index": 0, "finish_reason": "stop",
+                 "message": {"role": "assistant", "content": "ok"}}],
+    "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+}).encode()
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so pooled clients can reuse connections
+    connections = set()
+
+    def do_POST(self):
+        self.connections.add(self.client_address)
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(COMPLETION)))
+        self.end_headers()
+        self.wfile.write(COMPLETION)
+
+    def log_message(self, *args):
+        pass
+
+def start_stub() -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def time_calls(get_client, calls: int) -> list[float]:
+    timings = []
+    messages = [("human", "ping")]
+    for _ in range(calls):
+        start = time.perf_counter()
+        get_client().invoke(messages)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+def report(label: str, timings: list[float], connections: int):
+    timings = sorted(timings)
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    print(f"{label:<10} mean {statistics.mean(timings):7.2f} ms   p50 {statistics.median(timings):7.2f} ms   "
+          f"p95 {p95:7.2f} ms   connections {connections}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=200)
+    args = parser.parse_args()
+
+    server = start_stub()
+    os.environ["OPENROUTER_BASE_URL"] = f"http://127.0.0.1:{server.server_port}/v1"
+    os.environ.setdefault("OPENROUTER_API_KEY", "bench")
+
+    from langchain_openai import ChatOpenAI
+    import llm_functions
+
+    def fresh_client():
+        # What create_feedback_llm used to do on every call
+        return ChatOpenAI(model="stub", api_key="bench", base_url=os.environ["OPENROUTER_BASE_URL"],
+                          temperature=1, max_tokens=8192, model_kwargs={"top_p": 0.95})
+
+    def pooled_client():
+        return llm_functions.get_llm("stub")
+
+    # Warm up imports and the stub before measuring
+    time_calls(fresh_client, 5)
+    time_calls(pooled_client, 5)
+
+    for label, get_client in [("fresh", fresh_client), ("pooled", pooled_client)]:
+        StubHandler.connections.clear()
+        report(label, time_calls(get_client, args.calls), len(StubHandler.connections))
+
+    server.shutdown()
+
+if __name__ == "__main__":
+    main()
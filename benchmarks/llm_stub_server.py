@@ -0,0 +1,335 @@
+#!/usr/bin/env python
+"""
+Local OpenAI-compatible chat-completions server for load tests and benchmarks
+without network access or OpenRouter credentials.
+
+Structured prompts get a JSON instance generated from the output schema in
+the request (the format instructions in the prompt, or a json_schema
+response_format), so theme extraction and anonymity checks parse normally.
+Everything else gets a markdown feedback report. Latency, error, stall,
+malformed-output and sloppy-output rates come from a named profile and can be
+overridden:
+
+    python -m benchmarks.llm_stub_server --profile realistic --port 8765
+    python -m benchmarks.llm_stub_server --profile fast --error-rate 0.2 --model-error-rate google/gemini-2.0-flash-001=1
+
+Then point the app (or a benchmark) at it:
+
+    OPENROUTER_BASE_URL=http://127.0.0.1:8765/v1 python main.py
+
+GET /stats returns request counts by model and outcome. Runs with the same
+--seed produce the same sequence of outcomes for the same request sequence.
+"""
+
+import argparse
+import json
+import math
+import random
+import re
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field, replace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+
+@dataclass
+class StubProfile:
+    latency_ms: float = 50           # median time to first byte
+    latency_sigma: float = 0.0       # lognormal spread of the latency; 0 makes it fixed
+    chunk_ms: float = 5              # delay between streamed chunks
+    error_rate: float = 0.0          # share of requests answered with a 500 or 429
+    malformed_rate: float = 0.0      # share of structured responses that are not valid JSON
+    sloppy_rate: float = 0.0         # share of prompt-formatted responses with prose, trailing commas or odd casing
+    stall_rate: float = 0.0          # share of requests that hang for stall_seconds (deadline testing)
+    stall_seconds: float = 300
+    model_error_rates: Dict[str, float] = field(default_factory=dict)  # per-model error_rate overrides
+
+PROFILES = {
+    "instant": StubProfile(latency_ms=0, chunk_ms=0),
+    "fast": StubProfile(latency_ms=50, latency_sigma=0.2),
+    "realistic": StubProfile(latency_ms=1500, latency_sigma=0.5, chunk_ms=20, error_rate=0.01, malformed_rate=0.02,
+                             sloppy_rate=0.05),
+    "degraded": StubProfile(latency_ms=4000, latency_sigma=0.8, chunk_ms=40, error_rate=0.2, malformed_rate=0.1,
+                            sloppy_rate=0.15, stall_rate=0.05),
+}
+
+POSITIVE = [
+    "You communicate clearly in meetings", "You give thorough and constructive code reviews",
+    "You support junior colleagues generously", "You stay calm under pressure",
+    "You take ownership of difficult problems", "Your documentation is clear and complete",
+]
+NEGATIVE = [
+    "You could delegate more work to the team", "Your estimates are often too optimistic",
+    "You sometimes interrupt others in discussions", "You could prioritise your tasks more carefully",
+]
+NEUTRAL = [
+    "You prefer written communication to meetings", "You focus mostly on backend work",
+    "You are relatively new to the team",
+]
+
+REPORT = """# Feedback Report
+
+## Executive Summary
+Respondents consistently describe you as a clear communicator and a dependable colleague. The main
+development themes are delegation and the accuracy of your estimates.
+
+## Strengths
+- **Communication**: {positive}
+- **Collaboration**: {positive2}
+
+## Areas for Development
+- **Delegation**: {negative}
+- **Planning**: {negative2}
+
+## Action Plan
+1. Identify one recurring task to hand over this month.
+2. Add a buffer to estimates and review them against actuals.
+"""
+
+class SchemaFaker:
+    """Generates plausible instances of the JSON schemas used by the app's output parsers."""
+
+    def __init__(self, rng: random.Random, items: Optional[int] = None):
+        self.rng = rng
+        self.items = items  # number of entries for top-level "items" arrays (batched prompts)
+
+    def instance(self, schema: Dict, defs: Dict, name: str = "", index: int = 0) -> Any:
+        if "$ref" in schema:
+            return self.instance(defs[schema["$ref"].split("/")[-1]], defs, name, index)
+        if "enum" in schema:
+            return self.rng.choice(schema["enum"])
+        kind = schema.get("type")
+        if kind == "object" or "properties" in schema:
+            sentiment = self.rng.choice(["positive", "negative", "neutral"])
+            theme = self.theme(sentiment)
+            obj = {}
+            for key, sub in schema.get("properties", {}).items():
+                if key == "sentiment":
+                    obj[key] = sentiment
+                elif key in ("original", "anonymized"):
+                    obj[key] = theme
+                else:
+                    obj[key] = self.instance(sub, defs, key, index)
+            return obj
+        if kind == "array":
+            if name == "items" and self.items:
+                count = self.items
+            else:
+                count = self.rng.randint(1, 4)
+            return [self.instance(schema.get("items", {}), defs, name, i) for i in range(count)]
+        if kind == "integer":
+            return index + 1 if name == "index" else self.rng.randint(1, 5)
+        if kind == "number":
+            return round(self.rng.uniform(1, 5), 2)
+        if kind == "boolean":
+            return self.rng.random() < 0.1
+        return self.theme(name if name in ("positive", "negative", "neutral") else "positive")
+
+    def theme(self, sentiment: str) -> str:
+        return self.rng.choice({"positive": POSITIVE, "negative": NEGATIVE}.get(sentiment, NEUTRAL))
+
+def make_sloppy(instance: Any) -> str:
+    """
+    Formats JSON the way models often do when only prompted for it: wrapped in prose
+    and a code fence, with trailing commas and capitalised sentiments.
+    """
+    text = json.dumps(instance, indent=2)
+    text = re.sub(r'([^\[{,\s])(\n\s*[\]}])', r'\1,\2', text)
+    text = re.sub(r'"sentiment": "(\w+)"', lambda m: f'"sentiment": "{m.group(1).title()}"', text)
+    return f"Here is the analysis you asked for:\n\n```json\n{text}\n```\n"
+
+def find_schema(body: Dict) -> Optional[Dict]:
+    """Returns the output schema requested via response_format or embedded in the prompt, if any."""
+    response_format = body.get("response_format") or {}
+    if response_format.get("type") == "json_schema":
+        return response_format["json_schema"].get("schema")
+    for message in reversed(body.get("messages", [])):
+        content = message.get("content")
+        if not isinstance(content, str):
+            continue
+        for block in re.findall(r"```(?:json)?\s*(\{.*?\})\s*```", content, re.DOTALL):
+            try:
+                schema = json.loads(block)
+            except ValueError:
+                continue
+            if "properties" in schema:
+                return schema
+    return None
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, profile: StubProfile, seed: Optional[int] = None):
+        super().__init__(address, StubHandler)
+        self.profile = profile
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = Counter()
+
+    def draw(self) -> random.Random:
+        """Returns a per-request RNG seeded from the server RNG, so runs are reproducible."""
+        with self.lock:
+            return random.Random(self.rng.random())
+
+    def count(self, model: str, outcome: str):
+        with self.lock:
+            self.stats[f"{model}:{outcome}"] += 1
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: StubServer
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/stats":
+            with self.server.lock:
+                self.send_json(200, dict(self.server.stats))
+        else:
+            self.send_json(404, {"error": {"message": "Not found"}})
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self.send_json(404, {"error": {"message": "Not found"}})
+            return
+
+        profile, rng = self.server.profile, self.server.draw()
+        model = body.get("model", "stub")
+        error_rate = profile.model_error_rates.get(model, profile.error_rate)
+        latency = profile.latency_ms / 1000
+        if profile.latency_sigma:
+            latency *= math.exp(rng.gauss(0, profile.latency_sigma))
+
+        if rng.random() < profile.stall_rate:
+            self.server.count(model, "stall")
+            time.sleep(profile.stall_seconds)
+        time.sleep(latency)
+
+        if rng.random() < error_rate:
+            self.server.count(model, "error")
+            status = rng.choice([429, 500])
+            self.send_json(status, {"error": {"message": "Stub error", "type": "server_error", "code": status}})
+            return
+
+        content, outcome = self.completion_content(body, rng, profile)
+        self.server.count(model, outcome)
+        if body.get("stream"):
+            self.stream(body, model, content, profile)
+        else:
+            self.send_json(200, {
+                "id": f"chatcmpl-stub-{rng.getrandbits(32):08x}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+                "usage": self.usage(body, content),
+            })
+
+    def completion_content(self, body: Dict, rng: random.Random, profile: StubProfile) -> tuple[str, str]:
+        schema = find_schema(body)
+        if schema is None:
+            faker = SchemaFaker(rng)
+            return REPORT.format(
+                positive=faker.theme("positive"), positive2=faker.theme("positive"),
+                negative=faker.theme("negative"), negative2=faker.theme("negative"),
+            ), "ok"
+
+        prompt = json.dumps(body.get("messages", []))
+        items = len(re.findall(r"Feedback item \d+:", prompt)) or None
+        instance = SchemaFaker(rng, items).instance(schema, schema.get("$defs", {}))
+        content = json.dumps(instance)
+        if rng.random() < profile.malformed_rate:
+            # Truncated JSON, as produced by a completion that hit its token limit
+            return content[:rng.randint(1, max(len(content) - 1, 1))], "malformed"
+        if body.get("response_format") is None:
+            # Native JSON-schema output is always well formed; prompted output sometimes isn't
+            if rng.random() < profile.sloppy_rate:
+                return make_sloppy(instance), "sloppy"
+            content = f"```json\n{content}\n```"
+        return content, "ok"
+
+    def stream(self, body: Dict, model: str, content: str, profile: StubProfile):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        def chunk(delta: Dict, finish_reason: Optional[str] = None, usage: Optional[Dict] = None):
+            payload = {
+                "id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}] if usage is None else [],
+            }
+            if usage is not None:
+                payload["usage"] = usage
+            self.wfile.write(f"data: {json.dumps(payload)}\n\n".encode())
+            self.wfile.flush()
+
+        chunk({"role": "assistant", "content": ""})
+        for piece in re.findall(r"\S+\s*", content):
+            time.sleep(profile.chunk_ms / 1000)
+            chunk({"content": piece})
+        chunk({}, "stop")
+        if (body.get("stream_options") or {}).get("include_usage"):
+            chunk({}, usage=self.usage(body, content))
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+    def usage(self, body: Dict, content: str) -> Dict:
+        # Roughly four characters per token
+        prompt_tokens = len(json.dumps(body.get("messages", []))) // 4
+        completion_tokens = max(len(content) // 4, 1)
+        return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens}
+
+    def send_json(self, status: int, payload: Dict):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+def start_stub_server(profile: StubProfile, host: str = "127.0.0.1", port: int = 0,
+                      seed: Optional[int] = None) -> StubServer:
+    """Starts the stub on a background thread and returns the server; base URL is http://host:port/v1."""
+    server = StubServer((host, port), profile, seed)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="fast")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--seed", type=int, help="Seed for reproducible latency and failure sequences")
+    parser.add_argument("--latency-ms", type=float)
+    parser.add_argument("--latency-sigma", type=float)
+    parser.add_argument("--chunk-ms", type=float)
+    parser.add_argument("--error-rate", type=float)
+    parser.add_argument("--malformed-rate", type=float)
+    parser.add_argument("--sloppy-rate", type=float)
+    parser.add_argument("--stall-rate", type=float)
+    parser.add_argument("--stall-seconds", type=float)
+    parser.add_argument("--model-error-rate", action="append", default=[], metavar="MODEL=RATE",
+                        help="Error rate for one model, e.g. to trip its circuit breaker (repeatable)")
+    args = parser.parse_args()
+
+    overrides = {key: value for key, value in vars(args).items()
+                 if key in StubProfile.__dataclass_fields__ and value is not None}
+    model_error_rates = {model: float(rate) for model, rate in (item.rsplit("=", 1) for item in args.model_error_rate)}
+    profile = replace(PROFILES[args.profile], **overrides, model_error_rates=model_error_rates)
+
+    server = StubServer((args.host, args.port), profile, args.seed)
+    print(f"Stub LLM server ({args.profile}: {profile}) on http://{args.host}:{server.server_port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    print(f"Requests: {dict(server.stats)}")
+
+if __name__ == "__main__":
+    main()
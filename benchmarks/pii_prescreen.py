@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+"""
+Measures the local PII screen (pii_detector.py) against a labelled sample of
+themes, and estimates how many anonymity LLM calls it saves:
+
+    python -m benchmarks.pii_prescreen
+    python -m benchmarks.pii_prescreen --list-size 6 --pii-rate 0.1
+
+Precision and recall are per theme; a "positive" is a theme that contains an
+identifying detail. Theme lists are then simulated by sampling list-size
+themes with the given share of identifying ones: a list whose themes are all
+cleared skips the anonymity call, and a list is "leaked" if an identifying
+theme in it was not flagged.
+"""
+
+import argparse
+import json
+import random
+import time
+from pathlib import Path
+
+from pii_detector import identifying_features, might_identify
+
+SAMPLE = Path(__file__).with_name("pii_labelled_themes.json")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--list-size", type=int, default=6, help="Themes per simulated submission")
+    parser.add_argument("--pii-rate", type=float, default=0.1, help="Share of identifying themes in simulated lists")
+    parser.add_argument("--lists", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--verbose", action="store_true", help="Print misclassified themes")
+    args = parser.parse_args()
+
+    sample = json.loads(SAMPLE.read_text())
+    start = time.perf_counter()
+    flags = [might_identify(item["theme"]) for item in sample]
+    per_theme_us = (time.perf_counter() - start) / len(sample) * 1e6
+
+    tp = sum(f and item["pii"] for f, item in zip(flags, sample))
+    fp = sum(f and not item["pii"] for f, item in zip(flags, sample))
+    fn = sum(not f and item["pii"] for f, item in zip(flags, sample))
+    print(f"Labelled themes: {len(sample)} ({sum(item['pii'] for item in sample)} identifying)")
+    print(f"Precision: {tp / max(tp + fp, 1):.3f}  Recall: {tp / max(tp + fn, 1):.3f}  "
+          f"Flag rate: {sum(flags) / len(sample):.3f}  Time per theme: {per_theme_us:.1f}us")
+    if args.verbose:
+        for flag, item in zip(flags, sample):
+            if flag != item["pii"]:
+                label = "missed" if item["pii"] else "false positive"
+                print(f"  {label}: {item['theme']} {identifying_features(item['theme'])}")
+
+    rng = random.Random(args.seed)
+    identifying = [(f, True) for f, item in zip(flags, sample) if item["pii"]]
+    clean = [(f, False) for f, item in zip(flags, sample) if not item["pii"]]
+    skipped = leaked = 0
+    for _ in range(args.lists):
+        themes = [rng.choice(identifying if rng.random() < args.pii_rate else clean) for _ in range(args.list_size)]
+        skipped += not any(flag for flag, _ in themes)
+        leaked += any(pii and not flag for flag, pii in themes)
+    print(f"Simulated {args.lists} lists of {args.list_size} themes at {args.pii_rate:.0%} identifying: "
+          f"anonymity calls skipped {skipped / args.lists:.1%}, lists with an unflagged identifying theme "
+          f"{leaked / args.lists:.1%}")
+
+if __name__ == "__main__":
+    main()
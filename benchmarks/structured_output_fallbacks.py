@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+"""
+Counts the fallback-model calls caused by unparseable structured output, with
+and without native JSON-schema output and local JSON repair:
+
+    python -m benchmarks.structured_output_fallbacks --submissions 200 --sloppy-rate 0.15
+
+Runs strict-mode theme extraction (themes + anonymity calls) against the
+local stub server, whose prompted responses are "sloppy" (prose, code fences,
+trailing commas, capitalised sentiments) at the given rate. Three
+configurations are compared:
+
+    legacy     prompt format instructions, parsed by PydanticOutputParser
+    repair     prompt format instructions, local repair before failing
+    native     JSON-schema response format where supported, plus repair
+"""
+
+import argparse
+import os
+from dataclasses import replace
+
+from benchmarks.llm_stub_server import PROFILES, start_stub_server
+
+CONFIGS = {
+    "legacy": ("prompt", False),
+    "repair": ("prompt", True),
+    "native": ("json_schema", True),
+}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--submissions", type=int, default=200)
+    parser.add_argument("--sloppy-rate", type=float, default=0.15)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    server = start_stub_server(replace(PROFILES["instant"], sloppy_rate=args.sloppy_rate), seed=args.seed)
+    os.environ["OPENROUTER_BASE_URL"] = f"http://127.0.0.1:{server.server_port}/v1"
+    os.environ.setdefault("OPENROUTER_API_KEY", "bench")
+
+    import llm_functions
+    import llm_router
+
+    primary, fallback = llm_functions.TASK_MODELS["themes"]
+    print(f"{'config':<8} {'primary calls':>14} {'fallback calls':>15} {'repaired':>9} {'failed':>7} {'lost':>5}")
+    for name, (structured_output, json_repair) in CONFIGS.items():
+        llm_functions.LLM_STRUCTURED_OUTPUT = structured_output
+        llm_functions.LLM_JSON_REPAIR = json_repair
+        llm_functions._structured_output_stats.update(clean=0, repaired=0, failed=0)
+        llm_router._health.clear()  # each configuration starts with closed breakers
+        server.stats.clear()
+
+        lost = 0
+        for i in range(args.submissions):
+            result = llm_functions.convert_feedback_text_to_themes(
+                f"Feedback {i}: you communicate clearly but could delegate more.", mode="strict", use_cache=False
+            )
+            lost += result is None
+
+        calls = lambda model: sum(count for key, count in server.stats.items() if key.startswith(f"{model}:"))
+        stats = llm_functions.structured_output_stats()
+        print(f"{name:<8} {calls(primary):>14} {calls(fallback):>15} {stats['repaired']:>9} {stats['failed']:>7} {lost:>5}")
+
+if __name__ == "__main__":
+    main()
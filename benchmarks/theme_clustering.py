@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+"""
+Benchmarks theme clustering on a synthetic corpus of near-duplicate themes,
+reporting clustering time, prompt compaction and cluster quality:
+
+    python -m benchmarks.theme_clustering
+    python -m benchmarks.theme_clustering --themes 1000 2000 5000 --threshold 0.45
+
+Themes are generated by paraphrasing a fixed set of underlying points, so
+purity (share of clusters containing a single point) and fragmentation
+(clusters per point) can be measured against the known labels. Prompt tokens
+are estimated at four characters per token.
+"""
+
+import argparse
+import json
+import random
+import time
+from collections import Counter
+
+from theme_clustering import cluster_themes, format_theme_summary, summarize_themes
+from config import THEME_CLUSTER_THRESHOLD
+
+# Each point is a list of paraphrases of the same piece of feedback
+POINTS = [
+    ["You communicate clearly", "You communicate very clearly in meetings", "You communicate clearly with the team"],
+    ["Your code reviews are thorough", "You give thorough code reviews", "Your reviews of code are detailed and thorough"],
+    ["You could delegate more", "You should delegate more tasks to the team", "You could delegate more work to others"],
+    ["You miss deadlines", "You sometimes miss deadlines", "You missed several project deadlines"],
+    ["You support junior colleagues", "You actively support junior colleagues", "You support and mentor junior colleagues"],
+    ["Your documentation is excellent", "You write excellent documentation", "Your written documentation is excellent"],
+    ["You stay calm under pressure", "You remain calm under pressure", "You stay calm when under pressure"],
+    ["You could speak up more in meetings", "You should speak up more during meetings", "You could speak up more often in team meetings"],
+    ["You take ownership of problems", "You take ownership of difficult problems", "You always take ownership of problems"],
+    ["Your estimates are often too optimistic", "Your time estimates are too optimistic", "Your project estimates are often optimistic"],
+    ["You give constructive feedback", "You give helpful and constructive feedback", "Your feedback is constructive"],
+    ["You are quick to learn new tools", "You learn new tools quickly", "You are quick to pick up new tools"],
+    ["You could prioritise more carefully", "You should prioritise work more carefully", "You could prioritise your tasks more carefully"],
+    ["You collaborate well across teams", "You collaborate effectively across teams", "You collaborate well with other teams"],
+    ["Your presentations are engaging", "You give engaging presentations", "Your presentations to stakeholders are engaging"],
+    ["You sometimes interrupt others", "You interrupt others in discussions", "You sometimes interrupt colleagues when they speak"],
+]
+SUFFIXES = ["", "", "", " this year", " on most projects", " which the team appreciates"]
+
+def make_corpus(n: int, respondents: int, seed: int) -> list[tuple[str, str, int]]:
+    """Returns (theme, respondent id, point label) triples."""
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(n):
+        label = rng.randrange(len(POINTS))
+        text = rng.choice(POINTS[label]) + rng.choice(SUFFIXES)
+        corpus.append((text, f"r{rng.randrange(respondents)}", label))
+    return corpus
+
+def run(n: int, respondents: int, threshold: float, repeat: int, seed: int) -> dict:
+    corpus = make_corpus(n, respondents, seed)
+    themes = [(text, respondent) for text, respondent, _ in corpus]
+    labels = [label for _, _, label in corpus]
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        clusters = cluster_themes([text for text, _ in themes], threshold)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    verbatim = "\n".join(f"- {text}" for text, _ in themes)
+    clustered = format_theme_summary(summarize_themes(themes, threshold), respondents)
+    pure = sum(len({labels[i] for i in members}) == 1 for members in clusters)
+    clusters_per_point = Counter(Counter(labels[i] for i in members).most_common(1)[0][0] for members in clusters)
+    return {
+        "themes": n,
+        "clusters": len(clusters),
+        "best_ms": round(min(timings), 1),
+        "verbatim_tokens": len(verbatim) // 4,
+        "clustered_tokens": len(clustered) // 4,
+        "token_reduction": round(1 - len(clustered) / len(verbatim), 3),
+        "purity": round(pure / len(clusters), 3),
+        "clusters_per_point": round(sum(clusters_per_point.values()) / len(clusters_per_point), 2),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--themes", type=int, nargs="+", default=[250, 1000, 2500], help="Corpus sizes to benchmark")
+    parser.add_argument("--respondents", type=int, default=25, help="Number of distinct respondents in the corpus")
+    parser.add_argument("--threshold", type=float, default=THEME_CLUSTER_THRESHOLD, help="Similarity threshold")
+    parser.add_argument("--repeat", type=int, default=3, help="Timing repetitions per size")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    results = [run(n, args.respondents, args.threshold, args.repeat, args.seed) for n in args.themes]
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    columns = list(results[0])
+    print(" ".join(f"{c:>17}" for c in columns))
+    for result in results:
+        print(" ".join(f"{result[c]:>17}" for c in columns))
+
+if __name__ == "__main__":
+    main()
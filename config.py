@@ -1,6 +1,7 @@
 from fasthtml.common import *
 from datetime import datetime, timedelta
 import secrets, os
+import json
 import bcrypt
 
 # ----------------------
@@ -9,6 +10,11 @@ import bcrypt
 from dotenv import load_dotenv
 load_dotenv()  # Load environment variables from a .env file
 
+# SQLite database (see models.py)
+DATABASE_PATH = os.getenv("DATABASE_PATH", "data/feedback.db")
+# How long a write waits for another connection's transaction before failing
+DATABASE_BUSY_TIMEOUT_MS = int(os.getenv("DATABASE_BUSY_TIMEOUT_MS", "5000"))
+
 # These configuration values are now sourced from environment variables with defaults given below.
 # New approach: single minimum submissions requirement
 MINIMUM_SUBMISSIONS_REQUIRED = int(os.getenv("MINIMUM_SUBMISSIONS_REQUIRED", "5"))
@@ -29,6 +35,120 @@ BASE_URL =  os.getenv("BASE_URL", "feedback-to.me")
 
 # OpenRouter Configuration
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY", "your-openrouter-key")
+OPENROUTER_BASE_URL = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
+
+# Theme extraction pipeline: "strict" extracts themes and then runs a separate
+# anonymity check; "single" extracts anonymized themes in one LLM call
+THEME_PIPELINE_MODE = os.getenv("THEME_PIPELINE_MODE", "strict")
+# In strict mode, only themes that the local screen in pii_detector.py flags as
+# possibly identifying are sent to the anonymity check
+PII_PRESCREEN_ENABLED = os.getenv("PII_PRESCREEN_ENABLED", "true").lower() == "true"
+
+# Long free-text feedback: submissions longer than THEME_CHUNK_MIN_CHARS are split
+# on paragraph boundaries into chunks of about THEME_CHUNK_CHARS, themes are
+# extracted from the chunks in parallel and merged before the anonymity check.
+# FEEDBACK_TEXT_MAX_CHARS is a hard cap on the size of a submission.
+THEME_CHUNK_MIN_CHARS = int(os.getenv("THEME_CHUNK_MIN_CHARS", "6000"))
+THEME_CHUNK_CHARS = int(os.getenv("THEME_CHUNK_CHARS", "3000"))
+THEME_CHUNK_CONCURRENCY = int(os.getenv("THEME_CHUNK_CONCURRENCY", "4"))
+FEEDBACK_TEXT_MAX_CHARS = int(os.getenv("FEEDBACK_TEXT_MAX_CHARS", "20000"))
+
+# Near-duplicate themes are merged before report generation (see theme_clustering.py);
+# the threshold is the minimum similarity (0-1) for two themes to be merged
+THEME_CLUSTERING_ENABLED = os.getenv("THEME_CLUSTERING_ENABLED", "true").lower() == "true"
+THEME_CLUSTER_THRESHOLD = float(os.getenv("THEME_CLUSTER_THRESHOLD", "0.6"))
+
+# Map-reduce report generation: when the report input is longer than
+# REPORT_MAP_REDUCE_MIN_CHARS, each respondent group's ratings and themes are
+# summarised in parallel by the fast model (in chunks of at most
+# REPORT_MAP_CHUNK_CHARS), and the reasoning model writes the report from those
+# summaries. Set the threshold to 0 to always use a single prompt.
+REPORT_MAP_REDUCE_MIN_CHARS = int(os.getenv("REPORT_MAP_REDUCE_MIN_CHARS", "12000"))
+REPORT_MAP_CHUNK_CHARS = int(os.getenv("REPORT_MAP_CHUNK_CHARS", "6000"))
+REPORT_MAP_CONCURRENCY = int(os.getenv("REPORT_MAP_CONCURRENCY", "6"))
+
+# The report preview only shows a respondent group's ratings, and rating ranges,
+# once at least this many people have responded, so no one's ratings can be singled out
+REPORT_PREVIEW_MIN_RESPONDENTS = int(os.getenv("REPORT_PREVIEW_MIN_RESPONDENTS", "3"))
+
+# Structured output: "json_schema" sends the response schema as the provider's
+# JSON-schema response format to models whose id starts with one of
+# LLM_JSON_SCHEMA_MODEL_PREFIXES (other models get format instructions in the
+# prompt); "prompt" always uses prompt instructions. LLM_JSON_REPAIR fixes common
+# formatting slips (code fences, trailing commas, sentiment casing) locally
+# before a response is treated as a failure.
+LLM_STRUCTURED_OUTPUT = os.getenv("LLM_STRUCTURED_OUTPUT", "json_schema")
+LLM_JSON_SCHEMA_MODEL_PREFIXES = [p.strip() for p in os.getenv("LLM_JSON_SCHEMA_MODEL_PREFIXES", "google/,openai/").split(",") if p.strip()]
+LLM_JSON_REPAIR = os.getenv("LLM_JSON_REPAIR", "true").lower() == "true"
+
+# Per-task LLM budgets: deadline in seconds (covering primary and fallback attempts)
+# and max_tokens for the completion
+LLM_TASK_DEADLINES = {
+    "themes": float(os.getenv("LLM_DEADLINE_THEMES", "45")),
+    "anonymity": float(os.getenv("LLM_DEADLINE_ANONYMITY", "30")),
+    "summary": float(os.getenv("LLM_DEADLINE_SUMMARY", "60")),
+    "report": float(os.getenv("LLM_DEADLINE_REPORT", "180")),
+}
+LLM_TASK_MAX_TOKENS = {
+    "themes": int(os.getenv("LLM_MAX_TOKENS_THEMES", "2048")),
+    "anonymity": int(os.getenv("LLM_MAX_TOKENS_ANONYMITY", "2048")),
+    "summary": int(os.getenv("LLM_MAX_TOKENS_SUMMARY", "1024")),
+    "report": int(os.getenv("LLM_MAX_TOKENS_REPORT", "6144")),
+}
+# Share of the task deadline the primary model gets before we move on to the fallback
+LLM_PRIMARY_DEADLINE_SHARE = float(os.getenv("LLM_PRIMARY_DEADLINE_SHARE", "0.5"))
+
+# Hedged theme extraction: if the fast model hasn't answered after its recent
+# LLM_HEDGE_PERCENTILE latency, send the same request to the fast fallback and
+# use whichever answers first
+LLM_HEDGE_THEMES = os.getenv("LLM_HEDGE_THEMES", "false").lower() == "true"
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+LLM_HEDGE_MIN_DELAY_SECONDS = float(os.getenv("LLM_HEDGE_MIN_DELAY_SECONDS", "1"))
+LLM_HEDGE_DEFAULT_DELAY_SECONDS = float(os.getenv("LLM_HEDGE_DEFAULT_DELAY_SECONDS", "5"))
+
+# Circuit breaker (see llm_router.py): a model whose error rate over the rolling
+# window reaches the threshold is skipped until the cooldown expires
+LLM_HEALTH_WINDOW_SECONDS = int(os.getenv("LLM_HEALTH_WINDOW_SECONDS", "300"))
+LLM_BREAKER_ERROR_RATE = float(os.getenv("LLM_BREAKER_ERROR_RATE", "0.5"))
+LLM_BREAKER_MIN_CALLS = int(os.getenv("LLM_BREAKER_MIN_CALLS", "5"))
+LLM_BREAKER_COOLDOWN_SECONDS = int(os.getenv("LLM_BREAKER_COOLDOWN_SECONDS", "60"))
+
+# LLM response cache (see llm_cache.py)
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+# Tasks whose results are cached by default; individual calls can opt in or out
+LLM_CACHE_TASKS = [t.strip() for t in os.getenv("LLM_CACHE_TASKS", "themes,anonymity,summary,report").split(",") if t.strip()]
+
+# LLM call telemetry (see llm_telemetry.py): rows are buffered in memory and
+# written in batches every LLM_TELEMETRY_FLUSH_SECONDS or LLM_TELEMETRY_BATCH_SIZE calls
+LLM_TELEMETRY_FLUSH_SECONDS = float(os.getenv("LLM_TELEMETRY_FLUSH_SECONDS", "5"))
+LLM_TELEMETRY_BATCH_SIZE = int(os.getenv("LLM_TELEMETRY_BATCH_SIZE", "50"))
+LLM_TELEMETRY_MAX_BUFFER = int(os.getenv("LLM_TELEMETRY_MAX_BUFFER", "10000"))
+LLM_TELEMETRY_RETENTION_DAYS = int(os.getenv("LLM_TELEMETRY_RETENTION_DAYS", "30"))
+# Window covered by the admin page's LLM statistics
+LLM_TELEMETRY_WINDOW_DAYS = int(os.getenv("LLM_TELEMETRY_WINDOW_DAYS", "7"))
+# USD per million (input, output) tokens, used to estimate call cost.
+# Override or extend with a JSON object, e.g. {"my/model": [0.5, 1.5]}
+LLM_MODEL_PRICES = {
+    "google/gemini-2.0-flash-001": (0.10, 0.40),
+    "google/gemini-2.0-flash-thinking-exp": (0.0, 0.0),
+    "anthropic/claude-3-5-haiku-latest": (0.80, 4.00),
+    "anthropic/claude-sonnet-4-20250514": (3.00, 15.00),
+    **{model: tuple(price) for model, price in json.loads(os.getenv("LLM_MODEL_PRICES", "{}")).items()},
+}
+
+# Outbound LLM limiter (see llm_limiter.py), per process: operations running at
+# once, slots background theme work may not use (kept for interactive reports),
+# and an optional request-start rate limit (0 disables it)
+LLM_MAX_CONCURRENT_REQUESTS = int(os.getenv("LLM_MAX_CONCURRENT_REQUESTS", "8"))
+LLM_INTERACTIVE_RESERVED_SLOTS = int(os.getenv("LLM_INTERACTIVE_RESERVED_SLOTS", "2"))
+LLM_RATE_LIMIT_PER_SECOND = float(os.getenv("LLM_RATE_LIMIT_PER_SECOND", "0"))
+LLM_RATE_LIMIT_BURST = int(os.getenv("LLM_RATE_LIMIT_BURST", "5"))
+# How often a queued streamed report tells the page its position in the queue
+LLM_QUEUE_STATUS_INTERVAL_SECONDS = float(os.getenv("LLM_QUEUE_STATUS_INTERVAL_SECONDS", "1"))
+
+# Connection pool shared by all LLM clients (see llm_functions.get_llm)
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "50"))
+LLM_KEEPALIVE_SECONDS = float(os.getenv("LLM_KEEPALIVE_SECONDS", "120"))
 
 # Primary LLM models (via OpenRouter)
 LLM_MODEL_FAST = os.getenv("LLM_MODEL_FAST", "google/gemini-2.0-flash-001")
@@ -41,3 +161,34 @@ LLM_MODEL_REASONING_FALLBACK = os.getenv("LLM_MODEL_REASONING_FALLBACK", "anthro
 # OAuth Configuration
 GOOGLE_CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID", "")
 GOOGLE_CLIENT_SECRET = os.getenv("GOOGLE_CLIENT_SECRET", "")
+
+# Background job queue (see jobs.py / worker.py)
+JOB_POLL_INTERVAL_SECONDS = float(os.getenv("JOB_POLL_INTERVAL_SECONDS", "1"))
+JOB_VISIBILITY_TIMEOUT_SECONDS = int(os.getenv("JOB_VISIBILITY_TIMEOUT_SECONDS", "300"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+JOB_RETRY_BASE_SECONDS = int(os.getenv("JOB_RETRY_BASE_SECONDS", "10"))
+# Done and failed jobs are deleted after this many days
+JOB_RETENTION_DAYS = int(os.getenv("JOB_RETENTION_DAYS", "7"))
+
+# Outbound email via SMTP2GO (see email_dispatch.py). Sends share one pooled
+# HTTP client; the timeouts bound how long a send can hold a request handler.
+SMTP2GO_API_KEY = os.getenv("SMTP2GO_API_KEY")
+SMTP2GO_EMAIL_ENDPOINT = os.getenv("SMTP2GO_EMAIL_ENDPOINT", "https://api.smtp2go.com/v3")
+EMAIL_SENDER = os.getenv("EMAIL_SENDER", "noreply@feedback-to.me")
+EMAIL_CONNECT_TIMEOUT_SECONDS = float(os.getenv("EMAIL_CONNECT_TIMEOUT_SECONDS", "3"))
+EMAIL_READ_TIMEOUT_SECONDS = float(os.getenv("EMAIL_READ_TIMEOUT_SECONDS", "10"))
+EMAIL_MAX_CONNECTIONS = int(os.getenv("EMAIL_MAX_CONNECTIONS", "10"))
+# Sends in flight at once when the worker delivers a batch from the email outbox
+EMAIL_SEND_CONCURRENCY = int(os.getenv("EMAIL_SEND_CONCURRENCY", "5"))
+
+# Email outbox (see email_outbox.py): emails are delivered by the worker in
+# batches, retried with exponential backoff and dead-lettered after the last attempt
+EMAIL_OUTBOX_POLL_INTERVAL_SECONDS = float(os.getenv("EMAIL_OUTBOX_POLL_INTERVAL_SECONDS", "1"))
+EMAIL_OUTBOX_BATCH_SIZE = int(os.getenv("EMAIL_OUTBOX_BATCH_SIZE", "20"))
+EMAIL_OUTBOX_VISIBILITY_TIMEOUT_SECONDS = int(os.getenv("EMAIL_OUTBOX_VISIBILITY_TIMEOUT_SECONDS", "120"))
+EMAIL_MAX_ATTEMPTS = int(os.getenv("EMAIL_MAX_ATTEMPTS", "8"))
+EMAIL_RETRY_BASE_SECONDS = int(os.getenv("EMAIL_RETRY_BASE_SECONDS", "30"))
+# Sent and dead-lettered emails are deleted after this many days
+EMAIL_OUTBOX_RETENTION_DAYS = int(os.getenv("EMAIL_OUTBOX_RETENTION_DAYS", "7"))
+# /health reports unhealthy once a due email has waited this long (delivery has stalled)
+EMAIL_OUTBOX_MAX_LAG_SECONDS = int(os.getenv("EMAIL_OUTBOX_MAX_LAG_SECONDS", "600"))
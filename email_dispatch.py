@@ -0,0 +1,238 @@
+"""
+Outbound email via the SMTP2GO API.
+
+Every email the app sends goes through send_email (or asend_email from async
+code). Both share a pooled keep-alive HTTP client with strict connect and read
+timeouts, so a slow or unreachable SMTP2GO holds a request handler for a few
+seconds at most instead of indefinitely.
+
+Templates are compiled once into literal text and {placeholder} fields, and
+recompiled only when the file's mtime changes, so edits are picked up without
+a restart and without re-reading the file on every send.
+
+Payloads are never logged: they contain magic links and reset tokens.
+"""
+
+import asyncio
+import os
+import re
+import threading
+import weakref
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import httpx
+
+from config import (SMTP2GO_API_KEY, SMTP2GO_EMAIL_ENDPOINT, EMAIL_SENDER, EMAIL_CONNECT_TIMEOUT_SECONDS,
+                    EMAIL_READ_TIMEOUT_SECONDS, EMAIL_MAX_CONNECTIONS, EMAIL_SEND_CONCURRENCY)
+from utils import logger
+
+TEMPLATE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+@dataclass(frozen=True)
+class EmailKind:
+    template: str
+    subject: str
+
+
+EMAIL_KINDS: Dict[str, EmailKind] = {
+    "feedback_request": EmailKind("feedback_email_template.txt", "Feedback Request from Feedback to Me"),
+    "password_reset": EmailKind("password_reset_email_template.txt", "Password Reset Request"),
+    "report_ready": EmailKind("report_ready_email_template.txt", "Your Feedback Report is Ready!"),
+    "confirmation": EmailKind("confirmation_email_template.txt", "Please Confirm Your Email Address"),
+}
+
+# --------------------
+# Templates
+# --------------------
+
+_FIELD_RE = re.compile(r"\{(\w+)\}")
+
+
+class CompiledTemplate:
+    """A template split once into alternating literal text and field names."""
+
+    def __init__(self, source: str):
+        # split() alternates literal text and the captured field names
+        self.parts: List[str] = _FIELD_RE.split(source)
+
+    def render(self, fields: Dict[str, str]) -> str:
+        """Fills in the fields; placeholders without a value are left as they are."""
+        return "".join(part if i % 2 == 0 else str(fields.get(part, "{" + part + "}"))
+                       for i, part in enumerate(self.parts))
+
+
+_templates: Dict[str, Tuple[int, CompiledTemplate]] = {}
+_templates_lock = threading.Lock()
+
+
+def load_template(name: str) -> CompiledTemplate:
+    """
+    Returns the compiled template, recompiling it only if the file has changed.
+
+    Args:
+        name: Template file name, relative to TEMPLATE_DIR
+
+    Returns:
+        The compiled template
+    """
+    path = os.path.join(TEMPLATE_DIR, name)
+    mtime = os.stat(path).st_mtime_ns
+    cached = _templates.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    with _templates_lock:
+        cached = _templates.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        with open(path, "r") as f:
+            compiled = CompiledTemplate(f.read())
+        _templates[path] = (mtime, compiled)
+        logger.debug(f"Compiled email template {name}")
+        return compiled
+
+# --------------------
+# HTTP clients
+# --------------------
+
+_http_client: Optional[httpx.Client] = None
+_http_client_lock = threading.Lock()
+# An AsyncClient's connections belong to the loop that opened them, so keep one per loop
+_async_http_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+
+def _client_settings() -> Dict:
+    return {
+        "timeout": httpx.Timeout(EMAIL_READ_TIMEOUT_SECONDS, connect=EMAIL_CONNECT_TIMEOUT_SECONDS),
+        "limits": httpx.Limits(max_connections=EMAIL_MAX_CONNECTIONS, max_keepalive_connections=EMAIL_MAX_CONNECTIONS),
+    }
+
+
+def _sync_client() -> httpx.Client:
+    global _http_client
+    if _http_client is None:
+        with _http_client_lock:
+            if _http_client is None:
+                _http_client = httpx.Client(**_client_settings())
+    return _http_client
+
+
+def _async_client() -> httpx.AsyncClient:
+    loop = asyncio.get_running_loop()
+    client = _async_http_clients.get(loop)
+    if client is None:
+        client = _async_http_clients[loop] = httpx.AsyncClient(**_client_settings())
+    return client
+
+# --------------------
+# Sending
+# --------------------
+
+def build_payload(kind: str, recipient: str, fields: Dict[str, str]) -> Dict:
+    """
+    Renders the email and returns the SMTP2GO send payload.
+
+    Args:
+        kind: Key of EMAIL_KINDS
+        recipient: Recipient email address
+        fields: Values for the template's {placeholders}
+
+    Returns:
+        JSON payload for the /email/send endpoint
+    """
+    spec = EMAIL_KINDS[kind]
+    return {
+        "sender": EMAIL_SENDER,
+        "to": [recipient],
+        "subject": spec.subject,
+        "text_body": load_template(spec.template).render(fields),
+    }
+
+
+def _request(payload: Dict) -> Optional[Tuple[str, Dict]]:
+    if not SMTP2GO_API_KEY:
+        logger.error("SMTP2GO_API_KEY is missing.")
+        return None
+    headers = {"Content-Type": "application/json", "X-Smtp2go-Api-Key": SMTP2GO_API_KEY}
+    return SMTP2GO_EMAIL_ENDPOINT.rstrip("/") + "/email/send", headers
+
+
+def _succeeded(kind: str, recipient: str, response: httpx.Response) -> bool:
+    if response.status_code != 200:
+        logger.error(f"Error sending {kind} email to {recipient}: {response.status_code} - {response.text}")
+        return False
+    result_json = response.json()
+    if result_json.get("data", {}).get("succeeded", 0) == 1:
+        logger.info(f"{kind} email sent to {recipient}")
+        return True
+    logger.error(f"SMTP2GO error sending {kind} email to {recipient}: {result_json}")
+    return False
+
+
+def send_email(kind: str, recipient: str, **fields: str) -> bool:
+    """
+    Sends one templated email.
+
+    Args:
+        kind: Key of EMAIL_KINDS
+        recipient: Recipient email address
+        **fields: Values for the template's {placeholders}
+
+    Returns:
+        True if SMTP2GO accepted the email
+    """
+    try:
+        payload = build_payload(kind, recipient, fields)
+        request = _request(payload)
+        if request is None:
+            return False
+        url, headers = request
+        logger.info(f"Sending {kind} email to {recipient}")
+        return _succeeded(kind, recipient, _sync_client().post(url, json=payload, headers=headers))
+    except Exception as e:
+        logger.error(f"Exception while sending {kind} email to {recipient}: {str(e)}")
+        return False
+
+
+async def asend_email(kind: str, recipient: str, **fields: str) -> bool:
+    """Async version of send_email, for use from async routes and jobs."""
+    try:
+        payload = build_payload(kind, recipient, fields)
+        request = _request(payload)
+        if request is None:
+            return False
+        url, headers = request
+        logger.info(f"Sending {kind} email to {recipient}")
+        return _succeeded(kind, recipient, await _async_client().post(url, json=payload, headers=headers))
+    except Exception as e:
+        logger.error(f"Exception while sending {kind} email to {recipient}: {str(e)}")
+        return False
+
+
+async def asend_emails(kind: str, messages: Sequence[Tuple[str, Dict[str, str]]],
+                       concurrency: int = EMAIL_SEND_CONCURRENCY) -> List[bool]:
+    """
+    Sends many emails of one kind concurrently, at most `concurrency` at a time.
+
+    Each recipient gets their own rendered body (e.g. their own magic link), so
+    these are separate API calls over the shared pool rather than one
+    multi-recipient send.
+
+    Args:
+        kind: Key of EMAIL_KINDS
+        messages: (recipient, template fields) pairs
+        concurrency: Maximum sends in flight
+
+    Returns:
+        Whether each email was accepted, in the order of messages
+    """
+    semaphore = asyncio.Semaphore(max(concurrency, 1))
+
+    async def send_one(recipient: str, fields: Dict[str, str]) -> bool:
+        async with semaphore:
+            return await asend_email(kind, recipient, **fields)
+
+    results = await asyncio.gather(*(send_one(recipient, fields) for recipient, fields in messages))
+    logger.info(f"Sent {sum(results)} of {len(results)} {kind} emails")
+    return list(results)
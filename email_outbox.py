@@ -0,0 +1,276 @@
+"""
+Transactional email outbox.
+
+Request handlers never talk to SMTP2GO. They call queue_email inside the
+transaction that makes the change the email is about (a new user, a reset
+token, an invite), so the email is recorded if and only if the change is, and
+the handler returns as soon as that transaction commits.
+
+worker.py delivers the outbox in batches through email_dispatch. A claimed
+email is hidden from other workers until its visibility timeout expires, so
+emails held by a crashed worker are picked up again. Failed sends are retried
+with exponential backoff; after EMAIL_MAX_ATTEMPTS the email is dead-lettered
+(status 'dead') and left in the table for inspection.
+
+Template fields hold magic links and reset tokens, so they are cleared once an
+email is sent, and sent and dead emails are deleted after
+EMAIL_OUTBOX_RETENTION_DAYS. delivery_lag_seconds() backs the /health check,
+which fails if the worker has stopped delivering.
+"""
+
+import json
+import secrets
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set
+
+from models import db, email_outbox_tb
+from email_dispatch import asend_emails
+from config import (EMAIL_MAX_ATTEMPTS, EMAIL_RETRY_BASE_SECONDS, EMAIL_OUTBOX_BATCH_SIZE,
+                    EMAIL_OUTBOX_VISIBILITY_TIMEOUT_SECONDS, EMAIL_OUTBOX_RETENTION_DAYS)
+from utils import logger, generate_external_link
+
+
+def queue_email(kind: str, recipient: str, fields: Dict[str, str], request_token: Optional[str] = None) -> str:
+    """
+    Adds an email to the outbox and returns its id. Call inside the transaction
+    that makes the change the email is about.
+
+    Args:
+        kind: Key of email_dispatch.EMAIL_KINDS
+        recipient: Recipient email address
+        fields: Values for the template's {placeholders}
+        request_token: For invites, the FeedbackRequest to mark as emailed on delivery
+    """
+    now = datetime.now().isoformat()
+    email_id = secrets.token_hex(8)
+    email_outbox_tb.insert({
+        "id": email_id,
+        "kind": kind,
+        "recipient": recipient,
+        "fields": json.dumps(fields),
+        "status": "pending",
+        "attempts": 0,
+        "next_attempt_at": now,
+        "created_at": now,
+        "request_token": request_token,
+    })
+    logger.debug(f"Queued {kind} email {email_id}")
+    return email_id
+
+
+# The app's emails. Call these inside the transaction that makes the change the
+# email is about.
+
+def queue_invites(process_id: str, link_prefix: str, sender_first_name: str = "", token: Optional[str] = None,
+                  recipient_first_name: str = "") -> List[Dict]:
+    """
+    Queues feedback request emails with each recipient's magic link, claiming the
+    requests in the same statement: a request whose invite is already queued or
+    being sent is skipped, so two concurrent sends queue each invite once. The
+    request's email_sent is set when its email is delivered.
+
+    Args:
+        process_id: Feedback process whose requests to invite
+        link_prefix: Form link without the request token, which is appended to it
+        sender_first_name: First name of the process owner
+        token: Invite only this request (sent or not); otherwise every request not
+            yet emailed or completed
+        recipient_first_name: Recipient's first name, if known
+
+    Returns:
+        The queued invites, as {"request_token", "recipient"} rows
+    """
+    now = datetime.now().isoformat()
+    rows = db.q("""
+        INSERT INTO email_outbox (id, kind, recipient, fields, status, attempts, next_attempt_at, created_at, request_token)
+        SELECT lower(hex(randomblob(8))), 'feedback_request', r.email,
+               json_object('link', ?1 || r.token, 'recipient_first_name', ?2, 'sender_first_name', ?3),
+               'pending', 0, ?4, ?4, r.token
+        FROM feedback_request r
+        WHERE r.process_id=?5
+          AND (r.token=?6 OR (?6 IS NULL AND r.email_sent IS NULL AND r.completed_at IS NULL))
+          AND NOT EXISTS (SELECT 1 FROM email_outbox o
+                          WHERE o.request_token=r.token AND o.status IN ('pending', 'sending'))
+        RETURNING request_token, recipient""",
+        [generate_external_link(link_prefix), recipient_first_name, sender_first_name, now, process_id, token])
+    logger.debug(f"Queued {len(rows)} feedback_request emails for process {process_id}")
+    return rows
+
+def queue_password_reset_email(recipient: str, token: str, recipient_first_name: str = "") -> str:
+    """
+    Queues an email with a password reset link containing the given token.
+    """
+    return queue_email("password_reset", recipient, {"link": generate_external_link(f"reset-password/{token}"),
+                       "recipient_first_name": recipient_first_name})
+
+def queue_report_ready_email(recipient: str, recipient_first_name: str = "") -> str:
+    """
+    Queues an email to notify the user that their report is ready to be generated.
+    """
+    return queue_email("report_ready", recipient, {"link": generate_external_link("dashboard"),
+                       "recipient_first_name": recipient_first_name})
+
+def queue_confirmation_email(recipient: str, token: str, recipient_first_name: str = "", recipient_company: str = "") -> str:
+    """
+    Queues an email with a confirmation link containing the given token.
+    """
+    return queue_email("confirmation", recipient, {"link": generate_external_link(f"confirm-email/{token}"),
+                       "recipient_first_name": recipient_first_name, "recipient_company": recipient_company})
+
+
+def outstanding_request_tokens(process_id: str) -> Set[str]:
+    """Tokens of a process's requests whose invite is queued but not yet delivered."""
+    return {row["token"] for row in db.q("""
+        SELECT r.token FROM feedback_request r
+        JOIN email_outbox o ON o.request_token=r.token
+        WHERE r.process_id=? AND o.status IN ('pending', 'sending')""", [process_id])}
+
+def failed_request_invites(process_id: str) -> Dict[str, str]:
+    """
+    A process's requests whose invite was dead-lettered and has not been sent or
+    queued again since, mapped to the delivery error.
+    """
+    return {row["token"]: row["last_error"] or "" for row in db.q("""
+        SELECT r.token, o.last_error FROM feedback_request r
+        JOIN email_outbox o ON o.request_token=r.token
+        WHERE r.process_id=? AND r.email_sent IS NULL AND o.status='dead'
+          AND NOT EXISTS (SELECT 1 FROM email_outbox q
+                          WHERE q.request_token=r.token AND q.status IN ('pending', 'sending'))
+        ORDER BY o.created_at""", [process_id])}
+
+
+def claim_emails(limit: int = EMAIL_OUTBOX_BATCH_SIZE) -> List[Dict]:
+    """
+    Atomically claims up to `limit` emails that are due, oldest first.
+
+    An email is due if it is pending and its next attempt time has passed, or if
+    it is being sent but its visibility timeout has expired (its worker died).
+    """
+    now = datetime.now().isoformat()
+    locked_until = (datetime.now() + timedelta(seconds=EMAIL_OUTBOX_VISIBILITY_TIMEOUT_SECONDS)).isoformat()
+    rows = db.q("""
+        UPDATE email_outbox SET status='sending', attempts=attempts+1, locked_until=?
+        WHERE id IN (
+            SELECT id FROM email_outbox
+            WHERE (status='pending' AND next_attempt_at<=?) OR (status='sending' AND locked_until<=?)
+            ORDER BY next_attempt_at
+            LIMIT ?
+        )
+        RETURNING *""", [locked_until, now, now, limit])
+    for row in rows:
+        row["fields"] = json.loads(row["fields"])
+    return rows
+
+
+def mark_sent(emails: List[Dict]):
+    """
+    Records delivered emails, and the invites they carried, in one transaction.
+    Their template fields are cleared, as they are no longer needed.
+    """
+    if not emails:
+        return
+    now = datetime.now().isoformat()
+    ids = [email["id"] for email in emails]
+    tokens = [email["request_token"] for email in emails if email["request_token"]]
+    with db.conn:
+        db.execute(f"UPDATE email_outbox SET status='sent', locked_until=NULL, sent_at=?, fields='{{}}' WHERE id IN ({','.join('?' * len(ids))})",
+                   [now, *ids])
+        if tokens:
+            db.execute(f"UPDATE feedback_request SET email_sent=? WHERE token IN ({','.join('?' * len(tokens))})",
+                       [now, *tokens])
+
+
+def mark_failed(email: Dict, error: str):
+    """
+    Records a failed attempt. The email is retried with exponential backoff, or
+    dead-lettered once it has used up EMAIL_MAX_ATTEMPTS.
+    """
+    if email["attempts"] >= EMAIL_MAX_ATTEMPTS:
+        logger.error(f"Email {email['id']} ({email['kind']} to {email['recipient']}) dead-lettered after {email['attempts']} attempts: {error}")
+        email_outbox_tb.update({"status": "dead", "locked_until": None, "last_error": error}, email["id"])
+        return
+
+    delay = EMAIL_RETRY_BASE_SECONDS * 2 ** (email["attempts"] - 1)
+    logger.warning(f"Email {email['id']} ({email['kind']}) failed on attempt {email['attempts']}, retrying in {delay}s: {error}")
+    email_outbox_tb.update({
+        "status": "pending",
+        "locked_until": None,
+        "last_error": error,
+        "next_attempt_at": (datetime.now() + timedelta(seconds=delay)).isoformat(),
+    }, email["id"])
+
+
+async def adeliver_due(limit: int = EMAIL_OUTBOX_BATCH_SIZE) -> int:
+    """
+    Claims a batch of due emails and sends them concurrently.
+
+    Returns:
+        Number of emails claimed (0 when the outbox has nothing due)
+    """
+    emails = claim_emails(limit)
+    by_kind = defaultdict(list)
+    for email in emails:
+        by_kind[email["kind"]].append(email)
+
+    sent = []
+    for kind, batch in by_kind.items():
+        results = await asend_emails(kind, [(email["recipient"], email["fields"]) for email in batch])
+        for email, ok in zip(batch, results):
+            if ok:
+                sent.append(email)
+            else:
+                mark_failed(email, "SMTP2GO did not accept the email")
+    mark_sent(sent)
+    return len(emails)
+
+
+def prune_outbox(retention_days: int = EMAIL_OUTBOX_RETENTION_DAYS) -> int:
+    """
+    Deletes sent and dead-lettered emails older than retention_days.
+
+    Returns:
+        Number of emails deleted
+    """
+    cutoff = (datetime.now() - timedelta(days=retention_days)).isoformat()
+    deleted = db.q("""
+        DELETE FROM email_outbox
+        WHERE (status='sent' AND sent_at<?1) OR (status='dead' AND created_at<?1)
+        RETURNING id""", [cutoff])
+    if deleted:
+        logger.info(f"Pruned {len(deleted)} emails from the outbox")
+    return len(deleted)
+
+
+def delivery_lag_seconds() -> float:
+    """
+    How long the most overdue email has been waiting to be sent: pending past its
+    next attempt time, or held by a worker past its visibility timeout. 0 if none.
+    """
+    now = datetime.now().isoformat()
+    row = db.q("""
+        SELECT MIN(CASE WHEN status='pending' THEN next_attempt_at ELSE locked_until END) AS due
+        FROM email_outbox
+        WHERE (status='pending' AND next_attempt_at<=?1) OR (status='sending' AND locked_until<=?1)""", [now])[0]
+    return max((datetime.now() - datetime.fromisoformat(row["due"])).total_seconds(), 0) if row["due"] else 0
+
+
+def outbox_stats() -> Dict:
+    """
+    Summary of the outbox for the admin page.
+
+    Returns:
+        Dictionary with "depth" (emails waiting or being sent), "oldest_age_seconds"
+        (age of the oldest of those, 0 if none), "retrying" (waiting after a failed
+        attempt) and "dead" (dead-lettered) counts.
+    """
+    row = db.q("""
+        SELECT
+            SUM(status IN ('pending', 'sending')) AS depth,
+            MIN(CASE WHEN status IN ('pending', 'sending') THEN created_at END) AS oldest,
+            SUM(status='pending' AND attempts>0) AS retrying,
+            SUM(status='dead') AS dead
+        FROM email_outbox""")[0]
+    oldest_age = (datetime.now() - datetime.fromisoformat(row["oldest"])).total_seconds() if row["oldest"] else 0
+    return {"depth": row["depth"] or 0, "oldest_age_seconds": max(oldest_age, 0),
+            "retrying": row["retrying"] or 0, "dead": row["dead"] or 0}
@@ -0,0 +1,116 @@
+"""
+Durable background job queue stored in the application's SQLite database.
+
+Request handlers in main.py enqueue jobs and return immediately; worker.py
+claims and runs them. A claimed job stays invisible to other workers until its
+visibility timeout expires, so jobs held by a crashed worker are picked up
+again automatically. Failed jobs are retried with exponential backoff until
+JOB_MAX_ATTEMPTS is reached, after which they are marked as failed. Done and
+failed jobs are deleted after JOB_RETENTION_DAYS, so claims stay fast.
+"""
+
+import json
+import secrets
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from models import db, jobs_tb
+from config import JOB_MAX_ATTEMPTS, JOB_RETRY_BASE_SECONDS, JOB_VISIBILITY_TIMEOUT_SECONDS, JOB_RETENTION_DAYS
+from utils import logger
+
+
+def enqueue_job(kind: str, payload: Dict, delay_seconds: int = 0) -> str:
+    """
+    Adds a job to the queue and returns its id.
+
+    Args:
+        kind: Name of the worker handler that should process the job
+        payload: JSON-serialisable arguments passed to the handler
+        delay_seconds: Optional delay before the job becomes claimable
+    """
+    now = datetime.now()
+    job_id = secrets.token_hex(8)
+    jobs_tb.insert({
+        "id": job_id,
+        "kind": kind,
+        "payload": json.dumps(payload),
+        "status": "queued",
+        "attempts": 0,
+        "run_after": (now + timedelta(seconds=delay_seconds)).isoformat(),
+        "created_at": now,
+    })
+    logger.debug(f"Enqueued {kind} job {job_id}")
+    return job_id
+
+
+def claim_job(kinds: Optional[List[str]] = None) -> Optional[Dict]:
+    """
+    Atomically claims the next runnable job, or returns None if the queue is empty.
+
+    A job is runnable if it is queued and due, or if it is running but its
+    visibility timeout has expired (its worker died or hung).
+    """
+    now = datetime.now().isoformat()
+    locked_until = (datetime.now() + timedelta(seconds=JOB_VISIBILITY_TIMEOUT_SECONDS)).isoformat()
+    kind_filter, kind_params = "", []
+    if kinds:
+        kind_filter = f"AND kind IN ({','.join('?' for _ in kinds)})"
+        kind_params = list(kinds)
+
+    rows = db.q(f"""
+        UPDATE job SET status='running', attempts=attempts+1, locked_until=?
+        WHERE id = (
+            SELECT id FROM job
+            WHERE ((status='queued' AND run_after<=?) OR (status='running' AND locked_until<=?))
+            {kind_filter}
+            ORDER BY run_after
+            LIMIT 1
+        )
+        RETURNING *""", [locked_until, now, now, *kind_params])
+    if not rows:
+        return None
+    job = rows[0]
+    job["payload"] = json.loads(job["payload"])
+    return job
+
+
+def complete_job(job_id: str):
+    """Marks a job as successfully processed."""
+    jobs_tb.update({"status": "done", "locked_until": None, "completed_at": datetime.now()}, job_id)
+
+
+def fail_job(job: Dict, error: str):
+    """
+    Records a failed attempt. The job is requeued with exponential backoff,
+    or marked as failed once it has used up JOB_MAX_ATTEMPTS.
+    """
+    if job["attempts"] >= JOB_MAX_ATTEMPTS:
+        logger.error(f"Job {job['id']} ({job['kind']}) failed permanently after {job['attempts']} attempts: {error}")
+        jobs_tb.update({"status": "failed", "locked_until": None, "last_error": error}, job["id"])
+        return
+
+    delay = JOB_RETRY_BASE_SECONDS * 2 ** (job["attempts"] - 1)
+    logger.warning(f"Job {job['id']} ({job['kind']}) failed on attempt {job['attempts']}, retrying in {delay}s: {error}")
+    jobs_tb.update({
+        "status": "queued",
+        "locked_until": None,
+        "last_error": error,
+        "run_after": (datetime.now() + timedelta(seconds=delay)).isoformat(),
+    }, job["id"])
+
+
+def prune_jobs(retention_days: int = JOB_RETENTION_DAYS) -> int:
+    """
+    Deletes done and failed jobs older than retention_days.
+
+    Returns:
+        Number of jobs deleted
+    """
+    cutoff = (datetime.now() - timedelta(days=retention_days)).isoformat()
+    deleted = db.q("""
+        DELETE FROM job
+        WHERE status IN ('done', 'failed') AND COALESCE(completed_at, created_at)<?
+        RETURNING id""", [cutoff])
+    if deleted:
+        logger.info(f"Pruned {len(deleted)} finished jobs")
+    return len(deleted)
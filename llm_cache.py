@@ -0,0 +1,91 @@
+"""
+Content-addressed cache for parsed LLM results.
+
+Entries are keyed by a SHA-256 hash of (model, system prompt, user prompt,
+parameters), so an identical request is answered without calling the model
+again, whether it comes from a retry, a fallback or reprocessing the same
+feedback. Results live in the llm_cache_entry table with a TTL; a lookup is a
+primary-key read, negligible next to the model call it saves.
+
+Entries built from a process's feedback carry its process_id so that
+purge_process() can remove them when the process is deleted. There is
+deliberately no in-memory tier: the purge runs in the web process while the
+worker makes most of these calls, so a per-process copy could keep serving a
+deleted process's feedback.
+"""
+
+import hashlib
+import json
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from models import db, llm_cache_tb
+from config import LLM_CACHE_TTL_SECONDS
+from utils import logger
+
+# Expired rows are swept from the database every this many writes
+_EVICT_EVERY_WRITES = 100
+
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "writes": 0}
+
+def cache_key(model: str, system_prompt: str, user_prompt: str, params: Dict[str, Any]) -> str:
+    """Returns the content hash identifying an LLM request."""
+    material = json.dumps([model, system_prompt, user_prompt, params], sort_keys=True, default=str)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+def get(key: str) -> Optional[Any]:
+    """Returns the cached value for key, or None on a miss or expired entry."""
+    now = datetime.now().isoformat()
+    try:
+        rows = db.q("SELECT value FROM llm_cache_entry WHERE key=? AND expires_at>?", [key, now])
+    except Exception as e:
+        # A cache failure should never fail the LLM call it fronts
+        logger.warning(f"LLM cache lookup failed: {str(e)}")
+        rows = []
+    with _lock:
+        _stats["hits" if rows else "misses"] += 1
+    return json.loads(rows[0]["value"]) if rows else None
+
+def put(key: str, value: Any, task: str, process_id: Optional[str] = None, ttl_seconds: int = LLM_CACHE_TTL_SECONDS):
+    """Stores a JSON-serialisable value under key."""
+    now = datetime.now()
+    try:
+        llm_cache_tb.upsert({
+            "key": key,
+            "task": task,
+            "value": json.dumps(value),
+            "created_at": now,
+            "expires_at": (now + timedelta(seconds=ttl_seconds)).isoformat(),
+            "process_id": process_id,
+        })
+    except Exception as e:
+        logger.warning(f"LLM cache write failed: {str(e)}")
+    with _lock:
+        _stats["writes"] += 1
+        sweep = _stats["writes"] % _EVICT_EVERY_WRITES == 0
+    if sweep:
+        evict_expired()
+
+def evict_expired() -> int:
+    """Deletes expired entries from the database and returns how many were removed."""
+    now = datetime.now().isoformat()
+    removed = len(db.q("DELETE FROM llm_cache_entry WHERE expires_at<=? RETURNING key", [now]))
+    if removed:
+        logger.debug(f"Evicted {removed} expired LLM cache entries")
+    return removed
+
+def purge_process(process_id: str) -> int:
+    """Deletes every cache entry derived from the given process's feedback."""
+    removed = len(db.q("DELETE FROM llm_cache_entry WHERE process_id=? RETURNING key", [process_id]))
+    logger.info(f"Purged {removed} LLM cache entries for process {process_id}")
+    return removed
+
+def stats() -> Dict[str, Any]:
+    """Returns hit/miss counters for this process, plus the overall hit rate."""
+    with _lock:
+        result = dict(_stats)
+    lookups = result["hits"] + result["misses"]
+    result["hit_rate"] = result["hits"] / lookups if lookups else 0.0
+    return result
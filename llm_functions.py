@@ -9,23 +9,66 @@ and structured output with Pydantic models.
 """
 
 import os
-from typing import List, Dict, Optional, Union
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterator, List, Dict, Optional, Tuple, Type, Union
 import json
+import re
+import functools
+import hashlib
+import time
+import asyncio
+import threading
+import importlib.util
+import concurrent.futures
+from contextlib import contextmanager
+from contextvars import ContextVar
 
+import httpx
+import openai
 from pydantic import BaseModel, Field
 from langchain.output_parsers import PydanticOutputParser
+from langchain_core.exceptions import OutputParserException
 from langchain_openai import ChatOpenAI
 
 
 # Configure logger for debugging
 from utils import logger
+import llm_cache
+import llm_router
+import llm_telemetry
+import llm_limiter
+import pii_detector
+from theme_clustering import cluster_themes
+from llm_limiter import BACKGROUND, INTERACTIVE, QueueStatus
 
 from config import (
     OPENROUTER_API_KEY,
+    OPENROUTER_BASE_URL,
+    LLM_MAX_CONNECTIONS,
+    LLM_CACHE_TASKS,
+    LLM_TASK_DEADLINES,
+    LLM_TASK_MAX_TOKENS,
+    LLM_JSON_REPAIR,
+    LLM_JSON_SCHEMA_MODEL_PREFIXES,
+    LLM_STRUCTURED_OUTPUT,
+    LLM_HEDGE_THEMES,
+    LLM_HEDGE_PERCENTILE,
+    LLM_HEDGE_MIN_DELAY_SECONDS,
+    LLM_HEDGE_DEFAULT_DELAY_SECONDS,
+    LLM_KEEPALIVE_SECONDS,
+    LLM_QUEUE_STATUS_INTERVAL_SECONDS,
     LLM_MODEL_FAST,
     LLM_MODEL_REASONING,
     LLM_MODEL_FAST_FALLBACK,
-    LLM_MODEL_REASONING_FALLBACK
+    LLM_MODEL_REASONING_FALLBACK,
+    REPORT_MAP_CONCURRENCY,
+    PII_PRESCREEN_ENABLED,
+    THEME_PIPELINE_MODE,
+    THEME_CHUNK_MIN_CHARS,
+    THEME_CHUNK_CHARS,
+    THEME_CHUNK_CONCURRENCY,
+    THEME_CLUSTERING_ENABLED,
+    THEME_CLUSTER_THRESHOLD,
+    FEEDBACK_TEXT_MAX_CHARS,
 )
 
 def clean_markdown(text: str) -> str:
@@ -67,74 +110,590 @@ class ThemesResponse(BaseModel):
     negative: List[str]
     neutral: List[str]
 
-def create_feedback_llm(model_name: str, fallback_model: Optional[str] = None, is_fallback: bool = False) -> ChatOpenAI:
+class BatchedThemes(BaseModel):
+    index: int = Field(description="The number of the feedback item the themes were extracted from")
+    themes: List[AnonymizedTheme] = Field(description="Themes extracted from that feedback item")
+
+class BatchedThemesResponse(BaseModel):
+    items: List[BatchedThemes] = Field(description="One entry per feedback item")
+
+# Primary and fallback model for each task
+TASK_MODELS = {
+    "themes": (LLM_MODEL_FAST, LLM_MODEL_FAST_FALLBACK),
+    "anonymity": (LLM_MODEL_FAST, LLM_MODEL_FAST_FALLBACK),
+    "summary": (LLM_MODEL_FAST, LLM_MODEL_FAST_FALLBACK),
+    "report": (LLM_MODEL_REASONING, LLM_MODEL_REASONING_FALLBACK),
+}
+
+# ---------------------------
+# Structured output
+# ---------------------------
+# Each response model gets its parser, prompt instructions and JSON-schema
+# response format built once per process. Models that support the provider's
+# JSON-schema response format get the schema natively (and a one-line prompt
+# instruction); others get the full format instructions in the prompt. Before
+# a malformed response is treated as a failure - which makes the router retry
+# on the fallback model - _StructuredOutput.parse tries a cheap local repair.
+
+NATIVE_SCHEMA_INSTRUCTIONS = "Respond only with JSON that matches the provided response schema."
+_VALID_SENTIMENTS = {"positive", "negative", "neutral"}
+
+_structured_output_stats = {"clean": 0, "repaired": 0, "failed": 0}
+_structured_output_stats_lock = threading.Lock()
+
+def _count_structured_output(stat: str):
+    with _structured_output_stats_lock:
+        _structured_output_stats[stat] += 1
+
+def structured_output_stats() -> Dict[str, int]:
+    """
+    Returns how many structured responses parsed cleanly, needed local repair, or failed.
+    Each repaired response is a fallback-model call that didn't have to be made.
+    """
+    with _structured_output_stats_lock:
+        return dict(_structured_output_stats)
+
+def _strict_schema(schema: Dict, defs: Optional[Dict] = None) -> Dict:
+    """
+    Converts a Pydantic JSON schema into the strict form JSON-schema response formats
+    expect: $refs inlined, every property required, no additional properties.
+    """
+    defs = schema.get("$defs", {}) if defs is None else defs
+    if "$ref" in schema:
+        return _strict_schema(defs[schema["$ref"].split("/")[-1]], defs)
+    result = {key: value for key, value in schema.items() if key not in ("$defs", "title")}
+    if "properties" in schema:
+        result["properties"] = {name: _strict_schema(sub, defs) for name, sub in schema["properties"].items()}
+        result["required"] = list(schema["properties"])
+        result["additionalProperties"] = False
+    if "items" in schema:
+        result["items"] = _strict_schema(schema["items"], defs)
+    return result
+
+def _strip_code_fence(content: str) -> str:
+    """Returns the contents of a markdown code fence (closed or not), or the stripped text if there is none."""
+    text = content.strip()
+    fenced = re.search(r"```(?:json)?\s*(.*?)\s*(?:```|$)", text, re.DOTALL)
+    return fenced.group(1) if fenced else text
+
+def _repair_json(content: str) -> str:
+    """Strips code fences and surrounding prose and removes trailing commas."""
+    text = _strip_code_fence(content)
+    start, end = text.find("{"), text.rfind("}")
+    if start != -1 and end > start:
+        text = text[start:end + 1]
+    return re.sub(r",\s*([}\]])", r"\1", text)
+
+def _normalize_sentiments(data: Any) -> Any:
+    """Lower-cases and trims "sentiment" values anywhere in parsed JSON (e.g. "Positive " -> "positive")."""
+    if isinstance(data, dict):
+        return {
+            key: value.strip().lower() if key == "sentiment" and isinstance(value, str) and value.strip().lower() in _VALID_SENTIMENTS
+            else _normalize_sentiments(value)
+            for key, value in data.items()
+        }
+    if isinstance(data, list):
+        return [_normalize_sentiments(item) for item in data]
+    return data
+
+class _StructuredOutput:
+    """Parser, prompt instructions and response format for one response model."""
+
+    def __init__(self, model: Type[BaseModel]):
+        self.model = model
+        self.parser = PydanticOutputParser(pydantic_object=model)
+        self.format_instructions = self.parser.get_format_instructions()
+        self.response_format = {
+            "type": "json_schema",
+            "json_schema": {"name": model.__name__, "strict": True, "schema": _strict_schema(model.model_json_schema())},
+        }
+
+    def parse(self, content: str) -> BaseModel:
+        """
+        Parses a response into the model, repairing common formatting slips first if needed.
+
+        Raises:
+            OutputParserException: if the response can't be parsed even after repair
+        """
+        if not LLM_JSON_REPAIR:
+            return self.parser.parse(content)
+        try:
+            # A fenced but otherwise valid response counts as clean, as it did for PydanticOutputParser
+            result = self.model.model_validate(_normalize_sentiments(json.loads(_strip_code_fence(content))))
+            _count_structured_output("clean")
+            return result
+        except ValueError:
+            pass
+        try:
+            result = self.model.model_validate(_normalize_sentiments(json.loads(_repair_json(content))))
+        except ValueError as e:
+            _count_structured_output("failed")
+            raise OutputParserException(f"Failed to parse {self.model.__name__} from LLM output: {str(e)}", llm_output=content)
+        _count_structured_output("repaired")
+        logger.info(f"Repaired malformed {self.model.__name__} JSON locally instead of falling back")
+        return result
+
+@functools.lru_cache(maxsize=None)
+def _structured_output(model: Type[BaseModel]) -> _StructuredOutput:
+    return _StructuredOutput(model)
+
+def _supports_json_schema(llm: ChatOpenAI) -> bool:
+    """Whether every model behind llm (both, for a hedged client) accepts a JSON-schema response format."""
+    if LLM_STRUCTURED_OUTPUT != "json_schema":
+        return False
+    model_names = [llm.model_name] + ([llm.secondary.model_name] if isinstance(llm, _HedgedLLM) else [])
+    return all(any(name.startswith(prefix) for prefix in LLM_JSON_SCHEMA_MODEL_PREFIXES) for name in model_names)
+
+def _structured_request(llm: ChatOpenAI, model: Type[BaseModel]) -> Tuple[_StructuredOutput, str, Optional[Dict]]:
+    """
+    Returns the structured output helper for model, the format instructions to put in
+    the prompt and the response_format to send (None for prompt-only models).
+    """
+    structured = _structured_output(model)
+    if _supports_json_schema(llm):
+        return structured, NATIVE_SCHEMA_INSTRUCTIONS, structured.response_format
+    return structured, structured.format_instructions, None
+
+# ---------------------------
+# Pooled LLM client registry
+# ---------------------------
+# ChatOpenAI instances are cheap to keep but expensive to create: each one
+# builds its own HTTP client, so every new instance pays a fresh TCP/TLS
+# handshake to OpenRouter. Instead we keep one instance per
+# (model, temperature, max_tokens) for the lifetime of the process, all
+# sharing a single keep-alive connection pool (HTTP/2 when h2 is installed).
+#
+# The async pool is bound to one event loop, so all async LLM work runs on a
+# dedicated background loop owned by this module (see _run_on_llm_loop).
+
+_HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+_llm_clients: Dict[Tuple[str, float, int], ChatOpenAI] = {}
+_llm_clients_lock = threading.Lock()
+_http_client: Optional[httpx.Client] = None
+_async_http_client: Optional[httpx.AsyncClient] = None
+_llm_loop: Optional[asyncio.AbstractEventLoop] = None
+
+def _http_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=LLM_MAX_CONNECTIONS,
+        max_keepalive_connections=LLM_MAX_CONNECTIONS,
+        keepalive_expiry=LLM_KEEPALIVE_SECONDS,
+    )
+
+def _shared_http_clients() -> Tuple[httpx.Client, httpx.AsyncClient]:
+    """Returns the process-wide sync and async HTTP clients, creating them on first use."""
+    global _http_client, _async_http_client
+    if _http_client is None:
+        _http_client = httpx.Client(http2=_HTTP2_AVAILABLE, limits=_http_limits())
+        _async_http_client = httpx.AsyncClient(http2=_HTTP2_AVAILABLE, limits=_http_limits())
+    return _http_client, _async_http_client
+
+def get_llm(model_name: str, temperature: float = 1, max_tokens: int = 8192) -> ChatOpenAI:
+    """
+    Returns the shared ChatOpenAI client for the given settings, creating it on first use.
+
+    The returned client supports both the sync (invoke/stream) and async
+    (ainvoke/astream) APIs; both reuse pooled connections.
+    """
+    key = (model_name, temperature, max_tokens)
+    llm_instance = _llm_clients.get(key)
+    if llm_instance is not None:
+        return llm_instance
+
+    with _llm_clients_lock:
+        if key not in _llm_clients:
+            http_client, async_http_client = _shared_http_clients()
+            logger.debug(f"Creating pooled LLM client for {model_name} (temperature={temperature}, max_tokens={max_tokens})")
+            _llm_clients[key] = ChatOpenAI(
+                model=model_name,
+                api_key=OPENROUTER_API_KEY,
+                base_url=OPENROUTER_BASE_URL,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                # Fallback and deadlines are handled by llm_router; SDK retries would blow the deadline
+                max_retries=0,
+                # Report token usage on streamed responses too (for llm_telemetry)
+                stream_usage=True,
+                model_kwargs={
+                    "top_p": 0.95,
+                },
+                http_client=http_client,
+                http_async_client=async_http_client,
+            )
+        return _llm_clients[key]
+
+def warm_llm_clients():
+    """Creates the clients for all configured models so the first request doesn't pay for it."""
+    for task, models in TASK_MODELS.items():
+        for model_name in models:
+            get_llm(model_name, max_tokens=LLM_TASK_MAX_TOKENS[task])
+    logger.info(f"Pre-warmed {len(_llm_clients)} LLM clients (HTTP/2 {'enabled' if _HTTP2_AVAILABLE else 'unavailable'})")
+
+def _llm_event_loop() -> asyncio.AbstractEventLoop:
+    """Returns the background event loop that owns the async connection pool, starting it on first use."""
+    global _llm_loop
+    with _llm_clients_lock:
+        if _llm_loop is None:
+            _llm_loop = asyncio.new_event_loop()
+            threading.Thread(target=_llm_loop.run_forever, name="llm-event-loop", daemon=True).start()
+        return _llm_loop
+
+def _run_on_llm_loop(coro) -> Any:
+    """
+    Runs a coroutine on the LLM event loop and blocks until it finishes. The
+    coroutine runs in a copy of the caller's context, so usage tracking,
+    deadlines and a held limiter slot carry over.
+    """
+    loop = _llm_event_loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        coro.close()
+        raise RuntimeError("Blocking LLM call made on the LLM event loop; await the async entry point instead")
+    return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+async def _on_llm_loop(coro) -> Any:
+    """
+    Awaits a coroutine on the LLM event loop from any event loop, so async
+    callers share the loop's connection pool without blocking a thread.
+    """
+    loop = _llm_event_loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        return await coro
+    return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop))
+
+def spawn_on_llm_loop(coro) -> "concurrent.futures.Future":
+    """Starts a coroutine as a task on the LLM event loop and returns its future without waiting."""
+    return asyncio.run_coroutine_threadsafe(coro, _llm_event_loop())
+
+def close_llm_clients():
+    """Closes both connection pools and forgets all clients (e.g. on shutdown)."""
+    global _http_client, _async_http_client, _llm_loop
+    with _llm_clients_lock:
+        _llm_clients.clear()
+        if _http_client is not None:
+            _http_client.close()
+        if _async_http_client is not None and _llm_loop is not None:
+            asyncio.run_coroutine_threadsafe(_async_http_client.aclose(), _llm_loop).result(timeout=5)
+        if _llm_loop is not None:
+            _llm_loop.call_soon_threadsafe(_llm_loop.stop)
+        _http_client = _async_http_client = _llm_loop = None
+
+async def aclose_llm_clients():
+    """Async counterpart of close_llm_clients."""
+    await asyncio.to_thread(close_llm_clients)
+
+def create_feedback_llm(model_name: str, fallback_model: Optional[str] = None, is_fallback: bool = False,
+                        max_tokens: int = 8192) -> ChatOpenAI:
     """
-    Creates and configures the LangChain ChatOpenAI model for feedback processing via OpenRouter.
+    Returns the pooled LangChain ChatOpenAI model for feedback processing via OpenRouter.
     
     Args:
         model_name: The primary model to use (e.g., "google/gemini-2.0-flash-001")
         fallback_model: Optional fallback model to use if primary fails
         is_fallback: Whether this is a fallback attempt (for logging)
+        max_tokens: Completion token budget for the task
     
     Returns:
         ChatOpenAI instance configured for OpenRouter
     """
     model_type = "fallback" if is_fallback else "primary"
-    logger.debug(f"Creating LLM instance using {model_type} model: {model_name}")
-    
-    llm_instance = ChatOpenAI(
-        model=model_name,
-        api_key=OPENROUTER_API_KEY,
-        base_url="https://openrouter.ai/api/v1",
-        temperature=1,
-        max_tokens=8192,
-        model_kwargs={
-            "top_p": 0.95,
-        }
+    logger.debug(f"Using LLM instance for {model_type} model: {model_name}")
+    return get_llm(model_name, max_tokens=max_tokens)
+
+async def _aroute(task: str, fn: Callable[[ChatOpenAI], Awaitable[Any]], max_tokens: Optional[int] = None,
+                  deadline_seconds: Optional[float] = None) -> Any:
+    """
+    Awaits fn(llm) through the health-aware router with the task's models, deadline and token budget.
+    max_tokens and deadline_seconds override the task defaults (e.g. for batched prompts).
+    Raises llm_router.AllModelsFailed or llm_router.DeadlineExceeded if no model succeeds.
+    """
+    async def attempt(model_name: str, is_fallback: bool):
+        llm = create_feedback_llm(model_name, is_fallback=is_fallback, max_tokens=max_tokens or LLM_TASK_MAX_TOKENS[task])
+        result = await fn(llm)
+        logger.info(f"{task} completed successfully with {'fallback' if is_fallback else 'primary'} model: {model_name}")
+        return result
+
+    primary, fallback = TASK_MODELS[task]
+    return await llm_router.acall(task, primary, fallback, attempt, deadline_seconds or LLM_TASK_DEADLINES[task])
+
+# ---------------------------
+# Hedged requests
+# ---------------------------
+
+_hedge_stats = {"hedged_requests": 0, "hedges_fired": 0, "hedges_won": 0}
+_hedge_stats_lock = threading.Lock()
+
+def _count_hedge(stat: str):
+    with _hedge_stats_lock:
+        _hedge_stats[stat] += 1
+
+def hedge_stats() -> Dict[str, int]:
+    """Returns how many hedged requests were made, how often the hedge fired and how often it won."""
+    with _hedge_stats_lock:
+        return dict(_hedge_stats)
+
+def _hedge_delay(model_name: str) -> float:
+    """Seconds to wait for model_name before hedging, from its recent latency percentile."""
+    observed = llm_router.health(model_name).latency_percentile(LLM_HEDGE_PERCENTILE)
+    return max(LLM_HEDGE_MIN_DELAY_SECONDS, observed if observed is not None else LLM_HEDGE_DEFAULT_DELAY_SECONDS)
+
+class _HedgedLLM:
+    """
+    Stands in for a ChatOpenAI client in _ainvoke_llm. Each request goes to the
+    primary; if no answer arrives within the hedge delay (or the primary fails)
+    the same request is sent to the secondary, the first answer that parses is
+    used and the other request is cancelled.
+    """
+
+    def __init__(self, primary: ChatOpenAI, secondary: ChatOpenAI):
+        self.primary = primary
+        self.secondary = secondary
+        # Cache keys are derived from the primary's settings
+        self.model_name = primary.model_name
+        self.temperature = primary.temperature
+        self.max_tokens = primary.max_tokens
+        self.model_kwargs = primary.model_kwargs
+
+    async def ainvoke_parsed(self, messages: list, parse: Callable[[Any], Any], timeout: Optional[float] = None,
+                             **kwargs):
+        """
+        Sends messages to the models and returns (response, parse(response)) for the first usable answer.
+
+        A response that fails to parse counts as that model failing, so the
+        other model is still tried and hedging never answers less often than
+        falling back one model after the other would.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        _count_hedge("hedged_requests")
+
+        async def attempt(llm: ChatOpenAI):
+            health = llm_router.health(llm.model_name)
+            start = time.monotonic()
+            try:
+                timeout_kwargs = {} if deadline is None else {"timeout": max(0.001, deadline - time.monotonic())}
+                response = await llm.ainvoke(messages, **kwargs, **timeout_kwargs)
+                result = parse(response)
+            except asyncio.CancelledError:
+                health.release_probe()
+                raise
+            except Exception:
+                health.record(False, time.monotonic() - start)
+                raise
+            health.record(True, time.monotonic() - start)
+            return response, result
+
+        primary_task = asyncio.create_task(attempt(self.primary))
+        tasks = {primary_task}
+        await asyncio.wait(tasks, timeout=_hedge_delay(self.primary.model_name))
+
+        primary_succeeded = primary_task.done() and primary_task.exception() is None
+        if not primary_succeeded and llm_router.health(self.secondary.model_name).allow_request():
+            if not primary_task.done():
+                _count_hedge("hedges_fired")
+                logger.info(f"{self.primary.model_name} slow to respond, hedging with {self.secondary.model_name}")
+            tasks.add(asyncio.create_task(attempt(self.secondary)))
+
+        last_error = None
+        pending = tasks
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    for loser in pending:
+                        loser.cancel()
+                    if task is not primary_task and not primary_task.done():
+                        _count_hedge("hedges_won")
+                    return task.result()
+                last_error = task.exception()
+        raise last_error
+
+async def _aroute_hedged(task: str, fn: Callable[[ChatOpenAI], Awaitable[Any]]) -> Any:
+    """
+    Like _aroute, but each request in fn is hedged between the task's primary
+    and fallback models instead of trying them one after the other.
+    """
+    primary, fallback = TASK_MODELS[task]
+    if not llm_router.health(primary).allow_request():
+        # Primary is known to be unhealthy; plain routing sends us straight to the fallback
+        return await _aroute(task, fn)
+    max_tokens = LLM_TASK_MAX_TOKENS[task]
+    llm = _HedgedLLM(get_llm(primary, max_tokens=max_tokens), get_llm(fallback, max_tokens=max_tokens))
+    with llm_router.deadline_scope(LLM_TASK_DEADLINES[task]):
+        result = await fn(llm)
+    logger.info(f"{task} completed successfully with hedged models: {primary} / {fallback}")
+    return result
+
+# ---------------------------
+# Token usage accounting
+# ---------------------------
+
+_usage_totals: ContextVar[Optional[Dict[str, int]]] = ContextVar("llm_usage_totals", default=None)
+
+@contextmanager
+def track_llm_usage():
+    """
+    Context manager that totals LLM calls and token usage made inside it.
+
+    Example:
+        with track_llm_usage() as usage:
+            convert_feedback_text_to_themes(text)
+        print(usage["input_tokens"], usage["output_tokens"])
+    """
+    totals = {"calls": 0, "input_tokens": 0, "output_tokens": 0}
+    token = _usage_totals.set(totals)
+    try:
+        yield totals
+    finally:
+        _usage_totals.reset(token)
+
+_TIMEOUT_ERRORS = (llm_router.DeadlineExceeded, TimeoutError, httpx.TimeoutException, openai.APITimeoutError)
+
+def _request_kwargs(response_format: Optional[Dict]) -> Dict[str, Any]:
+    """Request options for an LLM call: the structured-output format and the remaining task deadline as timeout."""
+    timeout = llm_router.remaining_time()
+    if timeout is not None and timeout <= 0:
+        raise llm_router.DeadlineExceeded("LLM task deadline expired before the request was sent")
+    kwargs = {} if response_format is None else {"response_format": response_format}
+    if timeout is not None:
+        kwargs["timeout"] = timeout
+    return kwargs
+
+def _record_usage(task: str, model: str, start: float, usage: Dict, outcome: str, parse_ok: Optional[bool],
+                  process_id: Optional[str]):
+    """Adds a call's token usage to any active track_llm_usage() block and records it in llm_calls."""
+    totals = _usage_totals.get()
+    if totals is not None:
+        totals["calls"] += 1
+        totals["input_tokens"] += usage.get("input_tokens", 0)
+        totals["output_tokens"] += usage.get("output_tokens", 0)
+    llm_telemetry.record_call(
+        task, model, model != TASK_MODELS[task][0], (time.monotonic() - start) * 1000,
+        usage.get("input_tokens", 0), usage.get("output_tokens", 0), outcome, parse_ok, process_id,
     )
-    logger.debug(f"LLM instance created successfully with {model_type} model: {model_name}")
-    return llm_instance
 
-def check_theme_anonymity(themes: ThemesResponse) -> AnonymizedThemesResponse:
+class _ResponseParseError(Exception):
+    """An LLM response that parse() rejected; carries the response so its usage is still recorded."""
+
+    def __init__(self, response, error: Exception):
+        super().__init__(str(error))
+        self.response = response
+        self.error = error
+
+def _parse_response(task: str, response, parse: Callable[[str], Any]) -> Any:
+    """Returns parse(response.content), raising _ResponseParseError if it fails."""
+    logger.debug(f"Raw LLM response for {task}: {response.content}")
+    try:
+        return parse(response.content)
+    except Exception as e:
+        raise _ResponseParseError(response, e) from e
+
+def _record_response(task: str, llm: ChatOpenAI, response, start: float, outcome: str, parse_ok: Optional[bool],
+                     process_id: Optional[str]):
+    """Records a call through _record_usage, taking usage and model from the response if one arrived."""
+    usage = (getattr(response, "usage_metadata", None) or {}) if response is not None else {}
+    # A hedged request may have been answered by the secondary model
+    model = (response.response_metadata.get("model_name") if response is not None else None) or llm.model_name
+    _record_usage(task, model, start, usage, outcome, parse_ok, process_id)
+
+async def _ainvoke_llm(llm: ChatOpenAI, messages: list, task: str, parse: Callable[[str], Any],
+                       process_id: Optional[str] = None, response_format: Optional[Dict] = None) -> Any:
+    """
+    Invokes the LLM with llm.ainvoke and returns parse(response.content).
+    response_format, if given, is sent as the provider's structured-output
+    response format.
+
+    Token usage is added to any active track_llm_usage() block and the call is
+    recorded in the llm_calls telemetry table. Inside a routed call the
+    remaining task deadline is used as the request timeout.
+    """
+    kwargs = _request_kwargs(response_format)
+    response, outcome, parse_ok = None, "error", None
+    start = time.monotonic()
+    try:
+        llm_router.note_model_call()
+        if isinstance(llm, _HedgedLLM):
+            response, result = await llm.ainvoke_parsed(messages, lambda r: _parse_response(task, r, parse), **kwargs)
+        else:
+            response = await llm.ainvoke(messages, **kwargs)
+            result = _parse_response(task, response, parse)
+        outcome, parse_ok = "ok", True
+        return result
+    except _ResponseParseError as e:
+        response, outcome, parse_ok = e.response, "parse_error", False
+        raise e.error from None
+    except asyncio.CancelledError:
+        outcome = "cancelled"
+        raise
+    except Exception as e:
+        if isinstance(e, _TIMEOUT_ERRORS):
+            outcome = "timeout"
+        raise
+    finally:
+        _record_response(task, llm, response, start, outcome, parse_ok, process_id)
+
+def _cache_key(task: str, llm: ChatOpenAI, messages: list, use_cache: Optional[bool],
+               response_format: Optional[Dict]) -> Optional[str]:
+    """The LLM response cache key for a call, or None if the cache is off for it."""
+    if use_cache is None:
+        use_cache = task in LLM_CACHE_TASKS
+    if not use_cache:
+        return None
+    system_prompt, user_prompt = messages[0][1], messages[-1][1]
+    params = {"temperature": llm.temperature, "max_tokens": llm.max_tokens, **llm.model_kwargs}
+    if response_format is not None:
+        params["response_format"] = response_format
+    return llm_cache.cache_key(llm.model_name, system_prompt, user_prompt, params)
+
+async def _ainvoke_llm_cached(task: str, llm: ChatOpenAI, messages: list, parse: Callable[[str], Any],
+                              process_id: Optional[str] = None, use_cache: Optional[bool] = None,
+                              response_format: Optional[Dict] = None) -> Any:
+    """
+    Invokes the LLM and parses its response, going through the LLM response cache.
+
+    Args:
+        task: Cache task name ('themes', 'anonymity', 'summary' or 'report')
+        llm: The client to call on a cache miss
+        messages: (role, content) message pairs
+        parse: Turns the raw response content into a JSON-serialisable result
+        process_id: Process the prompt was built from, so its entries can be purged
+        use_cache: Force the cache on or off; defaults to whether task is in LLM_CACHE_TASKS
+        response_format: Optional structured-output response format to send
+    """
+    key = _cache_key(task, llm, messages, use_cache, response_format)
+    if key:
+        cached = llm_cache.get(key)
+        if cached is not None:
+            logger.debug(f"LLM cache hit for {task} with {llm.model_name}")
+            return cached
+
+    result = await _ainvoke_llm(llm, messages, task, parse, process_id, response_format)
+    if key:
+        llm_cache.put(key, result, task, process_id)
+    return result
+
+def check_theme_anonymity(themes: ThemesResponse, process_id: Optional[str] = None, use_cache: Optional[bool] = None) -> AnonymizedThemesResponse:
     """
     Analyzes themes for personally identifiable information and anonymizes if needed.
     Uses the fast model with automatic fallback support.
     
     Args:
         themes: ThemesResponse object containing positive, negative, and neutral themes
+        process_id: Process the themes belong to (used to purge cached results)
+        use_cache: Override whether the LLM response cache is used
         
     Returns:
         AnonymizedThemesResponse containing original and potentially anonymized themes
     """
-    try:
-        logger.debug("Starting theme anonymity check.")
-        
-        # Try primary model first
-        try:
-            llm = create_feedback_llm(LLM_MODEL_FAST)
-            result = _check_theme_anonymity_with_llm(llm, themes)
-            logger.info(f"Anonymity check completed successfully with primary model: {LLM_MODEL_FAST}")
-            return result
-        except Exception as e:
-            logger.warning(f"Primary model {LLM_MODEL_FAST} failed: {str(e)}. Trying fallback...")
-            
-            # Fallback to alternative model
-            llm = create_feedback_llm(LLM_MODEL_FAST_FALLBACK, is_fallback=True)
-            result = _check_theme_anonymity_with_llm(llm, themes)
-            logger.info(f"Anonymity check completed successfully with fallback model: {LLM_MODEL_FAST_FALLBACK}")
-            return result
-        
-    except Exception as e:
-        logger.error(f"Error during anonymity check (all models failed): {str(e)}")
-        return None
+    return _run_on_llm_loop(_acheck_theme_anonymity(themes, process_id, use_cache))
 
-def _check_theme_anonymity_with_llm(llm: ChatOpenAI, themes: ThemesResponse) -> AnonymizedThemesResponse:
-    """
-    Internal function to perform anonymity check with a given LLM instance.
-    """
-    parser = PydanticOutputParser(pydantic_object=AnonymizedThemesResponse)
-    format_instructions = parser.get_format_instructions()
-    
+def _anonymity_messages(themes: ThemesResponse, format_instructions: str) -> list:
     prompt = f"""Analyze these feedback themes for personally identifiable information or specific events that could identify individuals.
 For each theme:
 1. Check for:
@@ -155,61 +714,159 @@ Example transformations:
 
 Themes to analyze:
 {json.dumps(themes.dict(), indent=2)}"""
-
-    logger.debug("Sending prompt to LLM for anonymity check.")
-    messages = [
+    return [
         ("system", "You are a helpful assistant who helps collect and anonymise 360 feedback requests."),
         ("human", prompt)
     ]
-    response = llm.invoke(messages)
-    logger.debug("Received response from LLM for anonymity check.")
-    
-    result = parser.parse(response.content)
-    logger.debug("Anonymity check completed successfully.")
-    return result
 
-def convert_feedback_text_to_themes(feedback_text: str) -> Optional[Dict[str, List[str]]]:
+def convert_feedback_text_to_themes(feedback_text: str, mode: Optional[str] = None, process_id: Optional[str] = None,
+                                    use_cache: Optional[bool] = None) -> Optional[Dict[str, List[str]]]:
     """
     Process feedback text using LangChain and OpenRouter to extract themes and sentiments.
     Uses the fast model with automatic fallback support.
+
+    Feedback longer than FEEDBACK_TEXT_MAX_CHARS is truncated. Feedback longer
+    than THEME_CHUNK_MIN_CHARS is split on paragraph boundaries and its chunks
+    are processed in parallel (see _aconvert_long_feedback_text), so latency
+    follows the chunk size rather than the total length.
+
+    Runs aconvert_feedback_text_to_themes' implementation on the LLM event loop
+    and blocks until it finishes.
     
     Args:
         feedback_text: The raw feedback text to process.
+        mode: Theme pipeline mode, "strict" (extract, then a separate anonymity check)
+            or "single" (one combined call). Defaults to THEME_PIPELINE_MODE.
+        process_id: Process the feedback belongs to (used to purge cached results)
+        use_cache: Override whether the LLM response cache is used
     
     Returns:
         Dictionary containing positive, negative, and neutral theme lists,
         or None if processing fails.
     """
-    try:
-        logger.debug("Starting to convert feedback text to themes.")
-        
-        # Try primary model first
-        try:
-            llm = create_feedback_llm(LLM_MODEL_FAST)
-            result = _convert_feedback_with_llm(llm, feedback_text)
-            logger.info(f"Feedback conversion completed successfully with primary model: {LLM_MODEL_FAST}")
-            return result
-        except Exception as e:
-            logger.warning(f"Primary model {LLM_MODEL_FAST} failed: {str(e)}. Trying fallback...")
-            
-            # Fallback to alternative model
-            llm = create_feedback_llm(LLM_MODEL_FAST_FALLBACK, is_fallback=True)
-            result = _convert_feedback_with_llm(llm, feedback_text)
-            logger.info(f"Feedback conversion completed successfully with fallback model: {LLM_MODEL_FAST_FALLBACK}")
-            return result
-        
-    except Exception as e:
-        logger.error(f"Error processing feedback (all models failed): {str(e)}")
-        return None
+    return _run_on_llm_loop(_aconvert_feedback(feedback_text, mode, process_id, use_cache))
+
+# ---------------------------
+# Long feedback
+# ---------------------------
+
+def _cap_feedback_text(feedback_text: str) -> str:
+    if len(feedback_text) > FEEDBACK_TEXT_MAX_CHARS:
+        logger.warning(f"Feedback text of {len(feedback_text)} chars truncated to {FEEDBACK_TEXT_MAX_CHARS} chars")
+        return feedback_text[:FEEDBACK_TEXT_MAX_CHARS]
+    return feedback_text
 
-def _convert_feedback_with_llm(llm: ChatOpenAI, feedback_text: str) -> Dict[str, List[str]]:
+def _needs_chunking(feedback_text: str) -> bool:
+    return THEME_CHUNK_MIN_CHARS > 0 and len(feedback_text) > THEME_CHUNK_MIN_CHARS
+
+def _pack(units: List[str], separator: str, max_chars: int) -> List[str]:
+    """Joins consecutive units into pieces of at most max_chars (a single longer unit stays whole)."""
+    pieces, current = [], ""
+    for unit in units:
+        if current and len(current) + len(separator) + len(unit) > max_chars:
+            pieces.append(current)
+            current = unit
+        else:
+            current = f"{current}{separator}{unit}" if current else unit
+    if current:
+        pieces.append(current)
+    return pieces
+
+def split_feedback_text(feedback_text: str, chunk_chars: int) -> List[str]:
     """
-    Internal function to convert feedback to themes with a given LLM instance.
+    Splits feedback into chunks of at most chunk_chars on paragraph boundaries.
+    A paragraph longer than chunk_chars is split between sentences, and a
+    sentence longer than that between words.
+
+    Args:
+        feedback_text: The raw feedback text
+        chunk_chars: Maximum chunk length
+
+    Returns:
+        The chunks, in order
     """
-    # Create a structured output parser using the Pydantic model
-    parser = PydanticOutputParser(pydantic_object=ThemesResponse)
-    format_instructions = parser.get_format_instructions()
-    
+    units = []
+    for paragraph in re.split(r"\n\s*\n", feedback_text):
+        paragraph = paragraph.strip()
+        if len(paragraph) <= chunk_chars:
+            units.extend([paragraph] if paragraph else [])
+            continue
+        sentences = []
+        for sentence in re.split(r"(?<=[.!?])\s+", paragraph):
+            sentences.extend([sentence] if len(sentence) <= chunk_chars else _pack(sentence.split(), " ", chunk_chars))
+        units.extend(_pack(sentences, " ", chunk_chars))
+    return _pack(units, "\n\n", chunk_chars)
+
+def _theme_key(theme: str) -> str:
+    return " ".join(re.sub(r"[^\w\s]", "", theme).casefold().split())
+
+def merge_chunk_themes(results: List[Dict[str, List[str]]]) -> Dict[str, List[str]]:
+    """
+    Merges the themes extracted from the chunks of one submission, dropping
+    repeats: exact duplicates always, near-duplicates too when
+    THEME_CLUSTERING_ENABLED (keeping one theme per cluster).
+
+    Args:
+        results: Positive/negative/neutral theme lists, one per chunk, in chunk order
+
+    Returns:
+        A single positive/negative/neutral dictionary, in order of first mention
+    """
+    merged = {}
+    for sentiment in ["positive", "negative", "neutral"]:
+        themes, seen = [], set()
+        for result in results:
+            for theme in result.get(sentiment) or []:
+                key = _theme_key(theme)
+                if key and key not in seen:
+                    seen.add(key)
+                    themes.append(theme)
+        if THEME_CLUSTERING_ENABLED and len(themes) > 1:
+            clusters = sorted(cluster_themes(themes, THEME_CLUSTER_THRESHOLD), key=lambda members: members.min())
+            themes = [themes[members[0]] for members in clusters]
+        merged[sentiment] = themes
+    return merged
+
+def _anonymized_themes_to_dict(anonymized_result: AnonymizedThemesResponse) -> Dict[str, List[str]]:
+    """
+    Converts anonymized themes back to the positive/negative/neutral dictionary format.
+    """
+    result = {"positive": [], "negative": [], "neutral": []}
+    for theme in anonymized_result.themes:
+        theme_text = theme.anonymized if theme.needs_anonymization else theme.original
+        result[theme.sentiment.strip().lower()].append(theme_text)
+    return result
+
+_pii_prescreen_stats = {"theme_lists": 0, "lists_skipped": 0, "themes": 0, "themes_flagged": 0}
+_pii_prescreen_lock = threading.Lock()
+
+def pii_prescreen_stats() -> Dict[str, Any]:
+    """Returns how many theme lists and themes the local PII screen saw, and how many anonymity calls it saved."""
+    with _pii_prescreen_lock:
+        stats = dict(_pii_prescreen_stats)
+    stats["skip_rate"] = round(stats["lists_skipped"] / stats["theme_lists"], 3) if stats["theme_lists"] else 0.0
+    return stats
+
+def _prescreen_themes(themes: ThemesResponse) -> Tuple[ThemesResponse, ThemesResponse]:
+    """
+    Splits themes into those the local PII screen flags (which need the anonymity
+    check) and those it clears.
+    """
+    flagged = {"positive": [], "negative": [], "neutral": []}
+    cleared = {"positive": [], "negative": [], "neutral": []}
+    for sentiment in flagged:
+        for theme in getattr(themes, sentiment) or []:
+            (flagged if pii_detector.might_identify(theme) else cleared)[sentiment].append(theme)
+
+    flagged_count = sum(len(v) for v in flagged.values())
+    with _pii_prescreen_lock:
+        _pii_prescreen_stats["theme_lists"] += 1
+        _pii_prescreen_stats["lists_skipped"] += flagged_count == 0
+        _pii_prescreen_stats["themes"] += flagged_count + sum(len(v) for v in cleared.values())
+        _pii_prescreen_stats["themes_flagged"] += flagged_count
+    return ThemesResponse(**flagged), ThemesResponse(**cleared)
+
+def _themes_messages(feedback_text: str, format_instructions: str) -> list:
     prompt = f"""Please read the feedback paragraph below, and convert it into a series of positive, negative, and neutral traits.
 Each trait should be a single sentence. Ensure that the feedback is totally anonymous.
 Examples:
@@ -232,57 +889,227 @@ Return the output in JSON format as described below.
 
 Feedback:
 {feedback_text}"""
-    
-    logger.debug("Sending prompt to LLM for feedback conversion.")
-    messages = [
+    return [
         ("system", "You are a helpful assistant who helps collect and anonymise 360 feedback requests."),
         ("human", prompt)
     ]
-    response = llm.invoke(messages)
-    logger.debug("Received response from LLM for feedback conversion.")
-    logger.debug(f"Raw LLM response: {response.content}")
-    
-    # Parse the structured output using the Pydantic model
-    initial_themes = parser.parse(response.content)
+
+def _themes_to_check(initial_themes: ThemesResponse) -> Tuple[Optional[ThemesResponse], ThemesResponse]:
+    """
+    Splits extracted themes into those that need the anonymity check and those
+    the local PII screen cleared. The first is None if no check is needed.
+    """
     # Ensure all required keys even if empty lists
     for key in ["positive", "negative", "neutral"]:
         if getattr(initial_themes, key) is None:
             setattr(initial_themes, key, [])
-    
-    # Check themes for PII and anonymize if needed
-    logger.debug("Checking themes for personally identifiable information.")
-    anonymized_result = check_theme_anonymity(initial_themes)
-    
+
+    # Only themes the local screen flags as possibly identifying go to the anonymity check
+    to_check, cleared = initial_themes, ThemesResponse(positive=[], negative=[], neutral=[])
+    if PII_PRESCREEN_ENABLED:
+        to_check, cleared = _prescreen_themes(initial_themes)
+        if not (to_check.positive or to_check.negative or to_check.neutral):
+            logger.debug("No themes flagged by the PII screen; skipping the anonymity check.")
+            return None, cleared
+    return to_check, cleared
+
+def _merge_anonymized(initial_themes: ThemesResponse, cleared: ThemesResponse,
+                      anonymized_result: Optional[AnonymizedThemesResponse]) -> Dict[str, List[str]]:
+    """Combines the anonymity check's output with the themes the PII screen cleared."""
     if anonymized_result:
-        # Convert anonymized themes back to the original format
-        result = {"positive": [], "negative": [], "neutral": []}
-        for theme in anonymized_result.themes:
-            theme_text = theme.anonymized if theme.needs_anonymization else theme.original
-            result[theme.sentiment].append(theme_text)
+        result = _anonymized_themes_to_dict(anonymized_result)
+        for sentiment, themes in cleared.dict().items():
+            result[sentiment] = themes + result[sentiment]
         logger.debug("Themes processed and anonymized successfully.")
         return result
     else:
         logger.debug("Anonymization check failed, returning original themes.")
         return initial_themes.dict()
 
-def generate_completed_feedback_report(feedback_input: str) -> tuple[str, str]:
+def _single_call_messages(feedback_text: str, format_instructions: str) -> list:
+    prompt = f"""Please read the feedback paragraph below, and convert it into a series of positive, negative, and neutral traits.
+Each trait should be a single sentence, addressed to the recipient ("You ...").
+
+For each trait:
+1. Record the trait as written in "original" and its sentiment (positive/negative/neutral).
+2. Check it for:
+   - Names of people, teams, or organizations
+   - Specific events or dates
+   - Unique situations or projects
+   - Client or stakeholder references
+3. If any are found, set "needs_anonymization" to true and write an "anonymized" version that preserves
+   the core feedback while removing identifying details. Otherwise set it to false and repeat the original.
+
+Example traits:
+- Positive: "You thrive under pressure"
+- Negative: "You can let your temper get the better of you"
+- Neutral: "You tend to work independently"
+
+Example anonymization:
+- Original: "You helped John from Marketing with the Q4 campaign"
+  Anonymized: "You provided valuable support to colleagues with major marketing campaigns"
+
+{format_instructions}
+
+Feedback:
+{feedback_text}"""
+    return [
+        ("system", "You are a helpful assistant who helps collect and anonymise 360 feedback requests."),
+        ("human", prompt)
+    ]
+
+def convert_feedback_batch_to_themes(feedback_texts: List[str], process_ids: Optional[List[Optional[str]]] = None) -> List[Optional[Dict[str, List[str]]]]:
     """
-    Takes formatted feedback data and generates a comprehensive feedback report using OpenRouter.
-    Uses the reasoning model with automatic fallback support.
+    Extracts anonymized themes from several feedback texts with a single batched prompt.
+
+    Items the batched call fails to return are retried one at a time with
+    convert_feedback_text_to_themes. Batched calls bypass the response cache,
+    since one entry would mix feedback from several processes.
 
     Args:
-        feedback_input: Formatted string containing feedback data with quality ratings and themed feedback.
+        feedback_texts: The raw feedback texts to process.
+        process_ids: Optional process id for each text (used for the per-item retries).
 
     Returns:
-        A tuple of:
-            1) The prompt sent to the LLM
-            2) The markdown-formatted feedback report string.
+        One themes dictionary (or None if processing failed) per input text, in order.
     """
-    try:
-        logger.debug("Starting generation of complete feedback report.")
+    return _run_on_llm_loop(_aconvert_feedback_batch(feedback_texts, process_ids))
+
+@llm_limiter.limited(BACKGROUND)
+async def _aconvert_feedback_batch(feedback_texts: List[str],
+                                   process_ids: Optional[List[Optional[str]]] = None) -> List[Optional[Dict[str, List[str]]]]:
+    process_ids = process_ids or [None] * len(feedback_texts)
+    results: List[Optional[Dict[str, List[str]]]] = [None] * len(feedback_texts)
+    if len(feedback_texts) > 1:
+        try:
+            results = await _aroute(
+                "themes",
+                lambda llm: _aconvert_feedback_batch_with_llm(llm, feedback_texts),
+                max_tokens=LLM_TASK_MAX_TOKENS["themes"] * len(feedback_texts),
+                deadline_seconds=LLM_TASK_DEADLINES["themes"] * len(feedback_texts),
+            )
+        except Exception as e:
+            logger.warning(f"Batched theme extraction failed for {len(feedback_texts)} items: {str(e)}")
+
+    missing = [i for i, result in enumerate(results) if result is None]
+    if missing and len(feedback_texts) > 1:
+        logger.info(f"Retrying {len(missing)} of {len(feedback_texts)} batched items individually")
+    for i in missing:
+        results[i] = await _aconvert_feedback(feedback_texts[i], process_id=process_ids[i])
+    return results
+
+async def _aconvert_feedback_batch_with_llm(llm: ChatOpenAI, feedback_texts: List[str]) -> List[Optional[Dict[str, List[str]]]]:
+    """
+    Internal function to extract anonymized themes for several feedback texts in one LLM call.
+    """
+    structured, format_instructions, response_format = _structured_request(llm, BatchedThemesResponse)
+    numbered_feedback = "\n\n".join(f"Feedback item {i}:\n{text}" for i, text in enumerate(feedback_texts, start=1))
+
+    prompt = f"""Below are {len(feedback_texts)} separate feedback items, each about the same kind of 360 review.
+Treat every item independently. For each item, convert its feedback into a series of positive, negative, and neutral traits.
+Each trait should be a single sentence, addressed to the recipient ("You ...").
+
+For each trait:
+1. Record the trait as written in "original" and its sentiment (positive/negative/neutral).
+2. If it contains names of people, teams or organizations, specific events or dates, unique projects,
+   or client references, set "needs_anonymization" to true and write an "anonymized" version that
+   keeps the core feedback but removes the identifying details. Otherwise set it to false and repeat the original.
+
+Return one entry per feedback item, using the item's number as "index".
+
+{format_instructions}
+
+{numbered_feedback}"""
+
+    logger.debug(f"Sending batched prompt to LLM for {len(feedback_texts)} feedback items.")
+    messages = [
+        ("system", "You are a helpful assistant who helps collect and anonymise 360 feedback requests."),
+        ("human", prompt)
+    ]
+    parsed = await _ainvoke_llm(llm, messages, "themes", structured.parse, response_format=response_format)
+
+    results: List[Optional[Dict[str, List[str]]]] = [None] * len(feedback_texts)
+    for item in parsed.items:
+        if 1 <= item.index <= len(feedback_texts):
+            results[item.index - 1] = _anonymized_themes_to_dict(AnonymizedThemesResponse(themes=item.themes))
+    return results
+
+# ---------------------------
+# Map-reduce report summaries
+# ---------------------------
+# For large processes the report input is split into sections (one per
+# respondent group, or part of one), each section is summarised by the fast
+# model in parallel, and the reasoning model writes the report from the
+# summaries. See build_report_input in main.py.
+
+def build_section_summary_prompt(section: str) -> str:
+    """
+    Builds the prompt that condenses one section of report input for the final report.
+    """
+    return f"""
+You are helping a coach prepare a personal development feedback report. Below are the ratings and feedback themes from one group of respondents.
+
+Summarise them in at most 200 words of markdown bullet points, covering:
+- The main strengths, and how widely each was mentioned
+- The main areas for improvement, and how widely each was mentioned
+- Anything notable in the ratings (particularly high or low averages, or a wide spread)
+
+Keep the figures that matter (average ratings, how many respondents raised a point). Do not add advice, an introduction or anything the data does not support, and do not identify any individual.
+
+Feedback Data:
+{section}
+"""
 
-        # Create a structured prompt emphasizing the layout and confidentiality
-        prompt = f"""
+def _summary_messages(section: str) -> list:
+    return [
+        ("system", "You summarise feedback data accurately and concisely."),
+        ("human", build_section_summary_prompt(section))
+    ]
+
+def summarize_report_sections(sections: Dict[str, str], process_id: Optional[str] = None,
+                              use_cache: Optional[bool] = None) -> Dict[str, str]:
+    """
+    Map step of map-reduce report generation: summarises every section with the
+    fast model, in parallel, so the wall-clock time is that of the slowest section.
+
+    Each section takes its own interactive limiter slot, so call this without
+    holding one. A section whose summary fails on every model is returned
+    unsummarised, so the report still covers it.
+
+    Args:
+        sections: Section title -> report input text for that section
+        process_id: Process the sections were built from (used to purge cached results)
+        use_cache: Override whether the LLM response cache is used
+
+    Returns:
+        Section title -> markdown summary, in the order of sections
+    """
+    if not sections:
+        return {}
+    return _run_on_llm_loop(_asummarize_report_sections(sections, process_id, use_cache))
+
+async def _asummarize_report_sections(sections: Dict[str, str], process_id: Optional[str] = None,
+                                      use_cache: Optional[bool] = None) -> Dict[str, str]:
+    concurrency = asyncio.Semaphore(max(REPORT_MAP_CONCURRENCY, 1))
+
+    async def summarize(title: str, section: str) -> Tuple[str, str]:
+        try:
+            async with concurrency, llm_limiter.aslot(INTERACTIVE):
+                summary = await _aroute("summary", lambda llm: _ainvoke_llm_cached(
+                    "summary", llm, _summary_messages(section), clean_markdown, process_id, use_cache))
+            return title, summary
+        except Exception as e:
+            logger.warning(f"Summary of report section '{title}' failed, using it unsummarised: {str(e)}")
+            return title, section
+
+    return dict(await asyncio.gather(*(summarize(title, section) for title, section in sections.items())))
+
+def build_feedback_report_prompt(feedback_input: str) -> str:
+    """
+    Builds the report-generation prompt for the given formatted feedback data.
+    """
+    # Create a structured prompt emphasizing the layout and confidentiality
+    return f"""
 You are a professional coach specializing in personal development. Your task is to create a well-structured, concise, and constructive feedback report in **markdown format**, based on the feedback information provided below.
 
 ## Important Instructions
@@ -320,42 +1147,324 @@ Start your report with this line
 **Introduction:**
 """
 
-        # Try primary model first
-        try:
-            logger.debug(f"Attempting report generation with primary model: {LLM_MODEL_REASONING}")
-            llm = create_feedback_llm(LLM_MODEL_REASONING)
-            markdown_output = _generate_report_with_llm(llm, prompt)
-            logger.info(f"Report generation completed successfully with primary model: {LLM_MODEL_REASONING}")
-            return prompt, markdown_output
-        except Exception as e:
-            logger.warning(f"Primary model {LLM_MODEL_REASONING} failed: {str(e)}. Trying fallback...")
-            
-            # Fallback to alternative model
-            llm = create_feedback_llm(LLM_MODEL_REASONING_FALLBACK, is_fallback=True)
-            markdown_output = _generate_report_with_llm(llm, prompt)
-            logger.info(f"Report generation completed successfully with fallback model: {LLM_MODEL_REASONING_FALLBACK}")
-            return prompt, markdown_output
+def generate_completed_feedback_report(feedback_input: str, process_id: Optional[str] = None,
+                                       use_cache: Optional[bool] = None) -> tuple[str, str]:
+    """
+    Takes formatted feedback data and generates a comprehensive feedback report using OpenRouter.
+    Uses the reasoning model with automatic fallback support.
+
+    Args:
+        feedback_input: Formatted string containing feedback data with quality ratings and themed feedback.
+        process_id: Process the report is for (used to purge cached results)
+        use_cache: Override whether the LLM response cache is used
+
+    Returns:
+        A tuple of:
+            1) The prompt sent to the LLM
+            2) The markdown-formatted feedback report string.
+    """
+    return _run_on_llm_loop(_agenerate_completed_feedback_report(feedback_input, process_id, use_cache))
+
+def _report_messages(prompt: str) -> list:
+    return [
+        ("system", "You are a professional coach specializing in personal development."),
+        ("human", prompt)
+    ]
+
+def report_prompt_version() -> str:
+    """
+    Short hash of the report prompt template, its system prompt and the section
+    summary prompt. It changes whenever any of them is edited, so report input
+    fingerprints (see report_jobs.report_fingerprint) are per template version.
+    """
+    templates = [_report_messages(build_feedback_report_prompt("{feedback_input}")), _summary_messages("{section}")]
+    return hashlib.sha256(json.dumps(templates).encode()).hexdigest()[:12]
 
+def stream_completed_feedback_report(feedback_input: str, process_id: Optional[str] = None,
+                                     use_cache: Optional[bool] = None,
+                                     queue_status: bool = False) -> Iterator[Union[str, QueueStatus]]:
+    """
+    Streaming counterpart of generate_completed_feedback_report: yields the
+    markdown report in chunks as the model produces them.
+
+    The stream first waits for an interactive slot in the LLM limiter. With
+    queue_status=True a QueueStatus is yielded every
+    LLM_QUEUE_STATUS_INTERVAL_SECONDS while it waits, so the caller can show
+    that the report is queued rather than stalled.
+
+    The stream runs on the LLM event loop; each chunk is handed to the calling thread.
+
+    Raises:
+        llm_router.AllModelsFailed: if no model could produce the report
+    """
+    stream = _astream_completed_feedback_report(feedback_input, process_id, use_cache, queue_status)
+    try:
+        while True:
+            try:
+                chunk = _run_on_llm_loop(stream.__anext__())
+            except StopAsyncIteration:
+                return
+            yield chunk
+    finally:
+        _run_on_llm_loop(stream.aclose())
+
+# ---------------------------
+# Async entry points
+# ---------------------------
+# Awaitable counterparts of the entry points above, for async route handlers,
+# and the one implementation behind both. Model calls are made with
+# ainvoke/astream on the LLM event loop, so waiting on a model holds no worker
+# thread; the sync entry points run the same coroutines there and block until
+# they finish.
+
+async def acheck_theme_anonymity(themes: ThemesResponse, process_id: Optional[str] = None,
+                                 use_cache: Optional[bool] = None) -> Optional[AnonymizedThemesResponse]:
+    """Async counterpart of check_theme_anonymity."""
+    return await _on_llm_loop(_acheck_theme_anonymity(themes, process_id, use_cache))
+
+@llm_limiter.limited(BACKGROUND)
+async def _acheck_theme_anonymity(themes: ThemesResponse, process_id: Optional[str] = None,
+                                  use_cache: Optional[bool] = None) -> Optional[AnonymizedThemesResponse]:
+    try:
+        logger.debug("Starting theme anonymity check.")
+        return await _aroute("anonymity", lambda llm: _acheck_theme_anonymity_with_llm(llm, themes, process_id, use_cache))
+    except Exception as e:
+        logger.error(f"Error during anonymity check (all models failed): {str(e)}")
+        return None
+
+async def _acheck_theme_anonymity_with_llm(llm: ChatOpenAI, themes: ThemesResponse, process_id: Optional[str] = None,
+                                           use_cache: Optional[bool] = None) -> AnonymizedThemesResponse:
+    structured, format_instructions, response_format = _structured_request(llm, AnonymizedThemesResponse)
+    messages = _anonymity_messages(themes, format_instructions)
+    return AnonymizedThemesResponse(**await _ainvoke_llm_cached(
+        "anonymity", llm, messages, lambda content: structured.parse(content).dict(), process_id, use_cache,
+        response_format
+    ))
+
+async def aconvert_feedback_text_to_themes(feedback_text: str, mode: Optional[str] = None, process_id: Optional[str] = None,
+                                           use_cache: Optional[bool] = None) -> Optional[Dict[str, List[str]]]:
+    """Async counterpart of convert_feedback_text_to_themes, including the chunked path for long feedback."""
+    return await _on_llm_loop(_aconvert_feedback(feedback_text, mode, process_id, use_cache))
+
+async def _aconvert_feedback(feedback_text: str, mode: Optional[str] = None, process_id: Optional[str] = None,
+                             use_cache: Optional[bool] = None) -> Optional[Dict[str, List[str]]]:
+    """Caps the feedback and extracts its themes, in chunks if it is long."""
+    feedback_text = _cap_feedback_text(feedback_text)
+    if _needs_chunking(feedback_text):
+        return await _aconvert_long_feedback_text(feedback_text, mode, process_id, use_cache)
+    return await _aconvert_feedback_text_to_themes(feedback_text, mode, process_id, use_cache)
+
+@llm_limiter.limited(BACKGROUND)
+async def _aconvert_feedback_text_to_themes(feedback_text: str, mode: Optional[str] = None, process_id: Optional[str] = None,
+                                            use_cache: Optional[bool] = None) -> Optional[Dict[str, List[str]]]:
+    try:
+        logger.debug("Starting to convert feedback text to themes.")
+        route = _aroute_hedged if LLM_HEDGE_THEMES else _aroute
+        return await route("themes", lambda llm: _aconvert_feedback_with_llm(llm, feedback_text, mode, process_id, use_cache))
+    except Exception as e:
+        logger.error(f"Error processing feedback (all models failed): {str(e)}")
+        return None
+
+async def _aconvert_feedback_with_llm(llm: ChatOpenAI, feedback_text: str, mode: Optional[str] = None,
+                                      process_id: Optional[str] = None, use_cache: Optional[bool] = None) -> Dict[str, List[str]]:
+    mode = mode or THEME_PIPELINE_MODE
+    if mode == "single":
+        return await _aextract_anonymized_themes_with_llm(llm, feedback_text, process_id, use_cache)
+    if mode != "strict":
+        raise ValueError(f"Unknown theme pipeline mode: {mode}")
+
+    initial_themes = await _aextract_themes_with_llm(llm, feedback_text, process_id, use_cache)
+    to_check, cleared = _themes_to_check(initial_themes)
+    if to_check is None:
+        return cleared.dict()
+    anonymized_result = await _acheck_theme_anonymity(to_check, process_id, use_cache)
+    return _merge_anonymized(initial_themes, cleared, anonymized_result)
+
+async def _aextract_themes_with_llm(llm: ChatOpenAI, feedback_text: str, process_id: Optional[str] = None,
+                                    use_cache: Optional[bool] = None) -> ThemesResponse:
+    structured, format_instructions, response_format = _structured_request(llm, ThemesResponse)
+    return ThemesResponse(**await _ainvoke_llm_cached(
+        "themes", llm, _themes_messages(feedback_text, format_instructions),
+        lambda content: structured.parse(content).dict(), process_id, use_cache, response_format
+    ))
+
+async def _aextract_anonymized_themes_with_llm(llm: ChatOpenAI, feedback_text: str, process_id: Optional[str] = None,
+                                               use_cache: Optional[bool] = None) -> Dict[str, List[str]]:
+    structured, format_instructions, response_format = _structured_request(llm, AnonymizedThemesResponse)
+    return await _ainvoke_llm_cached(
+        "themes", llm, _single_call_messages(feedback_text, format_instructions),
+        lambda content: _anonymized_themes_to_dict(structured.parse(content)), process_id, use_cache, response_format
+    )
+
+async def _aextract_chunk_themes(chunk: str, mode: str, process_id: Optional[str],
+                                 use_cache: Optional[bool]) -> Dict[str, List[str]]:
+    """Extracts one chunk's themes in its own limiter slot (anonymized already in single mode)."""
+    route = _aroute_hedged if LLM_HEDGE_THEMES else _aroute
+    async with llm_limiter.aslot(BACKGROUND):
+        if mode == "single":
+            return await route("themes", lambda llm: _aextract_anonymized_themes_with_llm(llm, chunk, process_id, use_cache))
+        return (await route("themes", lambda llm: _aextract_themes_with_llm(llm, chunk, process_id, use_cache))).dict()
+
+async def _aconvert_long_feedback_text(feedback_text: str, mode: Optional[str] = None, process_id: Optional[str] = None,
+                                       use_cache: Optional[bool] = None) -> Optional[Dict[str, List[str]]]:
+    """
+    Chunked counterpart of _aconvert_feedback_text_to_themes: extracts themes
+    from up to THEME_CHUNK_CONCURRENCY chunks at a time, merges them, then runs
+    a single anonymity check over the merged themes (strict mode).
+
+    Each chunk takes its own limiter slot unless the caller already holds one,
+    in which case the chunks share it. If any chunk fails the whole extraction
+    fails, so no part of the feedback is silently dropped; chunks that did
+    succeed are served from the response cache on retry.
+    """
+    mode = mode or THEME_PIPELINE_MODE
+    concurrency = asyncio.Semaphore(max(THEME_CHUNK_CONCURRENCY, 1))
+
+    async def extract(chunk: str) -> Dict[str, List[str]]:
+        async with concurrency:
+            return await _aextract_chunk_themes(chunk, mode, process_id, use_cache)
+
+    try:
+        if mode not in ("strict", "single"):
+            raise ValueError(f"Unknown theme pipeline mode: {mode}")
+        chunks = split_feedback_text(feedback_text, THEME_CHUNK_CHARS)
+        logger.info(f"Extracting themes from {len(feedback_text)} chars of feedback in {len(chunks)} chunks")
+        start = time.perf_counter()
+        merged = merge_chunk_themes(await asyncio.gather(*(extract(chunk) for chunk in chunks)))
+        logger.info(f"Extracted themes from {len(chunks)} chunks in {time.perf_counter() - start:.1f}s")
+        if mode == "single":
+            return merged
+
+        initial_themes = ThemesResponse(**merged)
+        to_check, cleared = _themes_to_check(initial_themes)
+        if to_check is None:
+            return cleared.dict()
+        return _merge_anonymized(initial_themes, cleared, await _acheck_theme_anonymity(to_check, process_id, use_cache))
+    except Exception as e:
+        logger.error(f"Error processing long feedback (all models failed): {str(e)}")
+        return None
+
+async def agenerate_completed_feedback_report(feedback_input: str, process_id: Optional[str] = None,
+                                              use_cache: Optional[bool] = None) -> tuple[str, str]:
+    """Async counterpart of generate_completed_feedback_report."""
+    return await _on_llm_loop(_agenerate_completed_feedback_report(feedback_input, process_id, use_cache))
+
+@llm_limiter.limited(INTERACTIVE)
+async def _agenerate_completed_feedback_report(feedback_input: str, process_id: Optional[str] = None,
+                                               use_cache: Optional[bool] = None) -> tuple[str, str]:
+    try:
+        prompt = build_feedback_report_prompt(feedback_input)
+        markdown_output = await _aroute("report", lambda llm: _ainvoke_llm_cached(
+            "report", llm, _report_messages(prompt), clean_markdown, process_id, use_cache))
+        return prompt, markdown_output
     except Exception as e:
         logger.error(f"Error generating feedback report (all models failed): {str(e)}")
         return "Error: Unable to generate feedback report. Please try again later.", ""
 
-def _generate_report_with_llm(llm: ChatOpenAI, prompt: str) -> str:
+async def astream_completed_feedback_report(feedback_input: str, process_id: Optional[str] = None,
+                                            use_cache: Optional[bool] = None,
+                                            queue_status: bool = False) -> AsyncIterator[Union[str, QueueStatus]]:
     """
-    Internal function to generate report with a given LLM instance.
+    Async counterpart of stream_completed_feedback_report. The stream itself
+    runs on the LLM event loop; each chunk is handed to the caller's loop.
+
+    Raises:
+        llm_router.AllModelsFailed: if no model could produce the report
     """
-    logger.debug("Sending prompt to LLM for feedback report generation.")
-    
-    messages = [
-        ("system", "You are a professional coach specializing in personal development."),
-        ("human", prompt)
-    ]
-    response = llm.invoke(messages)
-    
-    logger.debug("Received response from LLM for feedback report generation.")
-    logger.debug("Feedback report generated successfully.")
-    
-    # Clean up or post-process the markdown if needed
-    markdown_output = clean_markdown(response.content)
-    
-    return markdown_output
+    stream = _astream_completed_feedback_report(feedback_input, process_id, use_cache, queue_status)
+    try:
+        while True:
+            try:
+                chunk = await _on_llm_loop(stream.__anext__())
+            except StopAsyncIteration:
+                return
+            yield chunk
+    finally:
+        await _on_llm_loop(stream.aclose())
+
+async def _astream_completed_feedback_report(feedback_input: str, process_id: Optional[str] = None,
+                                             use_cache: Optional[bool] = None,
+                                             queue_status: bool = False) -> AsyncIterator[Union[str, QueueStatus]]:
+    waiter = llm_limiter.limiter.aenqueue(INTERACTIVE)
+    try:
+        while not await llm_limiter.limiter.await_slot(waiter, LLM_QUEUE_STATUS_INTERVAL_SECONDS):
+            if queue_status:
+                yield QueueStatus(llm_limiter.limiter.position(waiter), time.monotonic() - waiter.enqueued_at)
+        async for chunk in _astream_report_chunks(feedback_input, process_id, use_cache):
+            yield chunk
+    finally:
+        llm_limiter.limiter.release(waiter)
+
+async def _astream_report_chunks(feedback_input: str, process_id: Optional[str] = None,
+                                 use_cache: Optional[bool] = None) -> AsyncIterator[str]:
+    """
+    Internal generator behind the streamed report.
+
+    The primary reasoning model is used unless its circuit breaker is open.
+    If a model fails before producing any output the fallback is tried; once
+    output has been yielded, a failure is raised to the caller. The full text
+    is written to the LLM response cache when the stream completes, and a
+    cached report is yielded in one piece.
+
+    Raises:
+        llm_router.AllModelsFailed: if no model could produce the report
+    """
+    messages = _report_messages(build_feedback_report_prompt(feedback_input))
+    primary, fallback = TASK_MODELS["report"]
+    candidates = [(primary, False), (fallback, True)]
+    last_error, attempts = None, 0
+
+    for index, (model_name, is_fallback) in enumerate(candidates):
+        health = llm_router.health(model_name)
+        if not health.allow_request() and not (index == len(candidates) - 1 and attempts == 0):
+            logger.info(f"Circuit breaker open for {model_name}, skipping it for streamed report")
+            continue
+        attempts += 1
+        llm = create_feedback_llm(model_name, is_fallback=is_fallback, max_tokens=LLM_TASK_MAX_TOKENS["report"])
+
+        key = _cache_key("report", llm, messages, use_cache, None)
+        if key:
+            cached = llm_cache.get(key)
+            if cached is not None:
+                health.release_probe()
+                logger.debug(f"LLM cache hit for streamed report with {model_name}")
+                yield cached
+                return
+
+        chunks, usage = [], {}
+        start = time.monotonic()
+
+        def record(outcome: str):
+            llm_telemetry.record_call(
+                "report", model_name, is_fallback, (time.monotonic() - start) * 1000,
+                usage.get("input_tokens", 0), usage.get("output_tokens", 0), outcome, None, process_id,
+            )
+
+        try:
+            async for chunk in llm.astream(messages, timeout=LLM_TASK_DEADLINES["report"]):
+                if chunk.usage_metadata:
+                    usage = chunk.usage_metadata
+                if chunk.content:
+                    chunks.append(chunk.content)
+                    yield chunk.content
+        except (GeneratorExit, asyncio.CancelledError):
+            health.release_probe()
+            record("cancelled")
+            raise
+        except Exception as e:
+            health.record(False, time.monotonic() - start)
+            record("timeout" if isinstance(e, _TIMEOUT_ERRORS) else "error")
+            if chunks:
+                raise
+            last_error = e
+            logger.warning(f"Streamed report failed on {'fallback' if is_fallback else 'primary'} model {model_name}: {str(e)}")
+            continue
+
+        health.record(True, time.monotonic() - start)
+        record("ok")
+        logger.info(f"Streamed report completed successfully with {'fallback' if is_fallback else 'primary'} model: {model_name}")
+        if key:
+            llm_cache.put(key, clean_markdown("".join(chunks)), "report", process_id)
+        return
+
+    raise llm_router.AllModelsFailed(f"Streamed report failed on all models: {str(last_error)}")
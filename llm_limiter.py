@@ -0,0 +1,305 @@
+"""
+Process-wide limiter for outbound LLM requests, with priority lanes.
+
+Every llm_functions entry point takes a slot before calling a model. At most
+LLM_MAX_CONCURRENT_REQUESTS operations run at once, and background work
+(theme extraction, anonymity checks) may never use the last
+LLM_INTERACTIVE_RESERVED_SLOTS, so interactive report generation always has
+headroom and is served first when both lanes are queued. An optional token
+bucket (LLM_RATE_LIMIT_PER_SECOND) spaces out request starts.
+
+Time spent queued is not charged to a task's LLM deadline: slots are taken
+before llm_router starts its clock, so a burst turns into a queue rather than
+into timeouts and fallback calls. Waiters can poll position() to report a
+"queued" status while they wait.
+
+The limiter works for both threads (slot/acquire) and coroutines
+(aslot/aacquire). Slots are re-entrant within a context, so an entry point
+that calls another (e.g. theme extraction running an anonymity check) holds a
+single slot.
+"""
+
+import asyncio
+import functools
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
+
+from config import (
+    LLM_INTERACTIVE_RESERVED_SLOTS,
+    LLM_MAX_CONCURRENT_REQUESTS,
+    LLM_RATE_LIMIT_BURST,
+    LLM_RATE_LIMIT_PER_SECOND,
+)
+from utils import logger
+
+INTERACTIVE, BACKGROUND = "interactive", "background"
+_PRIORITY = {INTERACTIVE: 0, BACKGROUND: 1}
+
+
+@dataclass
+class QueueStatus:
+    """Yielded by waiters that report progress while queued for a slot."""
+    position: int          # requests that will be served first
+    waited_seconds: float
+
+
+class _Waiter:
+    __slots__ = ("lane", "key", "enqueued_at", "notify", "event", "future", "granted", "started", "cancelled")
+
+    def __init__(self, lane: str, key: tuple, notify: Optional[Callable[[], None]] = None):
+        self.lane = lane
+        self.key = key
+        self.enqueued_at = time.monotonic()
+        self.event = threading.Event()
+        self.notify = notify or self.event.set
+        self.future: Optional[asyncio.Future] = None
+        self.granted = False
+        self.started = False
+        self.cancelled = False
+
+
+class _TokenBucket:
+    """Reservation-style token bucket: reserve() returns how long the caller must wait for its token."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = max(burst, 1)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self) -> float:
+        if self.rate <= 0:
+            return 0.0
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+class PriorityLimiter:
+    """
+    Counting limiter whose queued waiters are served by lane priority, then arrival order.
+
+    Args:
+        max_concurrent: Slots shared by all lanes.
+        reserved_interactive: Slots background work may not use.
+        rate_per_second: Token bucket refill rate for request starts (0 disables it).
+        burst: Token bucket capacity.
+    """
+
+    def __init__(self, max_concurrent: int, reserved_interactive: int = 0, rate_per_second: float = 0,
+                 burst: int = 1):
+        self.max_concurrent = max(max_concurrent, 1)
+        self.background_limit = max(self.max_concurrent - reserved_interactive, 1)
+        self._bucket = _TokenBucket(rate_per_second, burst)
+        self._lock = threading.Lock()
+        self._queue = []
+        self._sequence = itertools.count()
+        self._active = {lane: 0 for lane in _PRIORITY}
+        self._stats = {lane: {"acquired": 0, "abandoned": 0, "total_wait": 0.0, "max_wait": 0.0,
+                              "max_depth": 0, "recent_waits": deque(maxlen=1000)} for lane in _PRIORITY}
+
+    def _can_run(self, lane: str) -> bool:
+        if sum(self._active.values()) >= self.max_concurrent:
+            return False
+        return lane == INTERACTIVE or self._active[BACKGROUND] < self.background_limit
+
+    def _dispatch(self):
+        """Grants slots to queued waiters in priority order. Caller holds the lock."""
+        while self._queue:
+            waiter = self._queue[0][1]
+            if waiter.cancelled:
+                heapq.heappop(self._queue)
+                continue
+            if not self._can_run(waiter.lane):
+                # Interactive waiters sort first, so a blocked head means nothing else can run either
+                break
+            heapq.heappop(self._queue)
+            self._active[waiter.lane] += 1
+            waiter.granted = True
+            waiter.notify()
+
+    def enqueue(self, lane: str, notify: Optional[Callable[[], None]] = None) -> _Waiter:
+        """Queues a request for a slot in lane; the slot may be granted immediately."""
+        waiter = _Waiter(lane, (_PRIORITY[lane], next(self._sequence)), notify)
+        with self._lock:
+            heapq.heappush(self._queue, (waiter.key, waiter))
+            depth = sum(1 for _, w in self._queue if w.lane == lane and not w.cancelled)
+            self._stats[lane]["max_depth"] = max(self._stats[lane]["max_depth"], depth)
+            self._dispatch()
+        return waiter
+
+    def _start(self, waiter: _Waiter) -> float:
+        """Records a granted waiter's queue time; returns the token bucket delay before it may start."""
+        waiter.started = True
+        waited = time.monotonic() - waiter.enqueued_at
+        stats = self._stats[waiter.lane]
+        with self._lock:
+            stats["acquired"] += 1
+            stats["total_wait"] += waited
+            stats["max_wait"] = max(stats["max_wait"], waited)
+            stats["recent_waits"].append(waited)
+        if waited >= 1:
+            logger.info(f"LLM {waiter.lane} request waited {waited:.1f}s for a slot")
+        return self._bucket.reserve()
+
+    def wait(self, waiter: _Waiter, timeout: Optional[float] = None) -> bool:
+        """
+        Waits up to timeout seconds (forever if None) for the waiter's slot, keeping
+        its place in the queue if the wait times out. Returns True once the slot is held.
+        """
+        if not waiter.event.wait(timeout):
+            return False
+        if not waiter.started:
+            time.sleep(self._start(waiter))
+        return True
+
+    def acquire(self, lane: str, timeout: Optional[float] = None) -> Optional[_Waiter]:
+        """
+        Waits up to timeout seconds (forever if None) for a slot in lane.
+
+        Returns:
+            The granted waiter, to be passed to release(), or None if the wait timed out.
+        """
+        waiter = self.enqueue(lane)
+        if self.wait(waiter, timeout):
+            return waiter
+        self.release(waiter)
+        return None
+
+    def aenqueue(self, lane: str) -> _Waiter:
+        """Like enqueue(), for a waiter that will be awaited with await_slot() on the running event loop."""
+        loop = asyncio.get_running_loop()
+        granted = loop.create_future()
+
+        def notify():
+            loop.call_soon_threadsafe(lambda: granted.done() or granted.set_result(None))
+
+        waiter = self.enqueue(lane, notify)
+        waiter.future = granted
+        return waiter
+
+    async def await_slot(self, waiter: _Waiter, timeout: Optional[float] = None) -> bool:
+        """Async counterpart of wait() for a waiter from aenqueue()."""
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), timeout)
+        except asyncio.TimeoutError:
+            return False
+        if not waiter.started:
+            await asyncio.sleep(self._start(waiter))
+        return True
+
+    async def aacquire(self, lane: str) -> _Waiter:
+        """Async counterpart of acquire(); cancelling the awaiting task withdraws the request."""
+        waiter = self.aenqueue(lane)
+        try:
+            await self.await_slot(waiter)
+        except asyncio.CancelledError:
+            self.release(waiter)
+            raise
+        return waiter
+
+    def release(self, waiter: _Waiter):
+        """Frees a granted slot, or withdraws a waiter that is still queued."""
+        with self._lock:
+            if not waiter.granted:
+                if not waiter.cancelled:
+                    waiter.cancelled = True
+                    self._stats[waiter.lane]["abandoned"] += 1
+                return
+            self._active[waiter.lane] -= 1
+            self._dispatch()
+
+    def position(self, waiter: _Waiter) -> int:
+        """Number of queued requests that will be served before this waiter (0 once granted)."""
+        with self._lock:
+            if waiter.granted:
+                return 0
+            return sum(1 for key, w in self._queue if not w.cancelled and key < waiter.key)
+
+    def stats(self) -> Dict[str, Dict]:
+        """Per-lane active and queued counts, wait-time statistics and timeouts."""
+        with self._lock:
+            result = {}
+            for lane, stats in self._stats.items():
+                waits = sorted(stats["recent_waits"])
+                result[lane] = {
+                    "active": self._active[lane],
+                    "queued": sum(1 for _, w in self._queue if w.lane == lane and not w.cancelled),
+                    "max_depth": stats["max_depth"],
+                    "acquired": stats["acquired"],
+                    "abandoned": stats["abandoned"],
+                    "avg_wait_ms": 1000 * stats["total_wait"] / stats["acquired"] if stats["acquired"] else 0.0,
+                    "p95_wait_ms": 1000 * waits[max(0, int(len(waits) * 0.95) - 1)] if waits else 0.0,
+                    "max_wait_ms": 1000 * stats["max_wait"],
+                }
+            return result
+
+
+limiter = PriorityLimiter(
+    LLM_MAX_CONCURRENT_REQUESTS, LLM_INTERACTIVE_RESERVED_SLOTS, LLM_RATE_LIMIT_PER_SECOND, LLM_RATE_LIMIT_BURST
+)
+_held: ContextVar[bool] = ContextVar("llm_slot_held", default=False)
+
+
+@contextmanager
+def slot(lane: str):
+    """Holds a limiter slot in lane for the duration of the block (re-entrant within a context)."""
+    if _held.get():
+        yield
+        return
+    waiter = limiter.acquire(lane)
+    token = _held.set(True)
+    try:
+        yield
+    finally:
+        _held.reset(token)
+        limiter.release(waiter)
+
+
+@asynccontextmanager
+async def aslot(lane: str):
+    """Async counterpart of slot()."""
+    if _held.get():
+        yield
+        return
+    waiter = await limiter.aacquire(lane)
+    token = _held.set(True)
+    try:
+        yield
+    finally:
+        _held.reset(token)
+        limiter.release(waiter)
+
+
+def limited(lane: str):
+    """Decorator that runs a function (sync or async) inside a limiter slot for lane."""
+    def decorate(fn):
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                async with aslot(lane):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with slot(lane):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def stats() -> Dict[str, Dict]:
+    """Queue-depth and wait-time metrics for each lane of the shared limiter."""
+    return limiter.stats()
@@ -0,0 +1,287 @@
+"""
+Health-aware routing between primary and fallback LLM models.
+
+Each model has a rolling window of call outcomes and latencies. When a
+model's error rate over the window crosses LLM_BREAKER_ERROR_RATE its circuit
+breaker opens and calls go straight to the fallback, instead of paying the
+primary's full timeout on every request. After LLM_BREAKER_COOLDOWN_SECONDS
+the breaker goes half-open and lets a single probe call through: success
+closes it, failure re-opens it.
+
+Every routed call also runs under a task deadline. The deadline is published
+through a context variable so the code that actually talks to the model
+(llm_functions._ainvoke_llm) can turn it into a request timeout, and so nested
+calls never outlive their parent.
+"""
+
+import asyncio
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
+
+from config import (
+    LLM_HEALTH_WINDOW_SECONDS,
+    LLM_BREAKER_ERROR_RATE,
+    LLM_BREAKER_MIN_CALLS,
+    LLM_BREAKER_COOLDOWN_SECONDS,
+    LLM_PRIMARY_DEADLINE_SHARE,
+)
+from utils import logger
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+class DeadlineExceeded(Exception):
+    """Raised when a task's deadline expires before a model could be tried."""
+
+class AllModelsFailed(Exception):
+    """Raised when every candidate model for a task failed."""
+
+class ModelHealth:
+    """Rolling error rate, latency and circuit breaker state for one model."""
+
+    def __init__(self, model: str):
+        self.model = model
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.samples = deque()  # (timestamp, ok, latency_seconds)
+        self.lock = threading.Lock()
+
+    def _trim(self, now: float):
+        while self.samples and self.samples[0][0] < now - LLM_HEALTH_WINDOW_SECONDS:
+            self.samples.popleft()
+
+    def allow_request(self) -> bool:
+        """Returns whether a call may be sent to this model right now."""
+        with self.lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.monotonic() - self.opened_at >= LLM_BREAKER_COOLDOWN_SECONDS:
+                logger.info(f"Circuit breaker for {self.model} is half-open, sending a probe")
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN and not self.probe_in_flight:
+                self.probe_in_flight = True
+                return True
+            return False
+
+    def record(self, ok: bool, latency: float):
+        """Records the outcome of a call and updates the breaker state."""
+        now = time.monotonic()
+        with self.lock:
+            self.samples.append((now, ok, latency))
+            self._trim(now)
+            if self.state == HALF_OPEN:
+                self.probe_in_flight = False
+                if ok:
+                    logger.info(f"Probe to {self.model} succeeded, closing circuit breaker")
+                    self.state = CLOSED
+                    self.samples.clear()
+                else:
+                    logger.warning(f"Probe to {self.model} failed, re-opening circuit breaker")
+                    self.state, self.opened_at = OPEN, now
+                return
+            calls = len(self.samples)
+            errors = sum(1 for _, sample_ok, _ in self.samples if not sample_ok)
+            if self.state == CLOSED and calls >= LLM_BREAKER_MIN_CALLS and errors / calls >= LLM_BREAKER_ERROR_RATE:
+                logger.warning(f"Opening circuit breaker for {self.model}: {errors}/{calls} calls failed")
+                self.state, self.opened_at = OPEN, now
+
+    def release_probe(self):
+        """Releases a half-open probe slot whose call was abandoned without an outcome (e.g. cancelled)."""
+        with self.lock:
+            self.probe_in_flight = False
+
+    def latency_percentile(self, pct: float) -> Optional[float]:
+        """Returns the given percentile of successful call latency in the window, in seconds."""
+        with self.lock:
+            self._trim(time.monotonic())
+            latencies = sorted(latency for _, ok, latency in self.samples if ok)
+        if not latencies:
+            return None
+        return latencies[max(0, math.ceil(pct / 100 * len(latencies)) - 1)]
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Returns the current health figures for display or logging."""
+        with self.lock:
+            self._trim(time.monotonic())
+            calls = len(self.samples)
+            errors = sum(1 for _, ok, _ in self.samples if not ok)
+            state = self.state
+        return {
+            "model": self.model,
+            "state": state,
+            "calls": calls,
+            "error_rate": errors / calls if calls else 0.0,
+            "p50_latency": self.latency_percentile(50),
+            "p95_latency": self.latency_percentile(95),
+        }
+
+_health: Dict[str, ModelHealth] = {}
+_health_lock = threading.Lock()
+_deadline: ContextVar[Optional[float]] = ContextVar("llm_deadline", default=None)
+# A mutable flag per routed attempt, so a call made in a copied context (another task or thread) still sets it
+_model_called: ContextVar[Optional[List[bool]]] = ContextVar("llm_model_called", default=None)
+
+def health(model: str) -> ModelHealth:
+    """Returns the health tracker for a model."""
+    with _health_lock:
+        if model not in _health:
+            _health[model] = ModelHealth(model)
+        return _health[model]
+
+def health_snapshots() -> List[Dict[str, Any]]:
+    """Returns the health figures of every model used so far."""
+    with _health_lock:
+        trackers = list(_health.values())
+    return [tracker.snapshot() for tracker in trackers]
+
+def remaining_time() -> Optional[float]:
+    """Seconds left before the current call's deadline, or None outside a routed call."""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+@contextmanager
+def deadline_scope(seconds: float):
+    """Runs the enclosed block under a deadline, tightened by any enclosing deadline."""
+    deadline = time.monotonic() + seconds
+    outer = _deadline.get()
+    token = _deadline.set(deadline if outer is None else min(outer, deadline))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+def note_model_call():
+    """
+    Marks the routed attempt in progress as having sent a request to the model.
+    Called by the code that talks to the model, so attempts answered from the LLM
+    response cache don't count towards the model's error rate or latency.
+    """
+    called = _model_called.get()
+    if called is not None:
+        called[0] = True
+
+def _record_attempt(model: str, called: List[bool], ok: bool, start: float):
+    if called[0]:
+        health(model).record(ok, time.monotonic() - start)
+    else:
+        # No request reached the model (e.g. a cache hit); only free a half-open probe
+        health(model).release_probe()
+
+def _run_attempt(model: str, attempt_deadline: float, fn: Callable[[str], Any]) -> Any:
+    """Runs fn(model) under attempt_deadline and records the outcome if fn called the model."""
+    outer = _deadline.get()
+    token = _deadline.set(attempt_deadline if outer is None else min(outer, attempt_deadline))
+    called = [False]
+    called_token = _model_called.set(called)
+    start = time.monotonic()
+    try:
+        result = fn(model)
+    except Exception:
+        _record_attempt(model, called, False, start)
+        raise
+    finally:
+        _model_called.reset(called_token)
+        _deadline.reset(token)
+    _record_attempt(model, called, True, start)
+    return result
+
+async def _arun_attempt(model: str, attempt_deadline: float, fn: Callable[[str], Awaitable[Any]]) -> Any:
+    """Async counterpart of _run_attempt."""
+    outer = _deadline.get()
+    token = _deadline.set(attempt_deadline if outer is None else min(outer, attempt_deadline))
+    called = [False]
+    called_token = _model_called.set(called)
+    start = time.monotonic()
+    try:
+        result = await fn(model)
+    except asyncio.CancelledError:
+        # The caller gave up; this says nothing about the model's health
+        health(model).release_probe()
+        raise
+    except Exception:
+        _record_attempt(model, called, False, start)
+        raise
+    finally:
+        _model_called.reset(called_token)
+        _deadline.reset(token)
+    _record_attempt(model, called, True, start)
+    return result
+
+def _attempts(task: str, primary: str, fallback: Optional[str], deadline_seconds: float) -> Iterator[Tuple[str, bool, float]]:
+    """
+    Yields (model, is_fallback, attempt_deadline) for each model call() should
+    try, consulting each breaker only when its model is next in line.
+    """
+    start = time.monotonic()
+    deadline = start + deadline_seconds
+    outer = _deadline.get()
+    if outer is not None:
+        deadline = min(deadline, outer)
+
+    candidates = [(primary, False)] + ([(fallback, True)] if fallback and fallback != primary else [])
+    attempts = 0
+    for index, (model, is_fallback) in enumerate(candidates):
+        now = time.monotonic()
+        if now >= deadline:
+            return
+        is_last = index == len(candidates) - 1
+        # When every breaker is open, still try the last candidate rather than failing outright
+        if not health(model).allow_request() and not (is_last and attempts == 0):
+            logger.info(f"Circuit breaker open for {model}, skipping it for {task}")
+            continue
+
+        attempts += 1
+        yield model, is_fallback, deadline if is_last else now + (deadline - now) * LLM_PRIMARY_DEADLINE_SHARE
+
+def _failed(task: str, deadline_seconds: float, last_error: Optional[Exception]) -> Exception:
+    if last_error is None:
+        return DeadlineExceeded(f"{task} deadline of {deadline_seconds}s expired")
+    return AllModelsFailed(f"{task} failed on all models: {str(last_error)}")
+
+def call(task: str, primary: str, fallback: Optional[str], fn: Callable[[str, bool], Any], deadline_seconds: float) -> Any:
+    """
+    Runs fn(model, is_fallback) against the healthiest available model.
+
+    The primary is tried first unless its breaker is open; the fallback is
+    tried if the primary is skipped or fails. Each breaker is consulted only
+    when its model is about to be called, so a half-open probe is never
+    reserved for a model that doesn't run. The primary gets
+    LLM_PRIMARY_DEADLINE_SHARE of the deadline when a fallback is available,
+    the fallback gets whatever remains.
+
+    Raises:
+        AllModelsFailed: if every attempted model failed (the last error is chained)
+        DeadlineExceeded: if the deadline expired before any model could be tried
+    """
+    last_error = None
+    for model, is_fallback, attempt_deadline in _attempts(task, primary, fallback, deadline_seconds):
+        started = time.monotonic()
+        try:
+            return _run_attempt(model, attempt_deadline, lambda m: fn(m, is_fallback))
+        except Exception as e:
+            last_error = e
+            logger.warning(f"{task} failed on {'fallback' if is_fallback else 'primary'} model {model} "
+                           f"after {time.monotonic() - started:.1f}s: {str(e)}")
+    raise _failed(task, deadline_seconds, last_error) from last_error
+
+async def acall(task: str, primary: str, fallback: Optional[str], fn: Callable[[str, bool], Awaitable[Any]],
+                deadline_seconds: float) -> Any:
+    """
+    Async counterpart of call(): awaits fn(model, is_fallback) with the same
+    model order, breakers and deadline split.
+    """
+    last_error = None
+    for model, is_fallback, attempt_deadline in _attempts(task, primary, fallback, deadline_seconds):
+        started = time.monotonic()
+        try:
+            return await _arun_attempt(model, attempt_deadline, lambda m: fn(m, is_fallback))
+        except Exception as e:
+            last_error = e
+            logger.warning(f"{task} failed on {'fallback' if is_fallback else 'primary'} model {model} "
+                           f"after {time.monotonic() - started:.1f}s: {str(e)}")
+    raise _failed(task, deadline_seconds, last_error) from last_error
@@ -0,0 +1,175 @@
+"""
+Records every LLM request in the llm_calls table: task, model, whether it was
+a fallback, latency, token counts, estimated cost, parse outcome and process.
+
+record_call() only appends to an in-memory buffer, so telemetry never adds a
+database write to the LLM call path. A background thread writes the buffer
+in one transaction every LLM_TELEMETRY_FLUSH_SECONDS, or sooner once
+LLM_TELEMETRY_BATCH_SIZE rows are waiting; anything left is flushed at exit.
+Flushes use a connection of their own, so a flush at exit never commits or
+rolls back a transaction that the exiting thread has open on db.
+The query helpers compute the admin page's statistics with SQL aggregates.
+"""
+
+import atexit
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from fasthtml.common import database
+
+from models import db
+from config import (
+    DATABASE_BUSY_TIMEOUT_MS,
+    DATABASE_PATH,
+    LLM_MODEL_PRICES,
+    LLM_TELEMETRY_BATCH_SIZE,
+    LLM_TELEMETRY_FLUSH_SECONDS,
+    LLM_TELEMETRY_MAX_BUFFER,
+    LLM_TELEMETRY_RETENTION_DAYS,
+    LLM_TELEMETRY_WINDOW_DAYS,
+)
+from utils import logger
+
+# Oldest rows are dropped if the database is unavailable for long enough to fill the buffer
+_buffer = deque(maxlen=LLM_TELEMETRY_MAX_BUFFER)
+_lock = threading.Lock()
+_wake = threading.Event()
+_flusher: Optional[threading.Thread] = None
+_last_prune = 0.0
+# Opened on first flush and only used under _lock
+_writer = None
+
+
+def _writer_db():
+    global _writer
+    if _writer is None:
+        _writer = database(DATABASE_PATH)
+        _writer.conn.set_busy_timeout(DATABASE_BUSY_TIMEOUT_MS)
+    return _writer
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """Estimated cost in USD of a call, from LLM_MODEL_PRICES (0 for unknown models)."""
+    input_price, output_price = LLM_MODEL_PRICES.get(model, (0.0, 0.0))
+    return (prompt_tokens * input_price + completion_tokens * output_price) / 1_000_000
+
+
+def record_call(task: str, model: str, is_fallback: bool, latency_ms: float, prompt_tokens: int = 0,
+                completion_tokens: int = 0, outcome: str = "ok", parse_ok: Optional[bool] = None,
+                process_id: Optional[str] = None):
+    """
+    Buffers one LLM request for writing to llm_calls.
+
+    Args:
+        task: Task the request was made for ('themes', 'anonymity', 'summary' or 'report')
+        model: Model that served the request
+        is_fallback: Whether the model is the task's fallback rather than its primary
+        latency_ms: Wall-clock time of the request
+        prompt_tokens: Input tokens reported by the provider
+        completion_tokens: Output tokens reported by the provider
+        outcome: 'ok', 'parse_error', 'timeout', 'error' or 'cancelled'
+        parse_ok: Whether the response parsed, or None if it was never parsed
+        process_id: Feedback process the request was made for, if any
+    """
+    _buffer.append({
+        "created_at": datetime.now().isoformat(),
+        "task": task,
+        "model": model,
+        "is_fallback": is_fallback,
+        "latency_ms": round(latency_ms, 1),
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "cost_usd": estimate_cost(model, prompt_tokens, completion_tokens),
+        "outcome": outcome,
+        "parse_ok": parse_ok,
+        "process_id": process_id,
+    })
+    _ensure_flusher()
+    if len(_buffer) >= LLM_TELEMETRY_BATCH_SIZE:
+        _wake.set()
+
+
+def flush():
+    """Writes all buffered rows in a single transaction."""
+    global _last_prune
+    with _lock:
+        rows = []
+        while _buffer:
+            rows.append(_buffer.popleft())
+        if not rows:
+            return
+        try:
+            writer = _writer_db()
+            with writer.conn:
+                writer.t.llm_calls.insert_all(rows)
+        except Exception as e:
+            logger.warning(f"Failed to write {len(rows)} LLM telemetry rows: {str(e)}")
+            _buffer.extendleft(reversed(rows))
+            return
+        if time.monotonic() - _last_prune > 3600:
+            _last_prune = time.monotonic()
+            cutoff = (datetime.now() - timedelta(days=LLM_TELEMETRY_RETENTION_DAYS)).isoformat()
+            writer.execute("DELETE FROM llm_calls WHERE created_at<?", [cutoff])
+    logger.debug(f"Wrote {len(rows)} LLM telemetry rows")
+
+
+def _flush_loop():
+    while True:
+        _wake.wait(LLM_TELEMETRY_FLUSH_SECONDS)
+        _wake.clear()
+        flush()
+
+
+def _ensure_flusher():
+    global _flusher
+    if _flusher is None:
+        with _lock:
+            if _flusher is None:
+                _flusher = threading.Thread(target=_flush_loop, name="llm-telemetry", daemon=True)
+                _flusher.start()
+
+
+atexit.register(flush)
+
+
+def _window_start(days: Optional[int]) -> str:
+    return (datetime.now() - timedelta(days=days or LLM_TELEMETRY_WINDOW_DAYS)).isoformat()
+
+
+def task_latency_stats(days: Optional[int] = None) -> List[Dict]:
+    """
+    Per-task call counts, latency percentiles and failure/fallback rates over the last `days`.
+
+    Percentiles are nearest-rank, computed in SQL from each call's rank within its task.
+    """
+    return db.q("""
+        WITH ranked AS (
+            SELECT task, latency_ms, is_fallback, outcome,
+                   ROW_NUMBER() OVER (PARTITION BY task ORDER BY latency_ms) AS rank,
+                   COUNT(*) OVER (PARTITION BY task) AS calls
+            FROM llm_calls WHERE created_at>=?
+        )
+        SELECT task, calls,
+               MIN(CASE WHEN rank >= 0.50 * calls THEN latency_ms END) AS p50_ms,
+               MIN(CASE WHEN rank >= 0.95 * calls THEN latency_ms END) AS p95_ms,
+               MIN(CASE WHEN rank >= 0.99 * calls THEN latency_ms END) AS p99_ms,
+               AVG(is_fallback) AS fallback_rate,
+               AVG(outcome='parse_error') AS parse_error_rate,
+               AVG(outcome IN ('error', 'timeout')) AS error_rate
+        FROM ranked GROUP BY task ORDER BY task""", [_window_start(days)])
+
+
+def model_stats(days: Optional[int] = None) -> List[Dict]:
+    """Per-model call counts, success rate, average latency, tokens and estimated cost over the last `days`."""
+    return db.q("""
+        SELECT model, COUNT(*) AS calls,
+               AVG(outcome='ok') AS success_rate,
+               AVG(latency_ms) AS avg_latency_ms,
+               SUM(prompt_tokens) AS prompt_tokens,
+               SUM(completion_tokens) AS completion_tokens,
+               SUM(cost_usd) AS cost_usd
+        FROM llm_calls WHERE created_at>=?
+        GROUP BY model ORDER BY calls DESC""", [_window_start(days)])
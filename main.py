@@ -3,6 +3,7 @@ from fasthtml.common import *
 from datetime import datetime, timedelta
 dev_mode = os.environ.get("DEV_MODE", "false").lower() == "true"
 beta_mode = os.environ.get("beta_model", "true").lower() == "true"
+import asyncio
 import random
 
 import secrets, os
@@ -20,19 +21,32 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-from models import password_reset_tokens_tb, feedback_themes_tb, feedback_submission_tb, users, feedback_process_tb, feedback_request_tb, FeedbackProcess, FeedbackRequest, Login, confirm_tokens_tb
+from models import db, password_reset_tokens_tb, feedback_themes_tb, feedback_submission_tb, users, feedback_process_tb, feedback_request_tb, FeedbackProcess, FeedbackRequest, Login, confirm_tokens_tb
 from pages import how_it_works_page, generate_themed_page, faq_page, error_message, login_or_register_page, register_form, login_form, landing_page, navigation_bar_logged_out, navigation_bar_logged_in, footer_bar, privacy_policy_page, pricing_page
 
-from llm_functions import convert_feedback_text_to_themes, generate_completed_feedback_report
-
-from config import MINIMUM_SUBMISSIONS_REQUIRED, MAGIC_LINK_EXPIRY_DAYS, FEEDBACK_QUALITIES, STARTING_CREDITS, BASE_URL, GOOGLE_CLIENT_ID, GOOGLE_CLIENT_SECRET
-from utils import beforeware, validate_email_format, validate_password_strength, validate_passwords_match
+from llm_functions import clean_markdown, summarize_report_sections, warm_llm_clients
+from jobs import enqueue_job
+from report_jobs import (start_report_job, get_report_job, stored_report_is_current, bump_report_input_version, stored_report_html,
+                         report_etag)
+from markdown_render import RenderedMarkdown
+from email_outbox import (queue_invites, queue_password_reset_email, queue_report_ready_email, queue_confirmation_email,
+                          outstanding_request_tokens, failed_request_invites, outbox_stats, delivery_lag_seconds)
+from report_preview import build_report_preview, report_preview_section
+from quality_stats import add_ratings, remove_ratings, delete_process_stats, process_quality_stats, respondents_by_role
+import llm_cache
+import report_jobs
+import llm_telemetry
+import llm_limiter
+from theme_clustering import summarize_themes, format_theme_summary, group_by_sentiment
+
+from config import DATABASE_PATH, MINIMUM_SUBMISSIONS_REQUIRED, MAGIC_LINK_EXPIRY_DAYS, FEEDBACK_QUALITIES, STARTING_CREDITS, BASE_URL, GOOGLE_CLIENT_ID, GOOGLE_CLIENT_SECRET, THEME_CLUSTERING_ENABLED, THEME_CLUSTER_THRESHOLD, REPORT_MAP_REDUCE_MIN_CHARS, REPORT_MAP_CHUNK_CHARS, LLM_TELEMETRY_WINDOW_DAYS, FEEDBACK_TEXT_MAX_CHARS, EMAIL_OUTBOX_MAX_LAG_SECONDS
+from utils import beforeware, generate_external_link, validate_email_format, validate_password_strength, validate_passwords_match
 
 # OAuth imports
 from fasthtml.oauth import GoogleAppClient, OAuth as OAuthHelper
 
-import requests
 import math
+import time
 import stripe
 stripe.api_key = os.environ.get("STRIPE_SECRET_KEY")
 
@@ -47,7 +61,6 @@ from slowapi.errors import RateLimitExceeded
 app, rt = fast_app(
     before=beforeware,
     hdrs=(
-        MarkdownJS(),  # Allows rendering markdown in feedback text, if needed.
         Link(rel='stylesheet', href='/static/styles.css', type='text/css'),
         Favicon('static/favicon.ico', 'static/favicon.ico')
     ),
@@ -80,6 +93,9 @@ if admin_email and admin_password:
         })
         logger.info("Admin user created successfully")
 
+# Create the pooled LLM clients up front so the first submission doesn't pay for it
+warm_llm_clients()
+
 limiter = Limiter(key_func=get_remote_address)
 
 app.state.limiter = limiter
@@ -107,13 +123,6 @@ if GOOGLE_CLIENT_ID and GOOGLE_CLIENT_SECRET:
 # Helper Functions
 # --------------------
 
-def generate_external_link(url):
-    """Find the base domain env var, if it exists, and return the link with the base domain as as a string"""
-    base_domain = os.environ.get("BASE_URL")
-    if base_domain:
-        return f"https://{base_domain}/{url}"
-    return url
-
 def generate_magic_link(email: str, process_id: Optional[str] = None) -> str:
     """
     Generates a unique magic link token, stores it with expiry in the FeedbackRequest table, and returns the link.
@@ -129,211 +138,6 @@ def generate_magic_link(email: str, process_id: Optional[str] = None) -> str:
     })
     return uri("new-feedback-form", token=token)
 
-def send_feedback_email(recipient: str,  link: str, recipient_first_name: str = "", sender_first_name: str = "") -> bool:
-    try:
-        link = generate_external_link(link)
-        with open("feedback_email_template.txt", "r") as f:
-            template = f.read()
-        filled_template = (
-            template
-            .replace("{link}", link)
-            .replace("{recipient_first_name}", recipient_first_name)
-            .replace("{sender_first_name}", sender_first_name)
-        )
-
-        endpoint = os.environ.get("SMTP2GO_EMAIL_ENDPOINT", "https://api.smtp2go.com/v3")
-        api_key = os.environ.get("SMTP2GO_API_KEY")
-        if not api_key:
-            logger.error("SMTP2GO_API_KEY is missing.")
-            return False
-
-        payload = {
-            "sender": "noreply@feedback-to.me",
-            "to": [recipient],
-            "subject": "Feedback Request from Feedback to Me",
-            "text_body": filled_template
-        }
-
-        headers = {
-            "Content-Type": "application/json",
-            "X-Smtp2go-Api-Key": api_key
-        }
-
-        logger.info(f"Sending email to {recipient} using SMTP2GO with payload: {payload}")
-        response = requests.post(endpoint.rstrip("/") + "/email/send", json=payload, headers=headers)
-
-        if response.status_code == 200:
-            result_json = response.json()
-            succeeded = result_json.get("data", {}).get("succeeded", 0)
-            if succeeded == 1:
-                logger.info("Email sent successfully via SMTP2GO.")
-                return True
-            else:
-                logger.error(f"SMTP2GO error: {result_json}")
-                return False
-        else:
-            logger.error(f"Error sending email: {response.status_code} - {response.text}")
-            return False
-
-    except Exception as e:
-        logger.error(f"Exception during sending email for {recipient}: {str(e)}")
-        return False
-
-def send_password_reset_email(recipient: str, token: str, recipient_first_name: str = "") -> bool:
-    """
-    Sends an email with a password reset link containing the given token.
-    """
-    try:
-        with open("password_reset_email_template.txt", "r") as f:
-            template = f.read()
-        link = generate_external_link(("reset-password") + f"/{token}")
-        filled_template = (
-            template
-            .replace("{link}", link)
-            .replace("{recipient_first_name}", recipient_first_name)
-        )
-
-        endpoint = os.environ.get("SMTP2GO_EMAIL_ENDPOINT", "https://api.smtp2go.com/v3")
-        api_key = os.environ.get("SMTP2GO_API_KEY")
-        if not api_key:
-            logger.error("SMTP2GO_API_KEY is missing.")
-            return False
-
-        payload = {
-            "sender": "noreply@feedback-to.me",
-            "to": [recipient],
-            "subject": "Password Reset Request",
-            "text_body": filled_template
-        }
-
-        headers = {
-            "Content-Type": "application/json",
-            "X-Smtp2go-Api-Key": api_key
-        }
-
-        logger.info(f"Sending password reset email to {recipient}")
-        response = requests.post(endpoint.rstrip("/") + "/email/send", json=payload, headers=headers)
-
-        if response.status_code == 200:
-            result_json = response.json()
-            succeeded = result_json.get("data", {}).get("succeeded", 0)
-            if succeeded == 1:
-                logger.info("Password reset email sent successfully.")
-                return True
-            else:
-                logger.error(f"SMTP2GO error sending password reset email: {result_json}")
-                return False
-        else:
-            logger.error(f"Error sending password reset email: {response.status_code} - {response.text}")
-            return False
-    except Exception as e:
-        logger.error(f"Exception while sending password reset email to {recipient}: {str(e)}")
-        return False
-
-def send_report_ready_email(recipient: str, recipient_first_name: str = "") -> bool:
-    """
-    Sends an email to notify the user that their report is ready to be generated.
-    """
-    try:
-        with open("report_ready_email_template.txt", "r") as f:
-            template = f.read()
-        link = generate_external_link("dashboard")
-        filled_template = (
-            template
-            .replace("{link}", link)
-            .replace("{recipient_first_name}", recipient_first_name)
-        )
-
-        endpoint = os.environ.get("SMTP2GO_EMAIL_ENDPOINT", "https://api.smtp2go.com/v3")
-        api_key = os.environ.get("SMTP2GO_API_KEY")
-        if not api_key:
-            logger.error("SMTP2GO_API_KEY is missing.")
-            return False
-
-        payload = {
-            "sender": "noreply@feedback-to.me",
-            "to": [recipient],
-            "subject": "Your Feedback Report is Ready!",
-            "text_body": filled_template
-        }
-
-        headers = {
-            "Content-Type": "application/json",
-            "X-Smtp2go-Api-Key": api_key
-        }
-
-        logger.info(f"Sending report ready email to {recipient}")
-        response = requests.post(endpoint.rstrip("/") + "/email/send", json=payload, headers=headers)
-
-        if response.status_code == 200:
-            result_json = response.json()
-            succeeded = result_json.get("data", {}).get("succeeded", 0)
-            if succeeded == 1:
-                logger.info("Report ready email sent successfully.")
-                return True
-            else:
-                logger.error(f"SMTP2GO error sending report ready email: {result_json}")
-                return False
-        else:
-            logger.error(f"Error sending report ready email: {response.status_code} - {response.text}")
-            return False
-    except Exception as e:
-        logger.error(f"Exception while sending report ready email to {recipient}: {str(e)}")
-        return False
-
-def send_confirmation_email(recipient: str, token: str, recipient_first_name: str = "", recipient_company: str = "") -> bool:
-    """
-    Sends an email with a confirmation link containing the given token.
-    """
-    try:
-        with open("confirmation_email_template.txt", "r") as f:
-            template = f.read()
-        # We'll build a direct link to trigger /confirm-email?token=<token>
-        link = generate_external_link(("confirm-email") + f"/{token}")
-        filled_template = (
-            template
-            .replace("{link}", link)
-            .replace("{recipient_first_name}", recipient_first_name)
-            .replace("{recipient_company}", recipient_company)
-        )
-
-        endpoint = os.environ.get("SMTP2GO_EMAIL_ENDPOINT", "https://api.smtp2go.com/v3")
-        api_key = os.environ.get("SMTP2GO_API_KEY")
-        if not api_key:
-            logger.error("SMTP2GO_API_KEY is missing.")
-            return False
-
-        payload = {
-            "sender": "noreply@feedback-to.me",
-            "to": [recipient],
-            "subject": "Please Confirm Your Email Address",
-            "text_body": filled_template
-        }
-
-        headers = {
-            "Content-Type": "application/json",
-            "X-Smtp2go-Api-Key": api_key
-        }
-
-        logger.info(f"Sending confirmation email to {recipient} with payload: {payload}")
-        response = requests.post(endpoint.rstrip("/") + "/email/send", json=payload, headers=headers)
-
-        if response.status_code == 200:
-            result_json = response.json()
-            succeeded = result_json.get("data", {}).get("succeeded", 0)
-            if succeeded == 1:
-                logger.info("Confirmation email sent successfully.")
-                return True
-            else:
-                logger.error(f"SMTP2GO error sending confirmation email: {result_json}")
-                return False
-        else:
-            logger.error(f"Error sending confirmation email: {response.status_code} - {response.text}")
-            return False
-    except Exception as e:
-        logger.error(f"Exception while sending confirmation email to {recipient}: {str(e)}")
-        return False
-
 # -----------------------
 # static pages
 # -----------------------
@@ -537,21 +341,19 @@ def post_send_reset_email(email: str, request: Request):
     # Generate and store reset token
     token = secrets.token_urlsafe()
     expiry = datetime.now() + timedelta(hours=1)  # Token expires in 1 hour
-    password_reset_tokens_tb.insert({
-        "token": token,
-        "email": email,
-        "expiry": expiry,
-        "is_used": False
-    })
-    
-    # Send reset email
-    if send_password_reset_email(email, token, user.first_name):
-        return Titled(
-            "Check Your Email",
-            P("We've sent a password reset link to your email. The link will expire in 1 hour.")
-        )
-    else:
-        return Titled("Error", P("Failed to send reset email. Please try again later."))
+    with db.conn:
+        password_reset_tokens_tb.insert({
+            "token": token,
+            "email": email,
+            "expiry": expiry,
+            "is_used": False
+        })
+        queue_password_reset_email(email, token, user.first_name)
+
+    return Titled(
+        "Check Your Email",
+        P("We've sent a password reset link to your email. The link will expire in 1 hour.")
+    )
         
 
 
@@ -764,25 +566,25 @@ def post_register(email: str, first_name:str, role: str, company: str, team: str
         logger.warning(f"Registration failed - email already exists: {email}")
         return Titled("Registration Failed", P("That email is already in use."))
     except Exception:
-        new_user = users.insert(user_data)
-        logger.info(f"New user registered (unconfirmed): {email}")
-
         # Generate and store a new confirmation token
         token = secrets.token_urlsafe()
         expiry = datetime.now() + timedelta(days=7)
-        confirm_tokens_tb.insert({
-            "token": token,
-            "email": email,
-            "expiry": expiry,
-            "is_used": False
-        })
-        if dev_mode:
-            logger.warning("DEV_MODE is enabled; automatically confirming new user.")
-            new_user.is_confirmed = True
-            users.update(new_user)
-        else:
-            # Send them a confirmation link
-            send_confirmation_email(email, token, first_name, company)
+        with db.conn:
+            new_user = users.insert(user_data)
+            confirm_tokens_tb.insert({
+                "token": token,
+                "email": email,
+                "expiry": expiry,
+                "is_used": False
+            })
+            if dev_mode:
+                logger.warning("DEV_MODE is enabled; automatically confirming new user.")
+                new_user.is_confirmed = True
+                users.update(new_user)
+            else:
+                # Send them a confirmation link
+                queue_confirmation_email(email, token, first_name, company)
+        logger.info(f"New user registered (unconfirmed): {email}")
 
     return Titled(
         "Check Your Email",
@@ -1190,6 +992,28 @@ def create_new_feedback_process(process_title : str, peers_emails: str, supervis
 # -----------------------
 # Routes: Existing Feedback Process
 # -----------------------
+def email_status(process_id: str, feedback_request, queued_tokens: Set[str], failed_invites: Dict[str, str]):
+    """
+    The email status of a request on the process page. A queued invite polls
+    /email-status until it is delivered or dead-lettered; a dead-lettered one
+    shows the delivery error next to the send button, so it can be retried.
+    """
+    token = feedback_request.token
+    send_button = Button("Send email",
+                         hx_post=f"/feedback-process/{process_id}/send_email?token={token}",
+                         hx_target=f"#email-status-{token}",
+                         hx_swap="outerHTML", cls="request-status-button")
+    if feedback_request.email_sent:
+        return Div(P(f"Email sent on {feedback_request.email_sent}"), id=f"email-status-{token}")
+    if token in queued_tokens:
+        return Div(P("Email queued for sending."), id=f"email-status-{token}",
+                   hx_get=f"/feedback-process/{process_id}/email-status/{token}",
+                   hx_trigger="every 5s", hx_swap="outerHTML")
+    if token in failed_invites:
+        return Div(P(f"Email could not be delivered: {failed_invites[token]}", cls="request-status-failed"),
+                   send_button, id=f"email-status-{token}")
+    return Div(send_button, id=f"email-status-{token}")
+
 @app.get("/feedback-process/{process_id}")
 def get_report_status_page(process_id : str, req):
     try:
@@ -1246,10 +1070,12 @@ def get_report_status_page(process_id : str, req):
             cls="process-header"
         ),
         P(f"Created: {formatted_date}"),
-        Div(opening_text, cls='marked'),
+        RenderedMarkdown(opening_text),
         Div(missing_text) if missing_text else None
     )
     
+    queued_tokens = outstanding_request_tokens(process_id)
+    failed_invites = failed_request_invites(process_id)
     requests_list = []
     for feedback_request in requests:
         submission = feedback_request.completed_at
@@ -1268,16 +1094,7 @@ def get_report_status_page(process_id : str, req):
                 P(
                   Button("Copy link to clipboard", cls="request-status-button", onclick=f"if(navigator.clipboard && navigator.clipboard.writeText){{ navigator.clipboard.writeText('{generate_external_link(uri('new-feedback-form', process_id=feedback_request.token))}').then(()=>{{ let btn=this; btn.setAttribute('data-tooltip', 'Copied to clipboard!'); setTimeout(()=>{{ btn.removeAttribute('data-tooltip'); }}, 1000); }}); }} else {{ alert('Clipboard functionality is not supported in this browser.'); }}"),
                   " ",
-                  Div(
-                    (P(f"Email sent on {feedback_request.email_sent}") 
-                      if feedback_request.email_sent
-                      else Button("Send email", 
-                          hx_post=f"/feedback-process/{process_id}/send_email?token={feedback_request.token}", 
-                          hx_target=f"#email-status-{feedback_request.token}", 
-                          hx_swap="outerHTML",  cls="request-status-button")
-                    ),
-                    id=f"email-status-{feedback_request.token}", 
-                  ), 
+                  email_status(process_id, feedback_request, queued_tokens, failed_invites),
                 ),cls="form-links-row", hidden=True if submission else False),
                 cls=f"request-{feedback_request.user_type}"
             )
@@ -1305,7 +1122,17 @@ def get_report_status_page(process_id : str, req):
         method="post"
     )
 
+    unsent_requests = [r for r in requests if not r.email_sent and not r.completed_at and r.token not in queued_tokens]
     requests_section = Article(
+        Div(
+            Button(f"Send all pending emails ({len(unsent_requests)})",
+                   hx_post=f"/feedback-process/{process_id}/send_all_emails",
+                   hx_target="#bulk-email-results",
+                   hx_swap="outerHTML",
+                   hx_disabled_elt="this",
+                   cls="request-status-button"),
+            id="bulk-email-results",
+        ) if len(unsent_requests) > 1 else None,
         *requests_list,
         Details(
             Summary("Add New Request", cls="button collapsible-toggle"),
@@ -1316,26 +1143,57 @@ def get_report_status_page(process_id : str, req):
 
     report_section = Div(id="report-section")
 
+    # A report is outdated once requests have been added or deleted since it was generated
+    report_outdated = (
+        bool(process.feedback_report and process.report_input_fingerprint) and
+        total_submissions >= process.min_submissions_required and
+        not stored_report_is_current(process, current_report_fingerprint(process_id))
+    )
+
     if  process.feedback_report:
         report_section = Article(
         H3("Feedback Report"),
-        Div(process.feedback_report, cls="marked"),
+        Div(
+            Script(src="https://unpkg.com/htmx-ext-sse@2.2.2/sse.js"),
+            P("Feedback has changed since this report was generated."),
+            Button(
+                "Regenerate Feedback Report",
+                hx_get=f"/feedback-process/{process_id}/report-view",
+                hx_target="#report-section",
+                hx_swap="outerHTML"
+            ),
+        ) if report_outdated else None,
+        # Loaded from a versioned URL, so the browser caches the rendered report until it is regenerated
+        Div(
+            Div("Loading report...", aria_busy="true"),
+            hx_get=f"/feedback-process/{process_id}/report?v={report_etag(stored_report_html(process)).strip(chr(34))}",
+            hx_trigger="load",
+            hx_swap="outerHTML",
+        ),
         id="report-section")
     elif can_generate_report:
             report_section = Div(
+                Script(src="https://unpkg.com/htmx-ext-sse@2.2.2/sse.js"),
                 Button(
                     "Generate Feedback Report",
-                    onclick=f"window.location.href='/feedback-process/{process_id}/generate_completed_feedback_report'"
+                    hx_get=f"/feedback-process/{process_id}/report-view",
+                    hx_target="#report-section",
+                    hx_swap="outerHTML"
                 ),
                 id="report-section"
             ),
             Div("Generating your report...", id="loading-indicator", aria_busy="true", style="display:none;")
 
 
+    # Statistics-only preview: shown as soon as the threshold is reached, before (and alongside) the written report
+    preview = build_report_preview(process_id) if total_submissions >= process.min_submissions_required else None
+    preview_section = report_preview_section(preview) if preview else None
+
     process_page_content = generate_themed_page(
         page_body=Container(
             status_section,
             requests_section,   
+            preview_section,
             report_section
         ), 
         page_title="Feedback Process {process_id}",
@@ -1344,113 +1202,46 @@ def get_report_status_page(process_id : str, req):
     
     return process_page_content
 
-def create_feedback_report_input(process_id):
+def create_feedback_report_input(process_id, group_summaries: Optional[Dict[str, str]] = None):
+    """
+    Formats a process's rating statistics and feedback themes as the report prompt's input.
+
+    Args:
+        process_id: Feedback process to build the input for
+        group_summaries: Optional per-group summaries (section title -> markdown) from the
+            map step of map-reduce generation; if given they replace the theme lists
+    """
     from html import escape
     logger.info(f"Creating feedback report input for process {process_id}")
     process = feedback_process_tb[process_id]
     logger.debug(f"Process qualities: {process.qualities}")
     
-    submissions = feedback_submission_tb("process_id=?", (process_id,))
-    logger.info(f"Found {len(submissions)} submissions")
-    if not submissions:
+    respondents = respondents_by_role(process_id)
+    total_submissions = sum(respondents.values())
+    logger.info(f"Found {total_submissions} submissions")
+    if not total_submissions:
         logger.error("No submissions found for this process")
         return "No submissions available for report generation"
-    
-    # Initialize statistics structure
-    role_stats = {
-        "peer": {"qualities": {}, "count": 0},
-        "supervisor": {"qualities": {}, "count": 0},
-        "report": {"qualities": {}, "count": 0}
-    }
-    
-    overall_stats = {}
-    import json
-    from collections import defaultdict
-    
-    logger.debug("Initialized statistics structures")
-
-    # Helper function to calculate statistics
-    def calc_stats(values):
-        if not values:
-            return None
-        n = len(values)
-        avg = sum(values) / n
-        variance = sum((x - avg) ** 2 for x in values) / n if n > 1 else 0
-        std_dev = math.sqrt(variance)
-        return {
-            "average": round(avg, 2),
-            "variance": round(variance, 2),
-            "std_dev": round(std_dev, 2),
-            "count": n,
-            "min": min(values),
-            "max": max(values),
-            "raw_values": values
-        }
-
-    # Collect ratings by role and quality
-    role_ratings = defaultdict(lambda: defaultdict(list))
-    for s in submissions:
-        logger.info(f"\nProcessing submission {s.id}")
-        r = s.ratings
-        logger.debug(f"Raw ratings data: {r}")
-        
-        if isinstance(r, str):
-            try:
-                r = json.loads(r)
-                logger.info(f"Successfully parsed ratings JSON: {r}")
-            except Exception as e:
-                logger.error(f"Failed to parse ratings JSON for submission {s.id}: {e}")
-                logger.error(f"Raw ratings string: {r}")
-                r = {}
-                continue
 
-        if not r:
-            logger.warning(f"Empty ratings for submission {s.id}")
-            continue
+    # Rating statistics come from the running aggregates kept at submission time (see quality_stats.py)
+    process_qualities = json.loads(process.qualities)
+    quality_by_role, overall_stats = process_quality_stats(process_id, process_qualities)
+    role_stats = {role: {"qualities": quality_by_role[role], "count": respondents.get(role, 0)}
+                  for role in ["peer", "supervisor", "report"]}
 
-        try:
-            request = feedback_request_tb[s.request_id]
-            role = request.user_type
-            role_stats[role]["count"] += 1
-            logger.info(f"Processing ratings for role {role}")
-
-            # OR if process.qualities is already a list/dict, just use it directly:
-            process_qualities = json.loads(process.qualities)  # Convert JSON string to Python list
-
-            for quality in process_qualities:
-                if quality in r:
-                    value = r[quality]
-                    logger.debug(f"Adding rating for {quality}: {value}")
-                    role_ratings[role][quality].append(value)
-                else:
-                    logger.warning(f"Missing rating for quality: {quality}")
-            
-        except Exception as e:
-            logger.error(f"Error processing request {s.request_id}: {e}")
-            continue
-
-    # Calculate statistics for each role and quality
-    for role in role_stats:
-        for quality in process_qualities:
-            values = role_ratings[role][quality]
-            if values:
-                role_stats[role]["qualities"][quality] = calc_stats(values)
-
-    # Calculate overall statistics for each quality
-    for quality in process_qualities:
-        all_values = []
-        for role in role_ratings:
-            all_values.extend(role_ratings[role][quality])
-        if all_values:
-            overall_stats[quality] = calc_stats(all_values)
-    
     # Get themed feedback
     themes = feedback_themes_tb("feedback_id IN (SELECT id FROM feedback_submission WHERE process_id=?)", (process_id,))
-    themed_feedback = {
-        "positive": [escape(t.theme) for t in themes if t.sentiment == "positive"],
-        "negative": [escape(t.theme) for t in themes if t.sentiment == "negative"],
-        "neutral": [escape(t.theme) for t in themes if t.sentiment == "neutral"]
-    }
+    themed_feedback = {}
+    if group_summaries is None and THEME_CLUSTERING_ENABLED:
+        # Merge near-duplicates so each point appears once, with how many respondents raised it
+        by_sentiment = group_by_sentiment([(escape(t.theme), t.sentiment, t.feedback_id) for t in themes])
+        for sentiment in ["positive", "negative", "neutral"]:
+            summaries = summarize_themes(by_sentiment.get(sentiment, []))
+            themed_feedback[sentiment] = format_theme_summary(summaries, total_submissions)
+        logger.debug(f"Clustered {len(themes)} themes for process {process_id}")
+    elif group_summaries is None:
+        for sentiment in ["positive", "negative", "neutral"]:
+            themed_feedback[sentiment] = chr(10).join('- ' + escape(t.theme) for t in themes if t.sentiment == sentiment)
     
     report_input = f"""Feedback Report Summary
 
@@ -1484,22 +1275,35 @@ Role-Based Quality Analysis:
 - Rating Range: {stats['min']} - {stats['max']}
 - Rating Variance: {stats['variance']}"""
 
-    report_input += f"""
+    if group_summaries is not None:
+        report_input += f"""
+
+Feedback Summaries by Respondent Group:
+{'-' * 40}"""
+        for title, summary in group_summaries.items():
+            report_input += f"""
+
+{title}:
+{summary}"""
+    else:
+        report_input += f"""
 
 Feedback Themes:
 {'-' * 40}
 
 Positive Themes:
-{chr(10).join('- ' + theme for theme in themed_feedback['positive'])}
+{themed_feedback['positive']}
 
 Areas for Improvement:
-{chr(10).join('- ' + theme for theme in themed_feedback['negative'])}
+{themed_feedback['negative']}
 
 Neutral Observations:
-{chr(10).join('- ' + theme for theme in themed_feedback['neutral'])}
+{themed_feedback['neutral']}"""
+
+    report_input += f"""
 
 Summary Statistics:
-- Total Submissions: {len(submissions)}
+- Total Submissions: {total_submissions}
 - Total Themes Identified: {len(themes)}
 - Breakdown by Role:
   * Peers: {role_stats['peer']['count']}
@@ -1508,9 +1312,96 @@ Summary Statistics:
 """
     return report_input
 
+def create_report_sections(process_id) -> Dict[str, str]:
+    """
+    Splits a process's feedback into per-role sections for map-reduce report generation.
+    Each section holds one role's rating statistics and themes; a role whose themes
+    don't fit in REPORT_MAP_CHUNK_CHARS is split into several parts.
+
+    Returns:
+        Section title -> section text, in role order
+    """
+    from html import escape
+    process = feedback_process_tb[process_id]
+    quality_by_role, _ = process_quality_stats(process_id, json.loads(process.qualities))
+    respondents = respondents_by_role(process_id)
+    rows = db.q("""
+        SELECT t.theme, t.sentiment, t.feedback_id, r.user_type FROM feedback_theme t
+        JOIN feedback_submission s ON s.id=t.feedback_id
+        JOIN feedback_request r ON r.token=s.request_id
+        WHERE s.process_id=?""", [process_id])
+
+    sections = {}
+    headings = {"positive": "Positive Themes:", "negative": "Areas for Improvement:", "neutral": "Neutral Observations:"}
+    for role in ["peer", "supervisor", "report"]:
+        count = respondents.get(role, 0)
+        if not count:
+            continue
+        header = f"{role.title()} Feedback (from {count} respondents)"
+        ratings = "".join(
+            f"\n{quality}: average {stats['average']}, range {stats['min']} - {stats['max']}, variance {stats['variance']}"
+            for quality, stats in quality_by_role[role].items()
+        )
+
+        by_sentiment = group_by_sentiment([(escape(r["theme"]), r["sentiment"], r["feedback_id"])
+                                           for r in rows if r["user_type"] == role])
+        lines = []
+        for sentiment in ["positive", "negative", "neutral"]:
+            if THEME_CLUSTERING_ENABLED:
+                text = format_theme_summary(summarize_themes(by_sentiment.get(sentiment, [])), count)
+            else:
+                text = "\n".join(f"- {theme}" for theme, _ in by_sentiment.get(sentiment, []))
+            lines.extend((sentiment, line) for line in text.splitlines())
+
+        # Ratings go in the first part; theme lines are packed into parts under the size limit
+        parts, current, current_sentiment = [], f"{header}\nRatings:{ratings}", None
+        for sentiment, line in lines:
+            addition = (f"\n{headings[sentiment]}" if sentiment != current_sentiment else "") + f"\n{line}"
+            if len(current) + len(addition) > REPORT_MAP_CHUNK_CHARS and current_sentiment is not None:
+                parts.append(current)
+                current, current_sentiment = header, None
+                addition = f"\n{headings[sentiment]}\n{line}"
+            current += addition
+            current_sentiment = sentiment
+        parts.append(current)
+
+        for i, part in enumerate(parts, start=1):
+            title = header if len(parts) == 1 else f"{header}, part {i} of {len(parts)}"
+            sections[title] = part
+    return sections
+
+def build_report_input(process_id) -> str:
+    """
+    Returns the report input for a process. Above REPORT_MAP_REDUCE_MIN_CHARS the
+    theme lists are replaced by per-group summaries written in parallel by the fast
+    model (map-reduce), so the reasoning model's prompt - and its latency - no longer
+    grows with the number of respondents.
+    """
+    report_input = create_feedback_report_input(process_id)
+    if not REPORT_MAP_REDUCE_MIN_CHARS or len(report_input) <= REPORT_MAP_REDUCE_MIN_CHARS:
+        return report_input
+
+    sections = create_report_sections(process_id)
+    logger.info(f"Report input for process {process_id} is {len(report_input)} chars; summarising {len(sections)} sections")
+    start = time.perf_counter()
+    summaries = summarize_report_sections(sections, process_id=process_id)
+    logger.info(f"Summarised {len(sections)} report sections for process {process_id} in {time.perf_counter() - start:.1f}s")
+    return create_feedback_report_input(process_id, group_summaries=summaries)
+
+def current_report_fingerprint(process_id) -> str:
+    """
+    Fingerprint of the process's current report input (before any map-reduce summarising).
+    Cached on the process until its input changes; see report_jobs.current_report_fingerprint.
+    """
+    return report_jobs.current_report_fingerprint(process_id, create_feedback_report_input,
+                                                  settings=f"{THEME_CLUSTERING_ENABLED}:{THEME_CLUSTER_THRESHOLD}")
+
 @app.get("/feedback-process/{process_id}/generate_completed_feedback_report")
-def create_feeback_report(process_id : str):
+async def create_feeback_report(process_id : str):
     process = feedback_process_tb[process_id]
+    fingerprint = await asyncio.to_thread(current_report_fingerprint, process_id)
+    if stored_report_is_current(process, fingerprint):
+        return RedirectResponse(f"/feedback-process/{process_id}", status_code=303)
     submissions = feedback_submission_tb("process_id=?", (process_id,))
 
     submission_counts = {
@@ -1523,17 +1414,127 @@ def create_feeback_report(process_id : str):
         logger.warning(f"Attempted to generate report without sufficient feedback ({total_submissions}/{process.min_submissions_required}) for process: {process_id}")
         return "Not enough feedback submissions to generate report", 400
 
-    feedback_report_input = create_feedback_report_input(process_id)
-    feedback_report_prompt, feedback_report = generate_completed_feedback_report(feedback_report_input)
-    
-    feedback_process_tb.update({
-        "report_submission_prompt": feedback_report_prompt,
-        "feedback_report": feedback_report
-    }, process_id)
-    
+    # Attaches to a generation already in flight rather than starting a second one,
+    # and waits without holding a worker thread
+    job = start_report_job(process_id, build_report_input, fingerprint)
+    await job.await_finished()
+    if job.status == "failed":
+        return job.error, 500
+
     # Redirect to refresh the page
     return RedirectResponse(f"/feedback-process/{process_id}", status_code=303)
     
+# Minimum time between progressive report updates sent to the browser
+REPORT_STREAM_INTERVAL_SECONDS = 0.25
+
+@app.get("/feedback-process/{process_id}/report-view")
+def get_report_stream_view(process_id: str):
+    """Replaces the generate button with a report section that fills in from the report stream."""
+    return Article(
+        H3("Feedback Report"),
+        Div(
+            Div("Generating your report...", aria_busy="true"),
+            hx_ext="sse",
+            sse_connect=f"/feedback-process/{process_id}/report-stream",
+            sse_swap="message",
+            sse_close="done",
+        ),
+        id="report-section"
+    )
+
+@app.get("/feedback-process/{process_id}/report-stream")
+async def stream_feedback_report(process_id: str, sess):
+    """
+    Server-Sent Events stream of the report as the model writes it. Each
+    message carries the markdown so far; the final text is saved to the
+    process when the stream completes.
+    """
+    user_id = sess.get("auth")
+    try:
+        process = feedback_process_tb[process_id]
+    except Exception:
+        return "Not found", 404
+    if process.user_id != user_id:
+        return "Unauthorized", 401
+
+    def render(markdown: str):
+        return sse_message(RenderedMarkdown(markdown))
+
+    async def report_events():
+        fingerprint = await asyncio.to_thread(current_report_fingerprint, process_id)
+        if not stored_report_is_current(process, fingerprint):
+            completed = len(feedback_request_tb("process_id=? AND completed_at IS NOT NULL", (process_id,)))
+            if completed < process.min_submissions_required:
+                yield sse_message(P("Not enough feedback submissions to generate report"))
+                yield sse_message("complete", event="done")
+                return
+
+        # Every viewer of the process follows the same job; a report stored for the same input comes back at once
+        job = start_report_job(process_id, build_report_input, fingerprint)
+        async for update in job.afollow(REPORT_STREAM_INTERVAL_SECONDS):
+            if update["status"] == "done":
+                yield render(update["text"])
+            elif update["status"] == "failed":
+                yield sse_message(P(update["error"]))
+            elif update["status"] == "queued" and update["queue_position"] is not None:
+                # Busy: show the queue position instead of letting the page look stalled
+                yield sse_message(P(f"Your report is queued ({update['queue_position']} ahead of it). It will start shortly.", aria_busy="true"))
+            elif update["text"]:
+                yield render(clean_markdown(update["text"]))
+        yield sse_message("complete", event="done")
+
+    return EventStream(report_events())
+
+# A versioned report URL never changes content, so it may be cached for a year
+REPORT_CACHE_SECONDS = 365 * 24 * 3600
+
+@app.get("/feedback-process/{process_id}/report")
+def get_report_html(process_id: str, sess, request: Request, v: str = ""):
+    """
+    The stored report as server-rendered HTML, with a strong ETag. Requested with
+    the current version (?v=<etag>) it is cacheable as immutable; otherwise the
+    browser revalidates and gets a 304 while the report is unchanged.
+    """
+    user_id = sess.get("auth")
+    try:
+        process = feedback_process_tb[process_id]
+    except Exception:
+        return "Not found", 404
+    if process.user_id != user_id:
+        return "Unauthorized", 401
+    report_html = stored_report_html(process)
+    if not report_html:
+        return "Not found", 404
+
+    etag = report_etag(report_html)
+    headers = {
+        "ETag": etag,
+        "Cache-Control": (f"private, max-age={REPORT_CACHE_SECONDS}, immutable" if v == etag.strip('"')
+                          else "private, no-cache"),
+    }
+    if etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers=headers)
+    return HTMLResponse(f'<div id="report-body">{report_html}</div>', headers=headers)
+
+@app.get("/feedback-process/{process_id}/report-status")
+def get_report_status(process_id: str, sess):
+    """
+    JSON status of the process's report job, for polling: queued, running (with the
+    text so far), done (with the stored report) or failed. "idle" means no job has started.
+    """
+    user_id = sess.get("auth")
+    try:
+        process = feedback_process_tb[process_id]
+    except Exception:
+        return JSONResponse({"error": "Not found"}, status_code=404)
+    if process.user_id != user_id:
+        return JSONResponse({"error": "Unauthorized"}, status_code=401)
+
+    job = get_report_job(process_id)
+    if job is None:
+        return JSONResponse({"process_id": process_id, "status": "idle"})
+    return JSONResponse(job.snapshot())
+
 # -------------------------------
 # Route: Feedback Submission
 # -------------------------------
@@ -1555,17 +1556,15 @@ def get_feedback_form(request_token: str):
     # make sure the first letter of the requestor's name is capitalized
     requestor_name = requestor_name[0].upper() + requestor_name[1:]
 
-    introduction_text = Div(f"""{requestor_name} is completing a 360 feedback process through [Feedback to Me](https://feedback-to.me), and would like your help! """,
-    cls='marked')
+    introduction_text = RenderedMarkdown(f"""{requestor_name} is completing a 360 feedback process through [Feedback to Me](https://feedback-to.me), and would like your help! """)
 
-    process_explanation = Div(f"""Once you submit your feedback, we'll anonymise it, and compile it into a report for {requestor_name}. You can learn more about Feedback to Me, and how we handle your data and generate feedback [on our website.](https://feedback-to.me/)""",
-    cls='marked')
+    process_explanation = RenderedMarkdown(f"""Once you submit your feedback, we'll anonymise it, and compile it into a report for {requestor_name}. You can learn more about Feedback to Me, and how we handle your data and generate feedback [on our website.](https://feedback-to.me/)""")
 
-    checkbox_text = Div(f"Please rate {requestor_name} on the following qualities:", cls='marked')   
+    checkbox_text = RenderedMarkdown(f"Please rate {requestor_name} on the following qualities:")   
 
-    textbox_text = Div(f"""Please take a few minutes to provide specific feedback around your experience working with {requestor_name}. Try and focus your comments on specific behaviors and their impact - be constructive and offer specific examples.
+    textbox_text = RenderedMarkdown(f"""Please take a few minutes to provide specific feedback around your experience working with {requestor_name}. Try and focus your comments on specific behaviors and their impact - be constructive and offer specific examples.
                        Remember, your feedback will be totally anonymous: our AI models will review it and remove any identifiable details - so we'd encourage you to be as honest and open as possible.
-                       """, cls='marked')
+                       """)
 
 
     onward_request_id = request_token
@@ -1588,7 +1587,8 @@ def get_feedback_form(request_token: str):
                    )
               ) for q in qualities],
               textbox_text,
-            Textarea(name="feedback_text", id="feedback_text", placeholder="Provide detailed feedback...", rows=5, required=True),
+            Textarea(name="feedback_text", id="feedback_text", placeholder="Provide detailed feedback...", rows=5, required=True,
+                     maxlength=FEEDBACK_TEXT_MAX_CHARS),
         Button("Submit Feedback", type="submit"),
         hx_post=f"/new-feedback-form/{onward_request_id}/submit", hx_target="body", hx_swap="outerHTML"
     )
@@ -1596,8 +1596,8 @@ def get_feedback_form(request_token: str):
 
 @app.get("/feedback-submitted")
 def get_feedback_submitted():
-    thank_you_text = Div("Thank you for your feedback! It has been submitted successfully.", cls='marked')
-    learn_more_text = Div(f"If you'd like to generate your own free feedback report, check out [Feedback to Me!](https://feedback-to.me)", cls='marked')
+    thank_you_text = RenderedMarkdown("Thank you for your feedback! It has been submitted successfully.")
+    learn_more_text = RenderedMarkdown(f"If you'd like to generate your own free feedback report, check out [Feedback to Me!](https://feedback-to.me)")
     return Titled("Feedback Submitted", thank_you_text, learn_more_text,footer_bar)
     
 
@@ -1606,6 +1606,9 @@ def get_feedback_submitted():
 def submit_feedback_form(request_token: str, feedback_text: str, data : dict, request: Request):
     from html import escape
     logger.debug(f"Submitting feedback form with data: {data}")
+    if len(feedback_text) > FEEDBACK_TEXT_MAX_CHARS:
+        logger.warning(f"Rejected feedback of {len(feedback_text)} chars for request {request_token}")
+        return f"Feedback is too long. Please keep it under {FEEDBACK_TEXT_MAX_CHARS:,} characters.", 400
     try:
         feedback_request = feedback_request_tb[request_token]
         logger.debug('Found feedback request')
@@ -1662,36 +1665,26 @@ def submit_feedback_form(request_token: str, feedback_text: str, data : dict, re
             "created_at": datetime.now()
         }
         logger.debug(f"Submission data prepared: {submission_data}")
-        submission = feedback_submission_tb.insert(submission_data)
-        feedback_themes = convert_feedback_text_to_themes(feedback_text)
-        if feedback_themes:
-            for sentiment in ["positive", "negative", "neutral"]:
-                if len(feedback_themes[sentiment]) > 0:
-                    for theme in feedback_themes[sentiment]:
-                        theme_data = {
-                            "id": secrets.token_hex(8),
-                            "feedback_id": submission.id,
-                            "theme": theme,
-                            "sentiment": sentiment,
-                            "created_at": datetime.now()
-                        }
-                        feedback_themes_tb.insert(theme_data)
-        process = feedback_process_tb[feedback_request.process_id]
-        new_count = process.feedback_count + 1
-        feedback_process_tb.update(
-            {"feedback_count": new_count},
-            feedback_request.process_id
-        )
-        feedback_request_tb.update(feedback_request, completed_at=datetime.now(), token=request_token)
-
-        # Check if we've just reached the minimum submissions threshold
-        if (new_count >= process.min_submissions_required and 
-            not process.feedback_report):
-            # Get the user who created the feedback process
-            process_owner = users("id=?", (process.user_id,))[0]
-            # Send notification email
-            send_report_ready_email(process_owner.email, process_owner.first_name)
-            logger.info(f"Sent report ready notification to {process_owner.email}")
+        with db.conn:
+            submission = feedback_submission_tb.insert(submission_data)
+            add_ratings(feedback_request.process_id, feedback_request.user_type, ratings)
+            bump_report_input_version(feedback_request.process_id)
+            # Theme extraction runs in the background worker (see worker.py)
+            enqueue_job("extract_themes", {"submission_id": submission.id})
+            process = feedback_process_tb[feedback_request.process_id]
+            new_count = process.feedback_count + 1
+            feedback_process_tb.update(
+                {"feedback_count": new_count},
+                feedback_request.process_id
+            )
+            feedback_request_tb.update(feedback_request, completed_at=datetime.now(), token=request_token)
+
+            # Check if we've just reached the minimum submissions threshold
+            if (new_count >= process.min_submissions_required and 
+                not process.feedback_report):
+                process_owner = users("id=?", (process.user_id,))[0]
+                queue_report_ready_email(process_owner.email, process_owner.first_name)
+                logger.info(f"Queued report ready notification for process {process.id}")
         return RedirectResponse("/feedback-submitted", status_code=303)
     except Exception as e:
         logger.error(f"Error submitting feedback: {str(e)}")
@@ -1730,6 +1723,8 @@ def add_feedback_request(process_id: str, email: str, role: str, sess):
         
         # Return updated requests section
         requests = feedback_request_tb("process_id=?", (process_id,))
+        queued_tokens = outstanding_request_tokens(process_id)
+        failed_invites = failed_request_invites(process_id)
         requests_list = []
         for feedback_request in requests:
             submission = feedback_request.completed_at
@@ -1749,16 +1744,7 @@ def add_feedback_request(process_id: str, email: str, role: str, sess):
                         P(
                             Button("Copy link to clipboard", cls="request-status-button", onclick=f"if(navigator.clipboard && navigator.clipboard.writeText){{ navigator.clipboard.writeText('{generate_external_link(uri('new-feedback-form', process_id=feedback_request.token))}').then(()=>{{ let btn=this; btn.setAttribute('data-tooltip', 'Copied to clipboard!'); setTimeout(()=>{{ btn.removeAttribute('data-tooltip'); }}, 1000); }}); }} else {{ alert('Clipboard functionality is not supported in this browser.'); }}"),
                             " ",
-                            Div(
-                                (P(f"Email sent on {feedback_request.email_sent}") 
-                                if feedback_request.email_sent
-                                else Button("Send email", 
-                                    hx_post=f"/feedback-process/{process_id}/send_email?token={feedback_request.token}", 
-                                    hx_target=f"#email-status-{feedback_request.token}", 
-                                    hx_swap="outerHTML",  cls="request-status-button")
-                                ),
-                                id=f"email-status-{feedback_request.token}", 
-                            ), 
+                            email_status(process_id, feedback_request, queued_tokens, failed_invites),
                         ),
                         cls="form-links-row",
                         hidden=True if submission else False
@@ -1816,8 +1802,11 @@ def delete_feedback_request(process_id: str, token: str, sess):
         submissions = feedback_submission_tb("request_id=?", (token,))
 
         if len(submissions) > 0 :   
-            for submission in submissions:
-                feedback_submission_tb.delete(submission.id)
+            with db.conn:
+                for submission in submissions:
+                    feedback_submission_tb.delete(submission.id)
+                    remove_ratings(process_id, request.user_type, submission.ratings)
+                bump_report_input_version(process_id)
         
         # Only refund credit if no report exists
         if not process.feedback_report:
@@ -1848,6 +1837,9 @@ def delete_process(process_id: str, sess):
         if process.user_id != user_id:
             return "Unauthorized", 401
         
+        # Cached LLM results contain the process's feedback, so remove them first
+        llm_cache.purge_process(process_id)
+        
         # Only refund credits if no report exists
         if not process.feedback_report:
             # Get all pending requests to refund credits
@@ -1877,6 +1869,7 @@ def delete_process(process_id: str, sess):
             feedback_request_tb.delete(request.token)
             
         # Finally delete the process itself
+        delete_process_stats(process_id)
         feedback_process_tb.delete(process_id)
         
         # Redirect to dashboard
@@ -1886,6 +1879,22 @@ def delete_process(process_id: str, sess):
         logger.error(f"Error deleting feedback process: {str(e)}")
         return "Error deleting feedback process", 500
 
+# -----------------------
+# Routes: Health
+# -----------------------
+@app.get("/health")
+def health():
+    """
+    Health check for the platform's probes. Fails with 503 once a due email has
+    waited longer than EMAIL_OUTBOX_MAX_LAG_SECONDS, i.e. the worker that delivers
+    the outbox has stopped.
+    """
+    lag = delivery_lag_seconds()
+    if lag > EMAIL_OUTBOX_MAX_LAG_SECONDS:
+        logger.error(f"Email outbox delivery has stalled: oldest due email waiting {lag:.0f}s")
+        return JSONResponse({"status": "unhealthy", "email_delivery_lag_seconds": round(lag)}, status_code=503)
+    return JSONResponse({"status": "ok", "email_delivery_lag_seconds": round(lag)})
+
 # -----------------------
 # Routes: Admin
 # -----------------------
@@ -1909,6 +1918,12 @@ def get_admin(request: Request):
     total_submissions = len(feedback_submission_tb()) 
     total_themes = len(feedback_themes_tb())
     total_reports = len(feedback_process_tb("feedback_report IS NOT NULL"))
+    cache_stats = llm_cache.stats()
+    limiter_stats = llm_limiter.stats()
+    llm_telemetry.flush()
+    task_stats = llm_telemetry.task_latency_stats()
+    model_stats = llm_telemetry.model_stats()
+    email_stats = outbox_stats()
 
     status_window = Article(
         H2("System Status"),
@@ -1920,14 +1935,45 @@ def get_admin(request: Request):
                 Div(H3("Submissions"), P(f"{total_submissions}"), cls="stat-item"), 
                 Div(H3("Themes"), P(f"{total_themes}"), cls="stat-item"),
                 Div(H3("Reports"), P(f"{total_reports}"), cls="stat-item"),
+                *[Div(H3(f"LLM Queue: {lane.title()}"),
+                      P(f"{lane_stats['active']} active / {lane_stats['queued']} queued (max {lane_stats['max_depth']}), "
+                        f"wait p95 {lane_stats['p95_wait_ms'] / 1000:.1f}s, max {lane_stats['max_wait_ms'] / 1000:.1f}s"),
+                      cls="stat-item")
+                  for lane, lane_stats in limiter_stats.items()],
+                Div(H3("Email Outbox"),
+                    P(f"{email_stats['depth']} waiting, oldest {email_stats['oldest_age_seconds'] / 60:.1f} min "
+                      f"({email_stats['retrying']} retrying, {email_stats['dead']} dead-lettered)"),
+                    cls="stat-item"),
+                Div(H3("LLM Cache Hit Rate"), P(f"{cache_stats['hit_rate']:.0%} ({cache_stats['hits']} hits / {cache_stats['misses']} misses)"), cls="stat-item"),
                 cls="stats-grid"
             ),
             cls="report-section"
         )
     )
 
+    llm_window = Article(
+        H2(f"LLM Calls (last {LLM_TELEMETRY_WINDOW_DAYS} days)"),
+        Table(
+            Thead(Tr(Th("Task"), Th("Calls"), Th("p50"), Th("p95"), Th("p99"), Th("Fallback"), Th("Parse errors"), Th("Errors"))),
+            Tbody(*[Tr(
+                Td(row["task"]), Td(row["calls"]),
+                Td(f"{row['p50_ms'] / 1000:.1f}s"), Td(f"{row['p95_ms'] / 1000:.1f}s"), Td(f"{row['p99_ms'] / 1000:.1f}s"),
+                Td(f"{row['fallback_rate']:.0%}"), Td(f"{row['parse_error_rate']:.0%}"), Td(f"{row['error_rate']:.0%}"),
+            ) for row in task_stats])
+        ),
+        Table(
+            Thead(Tr(Th("Model"), Th("Calls"), Th("Success"), Th("Avg latency"), Th("Prompt tokens"), Th("Completion tokens"), Th("Est. cost"))),
+            Tbody(*[Tr(
+                Td(row["model"]), Td(row["calls"]), Td(f"{row['success_rate']:.0%}"), Td(f"{row['avg_latency_ms'] / 1000:.1f}s"),
+                Td(f"{row['prompt_tokens']:,}"), Td(f"{row['completion_tokens']:,}"), Td(f"${row['cost_usd']:.2f}"),
+            ) for row in model_stats])
+        ) if model_stats else P("No LLM calls recorded yet."),
+        cls="report-section"
+    )
+
     admin_page = Container(
         status_window,
+        llm_window,
         H2("Admin Dashboard"),
         P("Welcome to the admin dashboard."),
         Div(P("Database uploaded successfully!", cls="success"), cls="alert") if success else None,
@@ -1967,7 +2013,7 @@ def download_db(request: Request):
         backup_path = f"data/feedback_backup_{timestamp}.db"
         
         # Create a proper SQLite backup
-        source = sqlite3.connect("data/feedback.db")
+        source = sqlite3.connect(DATABASE_PATH)
         dest = sqlite3.connect(backup_path)
         source.backup(dest)
         source.close()
@@ -2031,7 +2077,7 @@ async def upload_db(request : Request):
             
             # Create backup of current database using SQLite backup API
             backup_path = f"data/feedback_backup_{timestamp}.db"
-            source = sqlite3.connect("data/feedback.db")
+            source = sqlite3.connect(DATABASE_PATH)
             backup = sqlite3.connect(backup_path)
             source.backup(backup)
             source.close()
@@ -2039,7 +2085,7 @@ async def upload_db(request : Request):
             
             try:
                 # Replace current database with uploaded one using SQLite backup API
-                dest = sqlite3.connect("data/feedback.db")
+                dest = sqlite3.connect(DATABASE_PATH)
                 source = sqlite3.connect(temp_path)
                 source.backup(dest)
                 source.close()
@@ -2054,7 +2100,7 @@ async def upload_db(request : Request):
             except Exception as e:
                 # Restore from backup if something went wrong
                 if os.path.exists(backup_path):
-                    dest = sqlite3.connect("data/feedback.db")
+                    dest = sqlite3.connect(DATABASE_PATH)
                     backup = sqlite3.connect(backup_path)
                     backup.backup(dest)
                     backup.close()
@@ -2081,20 +2127,63 @@ async def upload_db(request : Request):
 @app.post("/feedback-process/{process_id}/send_email")
 def send_feedback_email_route(process_id: str, token: str, recipient_first_name: str = ""):
     try:
-        req = feedback_request_tb[token]
         process = feedback_process_tb[process_id]
         sender = users("id=?", (process.user_id,))[0]
-        link = uri("new-feedback-form", process_id=req.token)
-        success = send_feedback_email(req.email, link, recipient_first_name, sender.first_name)
-        if success:
-            feedback_request_tb.update({"email_sent": datetime.now()}, token=token)
-            return P("Email sent successfully!")
-        else:
-            return P("Failed to send email."), 500
+        queue_invites(process_id, uri("new-feedback-form", process_id=""), sender.first_name, token=token,
+                      recipient_first_name=recipient_first_name)
+        return email_status(process_id, feedback_request_tb[token], outstanding_request_tokens(process_id), {})
     except Exception as e:
-        logger.error(f"Error sending email for token {token}: {str(e)}")
+        logger.error(f"Error queueing email for token {token}: {str(e)}")
         return P("Error sending email."), 500
 
+@app.get("/feedback-process/{process_id}/email-status/{token}")
+def get_email_status(process_id: str, token: str, sess):
+    """A request's email status, polled by the process page while its invite is queued."""
+    try:
+        process = feedback_process_tb[process_id]
+        feedback_request = feedback_request_tb[token]
+    except Exception:
+        return P("Feedback request not found."), 404
+    if process.user_id != sess.get("auth") or feedback_request.process_id != process_id:
+        return P("Unauthorized"), 401
+    return email_status(process_id, feedback_request, outstanding_request_tokens(process_id),
+                        failed_request_invites(process_id))
+
+@app.post("/feedback-process/{process_id}/send_all_emails")
+def send_all_feedback_emails_route(process_id: str, sess):
+    """
+    Queues an email for every pending request in a process that hasn't been
+    emailed yet. The requests are claimed and queued in one statement, so a
+    second tab sending at the same time queues nothing twice. The worker
+    delivers them concurrently and records each request's email_sent as it goes.
+
+    Returns the per-recipient results, plus out-of-band updates to the email
+    status of each queued request on the process page, which then poll until
+    the invite is delivered or dead-lettered.
+    """
+    user_id = sess.get("auth")
+    try:
+        process = feedback_process_tb[process_id]
+    except Exception:
+        return P("Feedback process not found."), 404
+    if process.user_id != user_id:
+        return P("Unauthorized"), 401
+
+    sender = users("id=?", (process.user_id,))[0]
+    queued = queue_invites(process_id, uri("new-feedback-form", process_id=""), sender.first_name)
+    logger.info(f"Bulk send for process {process_id}: queued {len(queued)} emails")
+
+    return (
+        Div(
+            P(f"Queued {len(queued)} emails for sending." if queued else "No emails left to send."),
+            Ul(*[Li(f"{row['recipient']}: ", Strong("queued")) for row in queued]),
+            id="bulk-email-results",
+        ),
+        *[Div(P("Email queued for sending."), id=f"email-status-{row['request_token']}", hx_swap_oob="true",
+              hx_get=f"/feedback-process/{process_id}/email-status/{row['request_token']}",
+              hx_trigger="every 5s", hx_swap="outerHTML") for row in queued],
+    )
+
 # Stripe Webhook Handler
 @app.post("/stripe-webhook")
 async def stripe_webhook(request: Request):
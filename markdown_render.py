@@ -0,0 +1,153 @@
+"""
+Server-side markdown rendering.
+
+Reports and the site's static copy used to be rendered in the browser by
+MarkdownJS, which every page loaded. They are now rendered here instead: the
+report once, when it is stored, and static copy when the page is built.
+
+The renderer covers the markdown the app actually produces (headings,
+paragraphs, emphasis, inline code, fenced code, nested lists, blockquotes,
+rules and links). Its output is safe by construction: all input is
+HTML-escaped before any markup is added, so the only tags in the output are
+the ones below, and links are only emitted for http(s), mailto and relative
+URLs.
+"""
+
+import re
+from html import escape
+from typing import List, Tuple
+
+from fasthtml.common import Div, NotStr
+
+_HEADING_RE = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+_RULE_RE = re.compile(r"^ {0,3}([-*_])(?:\s*\1){2,}\s*$")
+_LIST_ITEM_RE = re.compile(r"^(\s*)([-*+]|\d+[.)])\s+(.*)$")
+_QUOTE_RE = re.compile(r"^\s*>\s?(.*)$")
+_FENCE_RE = re.compile(r"^\s*(```|~~~)")
+
+_CODE_SPAN_RE = re.compile(r"`([^`]+)`")
+_LINK_RE = re.compile(r"\[([^\]]+)\]\(([^()\s]+)\)")
+_STRONG_RE = re.compile(r"\*\*(?=\S)(.+?)(?<=\S)\*\*|__(?=\S)(.+?)(?<=\S)__")
+_EM_RE = re.compile(r"(?<![\w*])\*(?=\S)(.+?)(?<=\S)\*(?![\w*])|(?<![\w_])_(?=\S)(.+?)(?<=\S)_(?![\w_])")
+_SAFE_URL_RE = re.compile(r"^(?:https?://|mailto:|/|#)", re.I)
+
+
+def _emphasis(text: str) -> str:
+    text = _STRONG_RE.sub(lambda m: f"<strong>{m.group(1) or m.group(2)}</strong>", text)
+    return _EM_RE.sub(lambda m: f"<em>{m.group(1) or m.group(2)}</em>", text)
+
+
+def _link(match: re.Match) -> str:
+    label, url = match.group(1), match.group(2)
+    if not _SAFE_URL_RE.match(url):
+        return match.group(0)
+    return f'<a href="{url}">{label}</a>'
+
+
+def _inline(text: str) -> str:
+    """Renders inline markdown in one line or paragraph of text."""
+    parts = _CODE_SPAN_RE.split(escape(text.strip()))
+    # split() alternates plain text and code span contents
+    return "".join(f"<code>{part}</code>" if i % 2 else _emphasis(_LINK_RE.sub(_link, part))
+                   for i, part in enumerate(parts))
+
+
+def _blocks(lines: List[str]) -> List[str]:
+    out: List[str] = []
+    paragraph: List[str] = []
+    lists: List[Tuple[int, str]] = []  # (indent, tag) of each open list, innermost last
+
+    def close_paragraph():
+        if paragraph:
+            out.append(f"<p>{_inline(chr(10).join(paragraph))}</p>")
+            paragraph.clear()
+
+    def close_lists(indent: int = -1):
+        while lists and lists[-1][0] > indent:
+            out.append(f"</li></{lists.pop()[1]}>")
+
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        if not line.strip():
+            close_paragraph()
+            i += 1
+            continue
+
+        fence = _FENCE_RE.match(line)
+        if fence:
+            close_paragraph()
+            close_lists()
+            code = []
+            i += 1
+            while i < len(lines) and not lines[i].strip().startswith(fence.group(1)):
+                code.append(lines[i])
+                i += 1
+            out.append(f"<pre><code>{escape(chr(10).join(code))}</code></pre>")
+            i += 1
+            continue
+
+        item = _LIST_ITEM_RE.match(line)
+        if item and not _RULE_RE.match(line):
+            close_paragraph()
+            indent, tag = len(item.group(1).expandtabs(4)), "ol" if item.group(2)[0].isdigit() else "ul"
+            close_lists(indent)
+            if lists and lists[-1][0] == indent and lists[-1][1] != tag:
+                out.append(f"</li></{lists.pop()[1]}>")
+            if lists and lists[-1][0] == indent:
+                out.append("</li>")
+            else:
+                out.append(f"<{tag}>")
+                lists.append((indent, tag))
+            out.append(f"<li>{_inline(item.group(3))}")
+            i += 1
+            continue
+
+        if lists and line[:1].isspace() and not paragraph:
+            # Indented text under a list item continues that item
+            out.append(f" {_inline(line)}")
+            i += 1
+            continue
+
+        close_lists()
+        heading = _HEADING_RE.match(line.strip())
+        if heading:
+            close_paragraph()
+            level = len(heading.group(1))
+            out.append(f"<h{level}>{_inline(heading.group(2))}</h{level}>")
+        elif _RULE_RE.match(line):
+            close_paragraph()
+            out.append("<hr>")
+        elif _QUOTE_RE.match(line):
+            close_paragraph()
+            quoted = []
+            while i < len(lines) and _QUOTE_RE.match(lines[i]):
+                quoted.append(_QUOTE_RE.match(lines[i]).group(1))
+                i += 1
+            out.append(f"<blockquote>{''.join(_blocks(quoted))}</blockquote>")
+            continue
+        else:
+            paragraph.append(line.strip())
+        i += 1
+
+    close_paragraph()
+    close_lists()
+    return out
+
+
+def render_markdown(text: str) -> str:
+    """
+    Renders markdown to sanitized HTML.
+
+    Args:
+        text: Markdown source; any HTML in it is escaped, not interpreted
+
+    Returns:
+        HTML fragment
+    """
+    return "".join(_blocks((text or "").replace("\r\n", "\n").split("\n")))
+
+
+def RenderedMarkdown(text: str, **kwargs):
+    """A Div containing text rendered from markdown on the server."""
+    return Div(NotStr(render_markdown(text)), **kwargs)
@@ -1,12 +1,71 @@
 from fasthtml.common import *
 from datetime import datetime, timedelta
 from fastcore.basics import patch
+import threading
+import time
+
+import apsw
+
+from config import DATABASE_PATH, DATABASE_BUSY_TIMEOUT_MS
 
 
 # -------------------------
 # Database and Schema Setup
 # -------------------------
-db = database("data/feedback.db")
+
+class ThreadConnections:
+    """
+    Stands in for db.conn, forwarding every call to an apsw connection owned by
+    the calling thread.
+
+    SQLite transactions belong to a connection, so with one shared connection a
+    `with db.conn:` block in one thread would also take in (and roll back)
+    writes made by every other thread meanwhile. Giving each thread its own
+    connection keeps each transaction to its own thread's statements; SQLite
+    serialises the writers (apswutils turns on WAL for every connection).
+    apswutils' busy timeout is only 100ms, so each connection's is raised to
+    DATABASE_BUSY_TIMEOUT_MS, letting a writer wait out another thread's
+    transaction instead of failing.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+
+    def _open(self) -> apsw.Connection:
+        # apswutils' connection hooks run an optimize pragma under their 100ms busy
+        # timeout, so opening can fail while another thread writes; retry until ours
+        deadline = time.monotonic() + DATABASE_BUSY_TIMEOUT_MS / 1000
+        while True:
+            try:
+                conn = apsw.Connection(self.path)
+                break
+            except apsw.BusyError:
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.05)
+        conn.set_busy_timeout(DATABASE_BUSY_TIMEOUT_MS)
+        return conn
+
+    def _conn(self) -> apsw.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._open()
+        return conn
+
+    def __getattr__(self, name):
+        return getattr(self._conn(), name)
+
+    def __enter__(self):
+        return self._conn().__enter__()
+
+    def __exit__(self, *exc_info):
+        return self._conn().__exit__(*exc_info)
+
+
+db = database(DATABASE_PATH)
+db.conn.close()
+db.conn = ThreadConnections(DATABASE_PATH)
 # Users table: using email as unique identifier
 from dataclasses import dataclass
 from typing import Dict, List, Optional
@@ -41,6 +100,11 @@ class FeedbackProcess:
     feedback_count: int
     report_submission_prompt: Optional[str] = None  
     feedback_report: Optional[str] = None  # filled_when_report_generated
+    feedback_report_html: Optional[str] = None  # feedback_report rendered by markdown_render.py when stored
+    report_input_fingerprint: Optional[str] = None  # hash of the report input and prompt version (see report_jobs.py)
+    input_version: int = 0  # bumped whenever the report input changes (see report_jobs.py)
+    input_fingerprint: Optional[str] = None  # fingerprint of the current report input, cached for input_fingerprint_key
+    input_fingerprint_key: Optional[str] = None  # input_version, prompt version and settings input_fingerprint was computed for
 
 @patch
 def __ft__(self: FeedbackProcess):
@@ -55,7 +119,7 @@ def __ft__(self: FeedbackProcess):
     link = AX(f"{self.process_title} - created on {formatted_date}", href= f'/feedback-process/{self.id}', id=f'process-{self.id}')   
     return Li(link, id=f'process-{self.id}')
 
-feedback_process_tb = db.create(FeedbackProcess, pk="id")
+feedback_process_tb = db.create(FeedbackProcess, pk="id", transform=True)
 
 # FeedbackRequest table: stores requests to individuals
 @dataclass
@@ -78,8 +142,9 @@ class FeedbackSubmission:
     ratings: dict     # Expected to be a JSON-like dict for quality ratings
     process_id: str    # UUID linking to FeedbackProcess table
     created_at: datetime
+    themes_extracted_at: Optional[str] = None  # set when extraction finishes, even if it found no themes
 
-feedback_submission_tb = db.create(FeedbackSubmission, pk="id")
+feedback_submission_tb = db.create(FeedbackSubmission, pk="id", transform=True)
 
 # FeedbackTheme table: stores extracted themes from feedback
 @dataclass
@@ -110,9 +175,94 @@ class PasswordResetToken:
 
 password_reset_tokens_tb = db.create(PasswordResetToken, pk="token")
 
+# Job table: durable queue of background work, consumed by worker.py
+@dataclass
+class Job:
+    id: str
+    kind: str          # e.g. 'extract_themes', 'report_ready_email'
+    payload: str       # JSON-encoded handler arguments
+    status: str        # 'queued', 'running', 'done' or 'failed'
+    attempts: int
+    run_after: str     # ISO timestamp; the job is not claimed before this
+    created_at: datetime
+    locked_until: Optional[str] = None  # visibility timeout while running
+    last_error: Optional[str] = None
+    completed_at: Optional[datetime] = None
+
+jobs_tb = db.create(Job, pk="id")
+jobs_tb.create_index(["status", "run_after"], if_not_exists=True)
+
+# EmailOutbox table: emails waiting to be delivered by worker.py, written in the
+# same transaction as the change that triggers them (see email_outbox.py)
+@dataclass
+class EmailOutbox:
+    id: str
+    kind: str                 # key of email_dispatch.EMAIL_KINDS
+    recipient: str
+    fields: str               # JSON-encoded template fields
+    status: str               # 'pending', 'sending', 'sent' or 'dead'
+    attempts: int
+    next_attempt_at: str      # ISO timestamp; not delivered before this
+    created_at: str           # ISO timestamp
+    request_token: Optional[str] = None  # for invites: the FeedbackRequest whose email_sent is set on delivery
+    locked_until: Optional[str] = None   # visibility timeout while sending
+    last_error: Optional[str] = None
+    sent_at: Optional[str] = None
+
+email_outbox_tb = db.create(EmailOutbox, pk="id", name="email_outbox")
+email_outbox_tb.create_index(["status", "next_attempt_at"], if_not_exists=True)
+email_outbox_tb.create_index(["request_token"], if_not_exists=True)
+
+# LLMCacheEntry table: parsed LLM results keyed by a hash of the request (see llm_cache.py)
+@dataclass
+class LLMCacheEntry:
+    key: str
+    task: str                 # e.g. 'themes', 'anonymity', 'report'
+    value: str                # JSON-encoded parsed result
+    created_at: datetime
+    expires_at: str           # ISO timestamp
+    process_id: Optional[str] = None  # set for entries derived from a process's feedback, so they can be purged
+
+llm_cache_tb = db.create(LLMCacheEntry, pk="key")
+
+# LLMCall table: one row per LLM request, written in batches by llm_telemetry.py
+@dataclass
+class LLMCall:
+    id: int
+    created_at: str           # ISO timestamp
+    task: str                 # 'themes', 'anonymity', 'summary' or 'report'
+    model: str
+    is_fallback: bool
+    latency_ms: float
+    prompt_tokens: int
+    completion_tokens: int
+    cost_usd: float
+    outcome: str              # 'ok', 'parse_error', 'timeout', 'error' or 'cancelled'
+    parse_ok: Optional[bool] = None   # None when the response was never parsed
+    process_id: Optional[str] = None
+
+llm_calls_tb = db.create(LLMCall, pk="id", name="llm_calls")
+llm_calls_tb.create_index(["created_at"], if_not_exists=True)
+llm_calls_tb.create_index(["task", "created_at"], if_not_exists=True)
+
 # Other helper functions
 
 @dataclass
 class Login:
     email: str
     pwd: str
+
+# ProcessQualityStat table: running rating aggregates per (process, role, quality), kept
+# up to date with Welford's algorithm as submissions arrive (see quality_stats.py)
+@dataclass
+class ProcessQualityStat:
+    process_id: str
+    role: str                 # 'peer', 'supervisor' or 'report'
+    quality: str
+    count: int
+    mean: float
+    m2: float                 # sum of squared deviations from the mean
+    min_value: float
+    max_value: float
+
+process_quality_stats_tb = db.create(ProcessQualityStat, pk=["process_id", "role", "quality"], name="process_quality_stats")
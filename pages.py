@@ -3,6 +3,7 @@
 from fasthtml.common import *
 from config import BASE_URL, STARTING_CREDITS, COST_PER_CREDIT_USD
 from models import users
+from markdown_render import RenderedMarkdown
 
 
 def generate_themed_page(page_body, auth=None, page_title="Feedback to Me"):
@@ -63,7 +64,7 @@ landing_page = Container(
         A(Button("Start Free", href="/get-started", cls="btn-primary"), href='/get-started'),
         P("Create your first feedback report at no cost"),
         Div(
-            Div(intro_paragraph, cls='marked'),
+            RenderedMarkdown(intro_paragraph),
             Div(
                 Video(
                     Source(src="/static/feedback-to-me.mp4", type="video/mp4"),
@@ -258,7 +259,7 @@ how_it_works_page = Container(
 
 privacy_policy_page = Container(
     H2("Privacy Policy"),
-    Div("""
+    RenderedMarkdown("""
 ## Introduction
 
 At Feedback to Me, we take your privacy seriously and are committed to protecting your personal data. This Privacy Policy explains how we collect, use, and safeguard your information in compliance with GDPR and other applicable data protection laws.
@@ -352,7 +353,7 @@ For privacy inquiries or to exercise your rights:
 - Data Protection Officer: contact@feedback-to.me
 
 Last updated: February 2025
-    """, cls="marked"),
+    """),
 )
 
 login_or_register_page = Container(
@@ -499,9 +500,9 @@ def faq_page():
                     cls="faq-question",
                     onclick="this.nextElementSibling.style.display = (this.nextElementSibling.style.display === 'none' ? 'block' : 'none');"
                 ),
-                Div(
+                RenderedMarkdown(
                     item["answer"],
-                    cls="marked faq-answer",
+                    cls="faq-answer",
                     style="display:none;"
                 )
             )
@@ -0,0 +1,129 @@
+"""
+Fast local screen for personally identifying details in feedback themes.
+
+Most themes ("You are a good listener") contain nothing that could identify
+anyone, so sending them to the anonymity LLM is wasted latency and cost.
+might_identify() flags a theme if it contains anything the anonymity check
+looks for: a capitalised word that isn't at the start of the theme (names,
+teams, organisations, products), a known first name or organisation even in
+lower case, a date, quarter, weekday or other time reference, contact details,
+or a reference to a specific client, project or event. Only flagged themes are
+sent to the LLM.
+
+The screen is tuned for recall: a false positive only costs an LLM call that
+would have happened anyway, while a false negative lets an identifying detail
+through. benchmarks/pii_prescreen.py measures both on a labelled sample.
+"""
+
+import re
+from typing import Iterable, List
+
+# Capitalised words that are not identifying on their own
+_COMMON_CAPITALISED = {
+    "i", "i'm", "i've", "i'd", "i'll", "you", "your", "you're", "you've", "you'll", "ok", "okay",
+    "english", "excel", "powerpoint", "slack", "email", "ceo", "cto", "cfo", "coo", "vp", "hr", "it",
+    "ai", "kpi", "kpis", "okr", "okrs", "ux", "ui", "qa", "api", "apis", "faq", "tv", "pm",
+}
+
+# First names that are also common English words are only matched when capitalised
+_AMBIGUOUS_NAMES = {
+    "will", "mark", "grace", "faith", "hope", "joy", "rose", "may", "june", "april", "bill", "art", "sue",
+    "pat", "rob", "jack", "frank", "sandy", "dawn", "amber", "ruby", "summer", "victor", "chase", "hunter",
+}
+
+# Common first names, matched case-insensitively (e.g. "helped sarah with onboarding")
+_FIRST_NAMES = {
+    "aaron", "adam", "adrian", "ahmed", "aisha", "alan", "alex", "alexander", "ali", "alice", "alicia", "alison",
+    "amanda", "amy", "andrea", "andrew", "andy", "angela", "anna", "anne", "anthony", "arjun", "ben", "benjamin",
+    "beth", "brian", "carlos", "carol", "caroline", "catherine", "charles", "charlie", "charlotte", "chloe",
+    "chris", "christine", "christopher", "claire", "daniel", "dan", "dave", "david", "deborah", "debbie",
+    "diana", "divya", "dylan", "ed", "edward", "elena", "eliza", "elizabeth", "ella", "emily", "emma", "eric",
+    "ethan", "fatima", "fiona", "gary", "george", "greg", "hannah", "harry", "helen", "henry", "hiroshi", "ian",
+    "isabel", "jacob", "james", "jane", "jason", "jen", "jennifer", "jess", "jessica", "jim", "joe", "john",
+    "jon", "jonathan", "jose", "joseph", "josh", "juan", "julia", "julie", "karen", "kate", "katie", "kevin",
+    "laura", "lauren", "liam", "linda", "lisa", "liz", "lucy", "luis", "maria", "matt", "matthew", "megan",
+    "michael", "michelle", "mike", "mohammed", "muhammad", "nancy", "natalie", "nathan", "neil", "nick",
+    "nicole", "noah", "olivia", "oliver", "omar", "paul", "peter", "phil", "priya", "rachel", "raj", "rebecca",
+    "richard", "robert", "ryan", "sam", "samantha", "sara", "sarah", "scott", "sean", "simon", "sophie",
+    "stephen", "steve", "steven", "susan", "thomas", "tim", "tom", "tony", "wei", "william", "yuki", "zoe",
+}
+
+_ORGANISATIONS = {
+    "google", "microsoft", "amazon", "aws", "apple", "meta", "facebook", "netflix", "salesforce", "oracle",
+    "ibm", "deloitte", "accenture", "mckinsey", "kpmg", "pwc", "nhs", "openai", "stripe", "shopify",
+}
+
+_TOKEN_RE = re.compile(r"[A-Za-z][A-Za-z'&.-]*")
+_LEADING_RE = re.compile(r"^\W*")
+
+_MONTHS = r"jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|jun(?:e)?|jul(?:y)?|aug(?:ust)?|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?"
+_WEEKDAYS = r"monday|tuesday|wednesday|thursday|friday|saturday|sunday|weekend"
+
+_PATTERNS = [
+    # Dates and times: "12/03/2024", "2024-03-12", "March 3rd", "3 March", "in 2023", "Monday"
+    re.compile(r"\b\d{1,4}[/.-]\d{1,2}(?:[/.-]\d{1,4})?\b"),
+    re.compile(rf"\b(?:{_MONTHS})\.?\s+\d{{1,2}}(?:st|nd|rd|th)?\b|\b\d{{1,2}}(?:st|nd|rd|th)?\s+(?:of\s+)?(?:{_MONTHS})\b", re.I),
+    re.compile(rf"\b(?:in|during|since|last|this|next|by|until|before|after)\s+(?:{_MONTHS})\b", re.I),
+    re.compile(r"\b(?:19|20)\d{2}\b"),
+    re.compile(rf"\b(?:{_WEEKDAYS})\b", re.I),
+    # Quarters, halves and fiscal years: "Q4", "H1", "FY24", "last quarter"
+    re.compile(r"\b(?:Q[1-4]|H[12]|FY\s?\d{2,4})\b", re.I),
+    re.compile(r"\b(?:last|this|next|previous|past)\s+(?:quarter|year|month|week|sprint|summer|winter|spring|autumn|fall)\b", re.I),
+    re.compile(r"\b(?:yesterday|today|tomorrow|recently|the other day)\b", re.I),
+    # Contact details, handles and channels
+    re.compile(r"\b[\w.+-]+@[\w-]+\.[\w.]+\b"),
+    re.compile(r"(?<!\w)[@#][\w-]+"),
+    re.compile(r"\+?\d[\d\s().-]{7,}\d"),
+    re.compile(r"\bhttps?://|\bwww\.", re.I),
+    # Specific clients, projects and events: "the Acme account", "project Phoenix", "at the offsite"
+    re.compile(r"\b(?:client|customer|account|vendor|partner|stakeholder)s?\s+(?:called|named|like|such as)\b", re.I),
+    re.compile(r"\b(?:project|programme|program|launch|migration|campaign|incident|outage|offsite|off-site|conference|hackathon|reorg|merger|acquisition|audit)\b", re.I),
+    # Organisation suffixes and named groups: "Acme Ltd", "the data team", "her team"
+    re.compile(r"\b\w+\s+(?:inc|ltd|llc|plc|corp|gmbh)\b", re.I),
+    re.compile(r"\b(?:his|her|their|[a-z]+'s)\s+(?:team|department|group|manager|boss|report)\b", re.I),
+    re.compile(r"\b(?:he|she|him|his|her|hers|mr|mrs|ms|dr)\b\.?", re.I),
+]
+
+
+def _capitalised_tokens(text: str) -> List[str]:
+    """Returns capitalised tokens other than the first word of each sentence."""
+    tokens = []
+    for sentence in re.split(r"(?<=[.!?;:])\s+|\n+", text):
+        words = _TOKEN_RE.findall(_LEADING_RE.sub("", sentence))
+        tokens.extend(word for word in words[1:] if word[0].isupper())
+    return tokens
+
+
+def identifying_features(text: str) -> List[str]:
+    """
+    Returns the features of text that might identify someone (empty if none).
+
+    Args:
+        text: A single feedback theme
+
+    Returns:
+        Short descriptions of what was found, e.g. ["capitalised: John", "pattern: Q4"]
+    """
+    found = []
+    for token in _capitalised_tokens(text):
+        if token.lower().strip(".'") not in _COMMON_CAPITALISED:
+            found.append(f"capitalised: {token}")
+    for token in _TOKEN_RE.findall(text):
+        lower = token.lower()
+        if (lower in _FIRST_NAMES and lower not in _AMBIGUOUS_NAMES) or lower in _ORGANISATIONS:
+            found.append(f"name: {token}")
+    for pattern in _PATTERNS:
+        match = pattern.search(text)
+        if match:
+            found.append(f"pattern: {match.group(0).strip()}")
+    return found
+
+
+def might_identify(text: str) -> bool:
+    """True if a theme might contain an identifying detail and needs the anonymity check."""
+    return bool(identifying_features(text))
+
+
+def flag_themes(themes: Iterable[str]) -> List[bool]:
+    """Runs might_identify over a list of themes."""
+    return [might_identify(theme) for theme in themes]
@@ -0,0 +1,193 @@
+"""
+Running rating statistics per (process, role, quality).
+
+Each submission's ratings are folded into process_quality_stats with
+Welford's online algorithm when the submission is stored, and taken back out
+when a request is deleted, so the report input and any stats view read one
+row per role and quality instead of re-reading every submission. Overall
+per-quality figures are derived by merging the role rows (Chan et al.'s
+parallel form of the same update).
+
+Variance is the population variance, matching the report's original
+from-scratch calculation.
+"""
+
+import json
+import math
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from models import db, process_quality_stats_tb
+from utils import logger
+
+ROLES = ["peer", "supervisor", "report"]
+
+# Role of the empty row a rebuild stores when a process's submissions have no
+# ratings, so readers see the aggregates exist and don't rebuild again. Not in
+# ROLES, so it is never reported.
+_REBUILT_MARKER = ""
+
+
+def _parse_ratings(ratings) -> Dict[str, float]:
+    if isinstance(ratings, str):
+        try:
+            ratings = json.loads(ratings)
+        except json.JSONDecodeError:
+            return {}
+    return {quality: value for quality, value in (ratings or {}).items() if isinstance(value, (int, float))}
+
+
+def add_ratings(process_id: str, role: str, ratings: Dict[str, float]):
+    """
+    Folds one submission's ratings into the process's aggregates. Call inside the
+    transaction that stores the submission.
+    """
+    for quality, value in _parse_ratings(ratings).items():
+        # SQLite evaluates every SET expression against the old row, so this is
+        # Welford's update: mean += delta / n', m2 += delta * (x - mean')
+        db.execute("""
+            INSERT INTO process_quality_stats (process_id, role, quality, count, mean, m2, min_value, max_value)
+            VALUES (?1, ?2, ?3, 1, ?4, 0.0, ?4, ?4)
+            ON CONFLICT (process_id, role, quality) DO UPDATE SET
+                count = count + 1,
+                mean = mean + (excluded.mean - mean) / (count + 1),
+                m2 = m2 + (excluded.mean - mean) * (excluded.mean - (mean + (excluded.mean - mean) / (count + 1))),
+                min_value = MIN(min_value, excluded.min_value),
+                max_value = MAX(max_value, excluded.max_value)""",
+            [process_id, role, quality, value])
+
+
+def _remaining_values(process_id: str, role: str, quality: str) -> List[float]:
+    rows = db.q("""
+        SELECT s.ratings FROM feedback_submission s
+        JOIN feedback_request r ON r.token=s.request_id
+        WHERE s.process_id=? AND r.user_type=?""", [process_id, role])
+    return [value for row in rows for q, value in _parse_ratings(row["ratings"]).items() if q == quality]
+
+
+def remove_ratings(process_id: str, role: str, ratings: Dict[str, float]):
+    """
+    Takes one submission's ratings back out of the process's aggregates. Call in the
+    same transaction as, and after, deleting the submission row.
+
+    Mean and variance are reversed exactly; min/max are recomputed from the
+    remaining submissions only when the removed value was an extreme.
+    """
+    for quality, value in _parse_ratings(ratings).items():
+        rows = db.q("SELECT * FROM process_quality_stats WHERE process_id=? AND role=? AND quality=?",
+                    [process_id, role, quality])
+        if not rows:
+            continue
+        row = rows[0]
+        key = (process_id, role, quality)
+        count = row["count"] - 1
+        if count <= 0:
+            process_quality_stats_tb.delete(key)
+            continue
+
+        mean = (row["count"] * row["mean"] - value) / count
+        m2 = max(row["m2"] - (value - row["mean"]) * (value - mean), 0.0)
+        min_value, max_value = row["min_value"], row["max_value"]
+        if value <= min_value or value >= max_value:
+            remaining = _remaining_values(process_id, role, quality)
+            if remaining:
+                min_value, max_value = min(remaining), max(remaining)
+        process_quality_stats_tb.update({"process_id": process_id, "role": role, "quality": quality, "count": count,
+                                         "mean": mean, "m2": m2, "min_value": min_value, "max_value": max_value})
+
+
+def delete_process_stats(process_id: str):
+    """Removes all aggregates for a process."""
+    db.execute("DELETE FROM process_quality_stats WHERE process_id=?", [process_id])
+
+
+def rebuild_process_stats(process_id: str):
+    """
+    Recomputes a process's aggregates from its submissions (for data stored before the table existed).
+
+    If none of the submissions have ratings, an empty marker row is stored instead,
+    so process_quality_stats doesn't rebuild again on every read.
+    """
+    rows = db.q("""
+        SELECT s.ratings, r.user_type FROM feedback_submission s
+        JOIN feedback_request r ON r.token=s.request_id
+        WHERE s.process_id=?""", [process_id])
+    with db.conn:
+        delete_process_stats(process_id)
+        for row in rows:
+            add_ratings(process_id, row["user_type"], row["ratings"])
+        if not db.q("SELECT 1 FROM process_quality_stats WHERE process_id=? LIMIT 1", [process_id]):
+            process_quality_stats_tb.insert({"process_id": process_id, "role": _REBUILT_MARKER, "quality": "", "count": 0,
+                                             "mean": 0.0, "m2": 0.0, "min_value": 0.0, "max_value": 0.0})
+    logger.info(f"Rebuilt quality statistics for process {process_id} from {len(rows)} submissions")
+
+
+def merge(aggregates: Iterable[Tuple[int, float, float, float, float]]) -> Optional[Tuple[int, float, float, float, float]]:
+    """
+    Combines (count, mean, m2, min, max) aggregates into one, or returns None if there are none.
+    """
+    merged = None
+    for count, mean, m2, min_value, max_value in aggregates:
+        if merged is None:
+            merged = (count, mean, m2, min_value, max_value)
+            continue
+        n_a, mean_a, m2_a, min_a, max_a = merged
+        n = n_a + count
+        delta = mean - mean_a
+        merged = (n, mean_a + delta * count / n, m2_a + m2 + delta * delta * n_a * count / n,
+                  min(min_a, min_value), max(max_a, max_value))
+    return merged
+
+
+def _number(value: float):
+    return int(value) if float(value).is_integer() else value
+
+
+def describe(aggregate: Tuple[int, float, float, float, float]) -> Dict:
+    """Turns a (count, mean, m2, min, max) aggregate into the report's rounded statistics."""
+    count, mean, m2, min_value, max_value = aggregate
+    variance = m2 / count if count > 1 else 0
+    return {
+        "average": round(mean, 2),
+        "variance": round(variance, 2),
+        "std_dev": round(math.sqrt(variance), 2),
+        "count": count,
+        "min": _number(min_value),
+        "max": _number(max_value),
+    }
+
+
+def respondents_by_role(process_id: str) -> Dict[str, int]:
+    """Number of submissions per role, counted in SQL rather than by loading every submission."""
+    return {row["user_type"]: row["n"] for row in db.q("""
+        SELECT r.user_type, COUNT(*) AS n FROM feedback_submission s
+        JOIN feedback_request r ON r.token=s.request_id
+        WHERE s.process_id=? GROUP BY r.user_type""", [process_id])}
+
+
+def process_quality_stats(process_id: str, qualities: List[str]) -> Tuple[Dict[str, Dict[str, Dict]], Dict[str, Dict]]:
+    """
+    Rating statistics for a process, read from the aggregates table.
+
+    Args:
+        process_id: Feedback process
+        qualities: The process's qualities, in the order they should be reported
+
+    Returns:
+        (by_role, overall): by_role maps role -> quality -> statistics, overall maps
+        quality -> statistics across all roles. Qualities without ratings are omitted.
+    """
+    rows = db.q("SELECT * FROM process_quality_stats WHERE process_id=?", [process_id])
+    if not rows and db.q("SELECT 1 FROM feedback_submission WHERE process_id=? LIMIT 1", [process_id]):
+        rebuild_process_stats(process_id)
+        rows = db.q("SELECT * FROM process_quality_stats WHERE process_id=?", [process_id])
+
+    aggregates = {(row["role"], row["quality"]): (row["count"], row["mean"], row["m2"], row["min_value"], row["max_value"])
+                  for row in rows}
+    by_role = {role: {quality: describe(aggregates[role, quality]) for quality in qualities if (role, quality) in aggregates}
+               for role in ROLES}
+    overall = {}
+    for quality in qualities:
+        merged = merge(aggregates[role, quality] for role in ROLES if (role, quality) in aggregates)
+        if merged:
+            overall[quality] = describe(merged)
+    return by_role, overall
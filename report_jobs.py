@@ -0,0 +1,304 @@
+"""
+Single-flight report generation, keyed by feedback process.
+
+Generating a report is one long reasoning-model call, so it runs as a job
+rather than inside the request that asked for it: a coroutine on the LLM event
+loop, streaming with astream, so an in-flight report holds no thread. Every
+request for the same process (a double click, a browser retry, a second tab)
+attaches to the job already in flight instead of starting another
+generation, and the job keeps running if the browser disconnects. Once the
+report is stored on the process, requests get the stored report at once.
+
+The registry is per web process. The report is saved with a conditional
+update, so even two processes generating at once write feedback_report only
+once.
+
+Each stored report carries a fingerprint of the input it was generated from
+and the prompt template version. A request whose input has the same
+fingerprint gets the stored report without a model call; a report is only
+regenerated once its input has actually changed (e.g. after requests were
+added or deleted) or the prompt templates have. Reports stored before
+fingerprints existed are treated as current.
+
+Building the input clusters every theme of the process, so the current
+fingerprint is cached on the process. Changes to the input bump the process's
+input_version in the same transaction, and the cached fingerprint is only
+recomputed once the version (or the prompt or clustering settings) moves on.
+
+Followers can block (wait/follow, for sync code) or await (await_finished/
+afollow, for async route handlers); async followers are woken by the job
+rather than polling it.
+"""
+
+import asyncio
+import hashlib
+import threading
+import time
+from datetime import datetime
+from typing import AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
+
+from models import db, feedback_process_tb
+from markdown_render import render_markdown
+from llm_functions import (astream_completed_feedback_report, build_feedback_report_prompt, clean_markdown,
+                           report_prompt_version, spawn_on_llm_loop)
+from llm_limiter import QueueStatus
+from utils import logger
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+FINISHED = (DONE, FAILED)
+
+_jobs: Dict[str, "ReportJob"] = {}
+_jobs_lock = threading.Lock()
+
+
+class ReportJob:
+    """A report generation for one process, with progress that any number of requests can follow."""
+
+    def __init__(self, process_id: str, status: str = QUEUED, result: Optional[str] = None):
+        self.process_id = process_id
+        self.status = status
+        self.text = ""
+        self.result = result
+        self.error: Optional[str] = None
+        self.queue_position: Optional[int] = None
+        self.started_at = datetime.now()
+        self.finished_at: Optional[datetime] = datetime.now() if status in FINISHED else None
+        self._version = 0
+        self._cond = threading.Condition()
+        self._listeners: List[Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = []
+
+    def _update(self, **fields):
+        with self._cond:
+            for name, value in fields.items():
+                setattr(self, name, value)
+            self._version += 1
+            self._cond.notify_all()
+            listeners = list(self._listeners)
+        for loop, event in listeners:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                # The follower's loop has closed
+                pass
+
+    def snapshot(self) -> Dict:
+        """Current state of the job, as returned by the status endpoint."""
+        with self._cond:
+            return {
+                "process_id": self.process_id,
+                "status": self.status,
+                "queue_position": self.queue_position,
+                "text": self.result if self.status == DONE else self.text,
+                "error": self.error,
+                "started_at": self.started_at.isoformat(),
+                "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            }
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Blocks until the job has finished; returns False if the timeout expired first."""
+        with self._cond:
+            return self._cond.wait_for(lambda: self.status in FINISHED, timeout)
+
+    def follow(self, interval: float = 0) -> Iterator[Dict]:
+        """
+        Yields a snapshot whenever the job changes, at most once per interval
+        seconds, ending with the finished state.
+        """
+        seen = -1
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._version != seen)
+                seen = self._version
+                snapshot = self.snapshot()
+            yield snapshot
+            if snapshot["status"] in FINISHED:
+                return
+            time.sleep(interval)
+
+
+    async def afollow(self, interval: float = 0) -> AsyncIterator[Dict]:
+        """Async counterpart of follow(); waits for the job to signal a change instead of holding a thread."""
+        changed = asyncio.Event()
+        listener = (asyncio.get_running_loop(), changed)
+        with self._cond:
+            self._listeners.append(listener)
+        try:
+            seen = -1
+            while True:
+                changed.clear()
+                with self._cond:
+                    version = self._version
+                    snapshot = self.snapshot() if version != seen else None
+                if snapshot is None:
+                    await changed.wait()
+                    continue
+                seen = version
+                yield snapshot
+                if snapshot["status"] in FINISHED:
+                    return
+                await asyncio.sleep(interval)
+        finally:
+            with self._cond:
+                self._listeners.remove(listener)
+
+    async def await_finished(self):
+        """Async counterpart of wait() without a timeout."""
+        async for _ in self.afollow():
+            pass
+
+
+def report_fingerprint(report_input: str) -> str:
+    """Fingerprint of a report input under the current prompt template version."""
+    return hashlib.sha256(f"{report_prompt_version()}\n{report_input}".encode()).hexdigest()
+
+
+def bump_report_input_version(process_id: str):
+    """
+    Marks a process's report input as changed, so its cached fingerprint is recomputed.
+    Call inside the transaction that changes the input.
+    """
+    db.execute("UPDATE feedback_process SET input_version=COALESCE(input_version, 0)+1 WHERE id=?", [process_id])
+
+
+def current_report_fingerprint(process_id: str, build_input: Callable[[str], str], settings: str = "") -> str:
+    """
+    Fingerprint of the process's current report input, computed at most once per input version.
+
+    Args:
+        process_id: Feedback process
+        build_input: Builds the process's report input, called only when the cached fingerprint is stale
+        settings: Anything else the input depends on (e.g. clustering settings)
+
+    Returns:
+        report_fingerprint() of the current input
+    """
+    row = db.q("""SELECT COALESCE(input_version, 0) AS version, input_fingerprint, input_fingerprint_key
+                  FROM feedback_process WHERE id=?""", [process_id])[0]
+    key = f"{row['version']}:{report_prompt_version()}:{settings}"
+    if row["input_fingerprint"] and row["input_fingerprint_key"] == key:
+        return row["input_fingerprint"]
+
+    fingerprint = report_fingerprint(build_input(process_id))
+    # Only cache it if the input hasn't changed while it was being built
+    db.execute("""UPDATE feedback_process SET input_fingerprint=?, input_fingerprint_key=?
+                  WHERE id=? AND COALESCE(input_version, 0)=?""", [fingerprint, key, process_id, row["version"]])
+    return fingerprint
+
+
+def stored_report_is_current(process, fingerprint: Optional[str]) -> bool:
+    """
+    True if the process has a stored report that matches fingerprint (or if
+    either side has no fingerprint to compare).
+    """
+    if not process.feedback_report:
+        return False
+    return fingerprint is None or process.report_input_fingerprint in (None, fingerprint)
+
+
+def _store_report(process_id: str, prompt: str, report: str, fingerprint: Optional[str] = None) -> str:
+    """
+    Saves the report unless one is already stored for the same input, and
+    returns the stored report. A stored report with a different fingerprint is
+    replaced.
+    """
+    saved = db.q("""
+        UPDATE feedback_process
+        SET report_submission_prompt=?1, feedback_report=?2, report_input_fingerprint=?3, feedback_report_html=?5
+        WHERE id=?4 AND (feedback_report IS NULL OR feedback_report=''
+                         OR (?3 IS NOT NULL AND report_input_fingerprint IS NOT ?3))
+        RETURNING id""", [prompt, report, fingerprint, process_id, render_markdown(report)])
+    if saved:
+        logger.info(f"Saved feedback report for process {process_id}")
+        return report
+    logger.warning(f"Feedback report for process {process_id} was already stored; keeping the existing one")
+    return feedback_process_tb[process_id].feedback_report
+
+
+def stored_report_html(process) -> Optional[str]:
+    """
+    The process's report as HTML, or None if it has no report. Reports stored
+    before HTML was kept are rendered and saved on first use.
+    """
+    if not process.feedback_report:
+        return None
+    if not process.feedback_report_html:
+        process.feedback_report_html = render_markdown(process.feedback_report)
+        db.execute("UPDATE feedback_process SET feedback_report_html=? WHERE id=? AND feedback_report=?",
+                   [process.feedback_report_html, process.id, process.feedback_report])
+    return process.feedback_report_html
+
+
+def report_etag(report_html: str) -> str:
+    """Strong ETag for a rendered report."""
+    return f'"{hashlib.sha256(report_html.encode()).hexdigest()[:32]}"'
+
+
+async def _run(job: ReportJob, build_input: Callable[[str], str], fingerprint: Optional[str]):
+    try:
+        # Building the input reads the database and may summarise sections with blocking calls
+        feedback_report_input = await asyncio.to_thread(build_input, job.process_id)
+        async for chunk in astream_completed_feedback_report(feedback_report_input, process_id=job.process_id,
+                                                            queue_status=True):
+            if isinstance(chunk, QueueStatus):
+                job._update(status=QUEUED, queue_position=chunk.position)
+            else:
+                job._update(status=RUNNING, queue_position=None, text=job.text + chunk)
+        report = await asyncio.to_thread(_store_report, job.process_id, build_feedback_report_prompt(feedback_report_input),
+                                         clean_markdown(job.text), fingerprint)
+        job._update(status=DONE, result=report, finished_at=datetime.now())
+    except Exception as e:
+        logger.error(f"Error generating feedback report for process {job.process_id}: {str(e)}")
+        job._update(status=FAILED, error="Unable to generate feedback report. Please try again later.",
+                    finished_at=datetime.now())
+    finally:
+        # Finished jobs leave the registry once their result is stored; failed ones stay so
+        # the status endpoint can report the failure until the next attempt replaces them
+        with _jobs_lock:
+            if job.status == DONE and _jobs.get(job.process_id) is job:
+                del _jobs[job.process_id]
+
+
+def start_report_job(process_id: str, build_input: Callable[[str], str], fingerprint: Optional[str] = None) -> ReportJob:
+    """
+    Returns the report job for a process, starting one only if none is in flight
+    and the stored report (if any) doesn't match fingerprint.
+
+    Args:
+        process_id: Feedback process to generate the report for
+        build_input: Builds the report prompt input for the process; called in a worker thread
+        fingerprint: report_fingerprint() of the process's current report input; if
+            None, any stored report counts as current
+
+    Returns:
+        The in-flight job, a new one, or an already finished job if the report is stored
+    """
+    with _jobs_lock:
+        job = _jobs.get(process_id)
+        if job and job.status not in FINISHED:
+            logger.info(f"Attaching to in-flight report job for process {process_id}")
+            return job
+
+        process = feedback_process_tb[process_id]
+        if stored_report_is_current(process, fingerprint):
+            return ReportJob(process_id, status=DONE, result=process.feedback_report)
+        if process.feedback_report:
+            logger.info(f"Report input for process {process_id} has changed; regenerating the report")
+
+        job = ReportJob(process_id)
+        _jobs[process_id] = job
+    logger.info(f"Starting report job for process {process_id}")
+    spawn_on_llm_loop(_run(job, build_input, fingerprint))
+    return job
+
+
+def get_report_job(process_id: str) -> Optional[ReportJob]:
+    """
+    Returns the process's report job without starting one: the in-flight or
+    failed job if there is one, a finished job if the report is stored, else None.
+    """
+    with _jobs_lock:
+        job = _jobs.get(process_id)
+    if job:
+        return job
+    stored = feedback_process_tb[process_id].feedback_report
+    return ReportJob(process_id, status=DONE, result=stored) if stored else None
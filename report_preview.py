@@ -0,0 +1,133 @@
+"""
+Instant "report at a glance", rendered straight from a process's rating
+statistics and theme counts.
+
+It needs no LLM call - only the aggregates in process_quality_stats and one
+theme query - so it appears as soon as a process has enough responses, while
+the written report is still being generated, and remains useful if every
+model is down.
+
+To protect respondents' anonymity, a group's averages (and any comparison
+between groups) are only shown once REPORT_PREVIEW_MIN_RESPONDENTS people in
+it have responded, and rating ranges only once that many have responded in
+total.
+"""
+
+import json
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from fasthtml.common import *
+
+from models import db, feedback_process_tb
+from quality_stats import ROLES, process_quality_stats, respondents_by_role
+from theme_clustering import group_by_sentiment, summarize_themes
+from config import THEME_CLUSTERING_ENABLED, THEME_CLUSTER_THRESHOLD, REPORT_PREVIEW_MIN_RESPONDENTS
+
+# Role averages this far apart (on the 1-8 scale) are called out as a gap between groups
+ROLE_GAP_HIGHLIGHT = 1.0
+THEMES_PER_SENTIMENT = 5
+
+
+def preview_from_stats(by_role: Dict[str, Dict[str, Dict]], overall: Dict[str, Dict], respondents: Dict[str, int],
+                       themes: Sequence[Tuple[str, str, str]], min_respondents: int = REPORT_PREVIEW_MIN_RESPONDENTS) -> Dict:
+    """
+    Builds the preview from precomputed statistics.
+
+    Args:
+        by_role: role -> quality -> statistics, as returned by process_quality_stats
+        overall: quality -> statistics across all roles
+        respondents: role -> number of submissions
+        themes: (theme, sentiment, submission id) rows
+        min_respondents: Respondents a role needs before its averages are shown, and
+            the total needed before rating ranges are shown
+
+    Returns:
+        Dictionary with per-quality "rows", "highlights" sentences, top "themes" per
+        sentiment (with how many respondents raised each), the "respondents" total and
+        whether "ranges_shown". Roles below min_respondents are left out of by_role.
+    """
+    total = sum(respondents.values())
+    ranges_shown = total >= min_respondents
+    shown_roles = [role for role in ROLES if respondents.get(role, 0) >= min_respondents]
+    rows = []
+    for quality, stats in overall.items():
+        role_averages = {role: by_role[role][quality]["average"] for role in shown_roles if quality in by_role.get(role, {})}
+        gap = max(role_averages.values()) - min(role_averages.values()) if len(role_averages) > 1 else 0.0
+        rows.append({"quality": quality, "average": stats["average"], "std_dev": stats["std_dev"],
+                     "min": stats["min"], "max": stats["max"], "count": stats["count"],
+                     "by_role": role_averages, "gap": round(gap, 2)})
+
+    highlights = []
+    if rows:
+        strongest = max(rows, key=lambda r: r["average"])
+        weakest = min(rows, key=lambda r: r["average"])
+        highlights.append(f"Highest rated: {strongest['quality']} (average {strongest['average']})")
+        if weakest is not strongest:
+            highlights.append(f"Lowest rated: {weakest['quality']} (average {weakest['average']})")
+        widest_gap = max(rows, key=lambda r: r["gap"])
+        if widest_gap["gap"] >= ROLE_GAP_HIGHLIGHT:
+            averages = widest_gap["by_role"]
+            high, low = max(averages, key=averages.get), min(averages, key=averages.get)
+            highlights.append(f"Biggest difference between groups: {widest_gap['quality']} "
+                              f"({high}s {averages[high]} vs {low}s {averages[low]})")
+        most_divided = max(rows, key=lambda r: r["std_dev"])
+        if ranges_shown and most_divided["count"] > 1:
+            highlights.append(f"Least agreement: {most_divided['quality']} "
+                              f"(ratings from {most_divided['min']} to {most_divided['max']})")
+
+    threshold = THEME_CLUSTER_THRESHOLD if THEME_CLUSTERING_ENABLED else 1.0
+    top_themes = {sentiment: summarize_themes(pairs, threshold)[:THEMES_PER_SENTIMENT]
+                  for sentiment, pairs in group_by_sentiment(themes).items()}
+    return {"rows": rows, "highlights": highlights, "themes": top_themes, "respondents": total,
+            "ranges_shown": ranges_shown}
+
+
+def build_report_preview(process_id: str) -> Optional[Dict]:
+    """Returns the preview for a process, or None if it has no submissions yet."""
+    respondents = respondents_by_role(process_id)
+    if not respondents:
+        return None
+    process = feedback_process_tb[process_id]
+    by_role, overall = process_quality_stats(process_id, json.loads(process.qualities))
+    themes = [(row["theme"], row["sentiment"], row["feedback_id"]) for row in db.q("""
+        SELECT t.theme, t.sentiment, t.feedback_id FROM feedback_theme t
+        JOIN feedback_submission s ON s.id=t.feedback_id
+        WHERE s.process_id=?""", [process_id])]
+    return preview_from_stats(by_role, overall, respondents, themes)
+
+
+def _theme_list(title: str, summaries: List[Dict], respondents: int):
+    if not summaries:
+        return None
+    return Div(
+        H5(title),
+        Ul(*[Li(f"{s['theme']} ", Small(f"({s['support']} of {respondents})")) for s in summaries]),
+    )
+
+
+def report_preview_section(preview: Dict):
+    """Renders the preview as an article for the process page."""
+    roles = [role for role in ROLES if any(role in row["by_role"] for row in preview["rows"])]
+    table = Table(
+        Thead(Tr(Th("Quality"), Th("Average"), *[Th(f"{role.title()}s") for role in roles],
+                 *([Th("Range"), Th("Std dev")] if preview["ranges_shown"] else []))),
+        Tbody(*[Tr(
+            Td(row["quality"]), Td(Strong(row["average"])),
+            *[Td(row["by_role"].get(role, "–")) for role in roles],
+            *([Td(f"{row['min']}–{row['max']}"), Td(row["std_dev"])] if preview["ranges_shown"] else []),
+        ) for row in preview["rows"]]),
+    ) if preview["rows"] else P("No ratings yet.")
+
+    themes = preview["themes"]
+    return Article(
+        H3("Report at a Glance"),
+        P(f"Based on {preview['respondents']} responses. Ratings are out of 8."),
+        Ul(*[Li(h) for h in preview["highlights"]]) if preview["highlights"] else None,
+        table,
+        Div(
+            _theme_list("Most mentioned strengths", themes.get("positive", []), preview["respondents"]),
+            _theme_list("Most mentioned areas for improvement", themes.get("negative", []), preview["respondents"]),
+            cls="grid",
+        ),
+        id="report-preview",
+    )
@@ -0,0 +1,44 @@
+#!/usr/bin/env bash
+# Container entrypoint: runs the web app and the background worker side by side.
+#
+# SIGTERM/SIGINT are forwarded to both, so the worker finishes its current job
+# and email batch before exiting (see worker.run_worker). The worker is
+# restarted if it exits on its own; the container stops if the web app does.
+set -u
+
+stopping=0
+web_pid=""
+worker_pid=""
+
+stop_children() {
+    stopping=1
+    kill -TERM $web_pid $worker_pid 2>/dev/null
+}
+trap stop_children TERM INT
+
+python main.py &
+web_pid=$!
+python worker.py &
+worker_pid=$!
+
+while [ "$stopping" -eq 0 ]; do
+    # Returns when a child exits, or early when a trapped signal arrives
+    wait -n
+    if [ "$stopping" -eq 1 ]; then
+        break
+    fi
+    if ! kill -0 "$web_pid" 2>/dev/null; then
+        echo "Web app exited, stopping the worker"
+        stop_children
+        break
+    fi
+    if ! kill -0 "$worker_pid" 2>/dev/null; then
+        echo "Worker exited, restarting it"
+        sleep 1
+        python worker.py &
+        worker_pid=$!
+    fi
+done
+
+wait $worker_pid
+wait $web_pid
@@ -0,0 +1,27 @@
+import os
+import shutil
+import tempfile
+
+import pytest
+
+# Point the app at a throwaway database before any test imports models, so the
+# tests never touch data/feedback.db (config's load_dotenv doesn't override this)
+_db_dir = tempfile.mkdtemp(prefix="feedback-tests-")
+os.environ["DATABASE_PATH"] = os.path.join(_db_dir, "feedback.db")
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(_db_dir, ignore_errors=True)
+
+@pytest.fixture
+def empty_db():
+    """Empties every table in the test database before and after the test."""
+    from models import db
+    assert os.path.dirname(db.conn.path) == _db_dir, "tests must not run against the app's database"
+
+    def empty():
+        for table in db.table_names():
+            db.execute(f"DELETE FROM [{table}]")
+
+    empty()
+    yield db
+    empty()
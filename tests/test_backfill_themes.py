@@ -0,0 +1,36 @@
+from backfill_themes import make_batches, BATCH_MAX_CHARS
+
+def _submission(i, chars=10):
+    return {"id": f"s{i}", "feedback_text": "x" * chars, "process_id": "p1"}
+
+def test_batches_respect_batch_size():
+    batches = make_batches([_submission(i) for i in range(7)], 3)
+    assert [len(b) for b in batches] == [3, 3, 1]
+
+def test_batches_respect_character_budget():
+    half = BATCH_MAX_CHARS // 2 + 1
+    batches = make_batches([_submission(i, half) for i in range(3)], 10)
+    assert [len(b) for b in batches] == [1, 1, 1]
+
+def test_batch_size_one_disables_batching():
+    assert all(len(b) == 1 for b in make_batches([_submission(i) for i in range(4)], 1))
+
+def test_find_skips_extracted_and_queued_submissions_and_resumes(empty_db):
+    from datetime import datetime
+    from backfill_themes import find_unthemed_submissions
+    from jobs import enqueue_job
+    from models import feedback_submission_tb
+    from worker import store_submission_themes
+
+    for i in range(4):
+        feedback_submission_tb.insert({"id": f"s{i}", "request_id": f"r{i}", "feedback_text": "Good",
+                                       "ratings": "{}", "process_id": "p1", "created_at": datetime(2024, 1, i + 1)})
+    store_submission_themes("s0", {"positive": ["You listen well"]})
+    # Extraction that legitimately finds nothing must not be retried on every run
+    store_submission_themes("s1", {"positive": [], "negative": [], "neutral": []})
+    enqueue_job("extract_themes", {"submission_id": "s2"})
+    assert [s["id"] for s in find_unthemed_submissions()] == ["s3"]
+
+    # An interrupted run resumes from what's left
+    store_submission_themes("s3", {"negative": ["You miss deadlines"]})
+    assert find_unthemed_submissions() == []
@@ -0,0 +1,62 @@
+import asyncio
+import logging
+import os
+
+import httpx
+
+import email_dispatch
+from email_dispatch import EmailKind, asend_email, load_template, send_email
+
+def _use_template(monkeypatch, tmp_path, text):
+    (tmp_path / "t.txt").write_text(text)
+    monkeypatch.setattr(email_dispatch, "TEMPLATE_DIR", str(tmp_path))
+    monkeypatch.setattr(email_dispatch, "EMAIL_KINDS", {"test": EmailKind("t.txt", "Subject")})
+    monkeypatch.setattr(email_dispatch, "SMTP2GO_API_KEY", "key")
+
+def test_template_is_compiled_once_and_reloaded_when_changed(tmp_path, monkeypatch):
+    _use_template(monkeypatch, tmp_path, "Hi {recipient_first_name}, {link} {unknown}")
+    first = load_template("t.txt")
+    assert load_template("t.txt") is first
+    assert first.render({"recipient_first_name": "Sam", "link": "L"}) == "Hi Sam, L {unknown}"
+
+    (tmp_path / "t.txt").write_text("Bye {recipient_first_name}")
+    stat = os.stat(tmp_path / "t.txt")
+    os.utime(tmp_path / "t.txt", ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert load_template("t.txt").render({"recipient_first_name": "Sam"}) == "Bye Sam"
+
+def test_send_uses_pooled_client_and_does_not_log_the_body(tmp_path, monkeypatch, caplog):
+    _use_template(monkeypatch, tmp_path, "Your link: {link}")
+    sent = []
+
+    def handler(request):
+        sent.append(request.read().decode())
+        return httpx.Response(200, json={"data": {"succeeded": 1}})
+
+    monkeypatch.setattr(email_dispatch, "_http_client", httpx.Client(transport=httpx.MockTransport(handler)))
+    with caplog.at_level(logging.DEBUG, logger="utils"):
+        assert send_email("test", "a@example.com", link="https://x/secret-token")
+    assert "secret-token" in sent[0]
+    assert "secret-token" not in caplog.text
+
+def test_async_send_reports_failures(tmp_path, monkeypatch):
+    _use_template(monkeypatch, tmp_path, "{link}")
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, json={"data": {"succeeded": 0}}))
+    monkeypatch.setattr(email_dispatch, "_async_client", lambda: httpx.AsyncClient(transport=transport))
+    assert asyncio.run(asend_email("test", "a@example.com", link="x")) is False
+
+def test_bulk_send_is_bounded_and_keeps_order(tmp_path, monkeypatch):
+    _use_template(monkeypatch, tmp_path, "{link}")
+    in_flight, peak = 0, 0
+
+    async def fake_send(kind, recipient, **fields):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return recipient != "bad@example.com"
+
+    monkeypatch.setattr(email_dispatch, "asend_email", fake_send)
+    messages = [(f"{i}@example.com", {"link": str(i)}) for i in range(9)] + [("bad@example.com", {"link": "x"})]
+    results = asyncio.run(email_dispatch.asend_emails("test", messages, concurrency=3))
+    assert results == [True] * 9 + [False] and peak == 3
@@ -0,0 +1,75 @@
+import asyncio
+import pytest
+
+import email_outbox
+from models import db, email_outbox_tb, feedback_request_tb
+from email_outbox import (queue_email, queue_invites, claim_emails, mark_failed, adeliver_due, outbox_stats, outstanding_request_tokens,
+                          failed_request_invites, prune_outbox, delivery_lag_seconds)
+
+pytestmark = pytest.mark.usefixtures("empty_db")
+
+def test_queued_email_is_rolled_back_with_its_transaction():
+    with pytest.raises(RuntimeError):
+        with db.conn:
+            queue_email("password_reset", "a@example.com", {"link": "x"})
+            raise RuntimeError("business change failed")
+    assert outbox_stats()["depth"] == 0
+
+def test_delivery_marks_invites_sent_and_retries_failures(monkeypatch):
+    feedback_request_tb.insert({"token": "tok-1", "email": "ok@example.com", "user_type": "peer",
+                                "process_id": "outbox-test", "expiry": "2099-01-01"})
+    ok_id = queue_email("feedback_request", "ok@example.com", {"link": "x"}, request_token="tok-1")
+    bad_id = queue_email("feedback_request", "bad@example.com", {"link": "y"})
+    assert outstanding_request_tokens("outbox-test") == {"tok-1"}
+
+    async def fake_send(kind, messages, concurrency=5):
+        return [recipient == "ok@example.com" for recipient, fields in messages]
+
+    monkeypatch.setattr(email_outbox, "asend_emails", fake_send)
+    assert asyncio.run(adeliver_due()) == 2
+    assert email_outbox_tb[ok_id].status == "sent" and email_outbox_tb[ok_id].fields == "{}"
+    assert feedback_request_tb["tok-1"].email_sent is not None
+    assert email_outbox_tb[bad_id].status == "pending" and email_outbox_tb[bad_id].attempts == 1
+    # The failed email is backed off, so it isn't due again yet
+    assert claim_emails() == []
+    stats = outbox_stats()
+    assert (stats["depth"], stats["retrying"], stats["dead"]) == (1, 1, 0) and stats["oldest_age_seconds"] >= 0
+
+def test_email_is_dead_lettered_after_max_attempts(monkeypatch):
+    monkeypatch.setattr(email_outbox, "EMAIL_MAX_ATTEMPTS", 1)
+    email_id = queue_email("report_ready", "a@example.com", {"link": "x"})
+    mark_failed(claim_emails()[0], "boom")
+    assert email_outbox_tb[email_id].status == "dead"
+    assert outbox_stats()["dead"] == 1 and outbox_stats()["depth"] == 0
+
+def test_invites_are_claimed_once():
+    for i in range(3):
+        feedback_request_tb.insert({"token": f"inv-{i}", "email": f"{i}@example.com", "user_type": "peer",
+                                    "process_id": "invite-test", "expiry": "2099-01-01"})
+    queued = queue_invites("invite-test", "form/token=", "Sam")
+    assert sorted(row["request_token"] for row in queued) == ["inv-0", "inv-1", "inv-2"]
+    # A second send (another tab) finds every invite already queued
+    assert queue_invites("invite-test", "form/token=", "Sam") == []
+    assert queue_invites("invite-test", "form/token=", "Sam", token="inv-1") == []
+    email = claim_emails()[0]
+    assert email["fields"]["link"] == "form/token=" + email["request_token"] and email["fields"]["sender_first_name"] == "Sam"
+
+def test_old_sent_emails_are_pruned_and_stalled_delivery_is_measured():
+    email_id = queue_email("report_ready", "a@example.com", {"link": "x"})
+    db.execute("UPDATE email_outbox SET next_attempt_at='2000-01-01T00:00:00' WHERE id=?", [email_id])
+    assert delivery_lag_seconds() > 3600
+    db.execute("UPDATE email_outbox SET status='sent', sent_at='2000-01-01T00:00:00' WHERE id=?", [email_id])
+    assert delivery_lag_seconds() == 0
+    fresh_id = queue_email("report_ready", "b@example.com", {"link": "y"})
+    assert prune_outbox() == 1 and [row["id"] for row in db.q("SELECT id FROM email_outbox")] == [fresh_id]
+
+def test_dead_invites_are_reported_until_requeued(monkeypatch):
+    monkeypatch.setattr(email_outbox, "EMAIL_MAX_ATTEMPTS", 1)
+    feedback_request_tb.insert({"token": "dead-1", "email": "gone@example.com", "user_type": "peer",
+                                "process_id": "dead-test", "expiry": "2099-01-01"})
+    queue_invites("dead-test", "form/token=", "Sam")
+    mark_failed(claim_emails()[0], "mailbox unavailable")
+    assert failed_request_invites("dead-test") == {"dead-1": "mailbox unavailable"}
+    # Retrying the invite replaces the failure with the queued state
+    assert len(queue_invites("dead-test", "form/token=", "Sam", token="dead-1")) == 1
+    assert failed_request_invites("dead-test") == {} and outstanding_request_tokens("dead-test") == {"dead-1"}
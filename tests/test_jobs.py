@@ -0,0 +1,51 @@
+import pytest
+from datetime import datetime, timedelta
+
+from models import db, jobs_tb
+from jobs import enqueue_job, claim_job, complete_job, fail_job, prune_jobs
+
+pytestmark = pytest.mark.usefixtures("empty_db")
+
+def test_claim_marks_job_running():
+    job_id = enqueue_job("extract_themes", {"submission_id": "abc"})
+    job = claim_job(["extract_themes"])
+    assert job["id"] == job_id
+    assert job["payload"] == {"submission_id": "abc"}
+    assert job["attempts"] == 1
+    # A running job is invisible to other workers until its lock expires
+    assert claim_job(["extract_themes"]) is None
+
+def test_claim_ignores_other_kinds_and_future_jobs():
+    enqueue_job("report_ready_email", {"process_id": "p1"})
+    enqueue_job("extract_themes", {"submission_id": "abc"}, delay_seconds=60)
+    assert claim_job(["extract_themes"]) is None
+
+def test_expired_lock_is_reclaimed():
+    job_id = enqueue_job("extract_themes", {"submission_id": "abc"})
+    claim_job()
+    jobs_tb.update({"locked_until": (datetime.now() - timedelta(seconds=1)).isoformat()}, job_id)
+    job = claim_job()
+    assert job["id"] == job_id
+    assert job["attempts"] == 2
+
+def test_failed_job_is_retried_with_backoff():
+    job_id = enqueue_job("extract_themes", {"submission_id": "abc"})
+    job = claim_job()
+    fail_job(job, "boom")
+    stored = jobs_tb[job_id]
+    assert stored.status == "queued"
+    assert stored.last_error == "boom"
+    assert stored.run_after > datetime.now().isoformat()
+
+def test_complete_job():
+    job_id = enqueue_job("extract_themes", {"submission_id": "abc"})
+    complete_job(claim_job()["id"])
+    assert jobs_tb[job_id].status == "done"
+
+def test_old_finished_jobs_are_pruned():
+    old_id, fresh_id, queued_id = (enqueue_job("extract_themes", {"submission_id": s}) for s in ("a", "b", "c"))
+    for job_id in (old_id, fresh_id):
+        complete_job(job_id)
+    jobs_tb.update({"completed_at": (datetime.now() - timedelta(days=30)).isoformat()}, old_id)
+    assert prune_jobs() == 1
+    assert sorted(row["id"] for row in db.q("SELECT id FROM job")) == sorted([fresh_id, queued_id])
@@ -0,0 +1,39 @@
+import pytest
+
+from models import db
+import llm_cache
+
+pytestmark = pytest.mark.usefixtures("empty_db")
+
+def test_key_depends_on_every_input():
+    base = llm_cache.cache_key("model-a", "system", "user", {"temperature": 1})
+    assert base == llm_cache.cache_key("model-a", "system", "user", {"temperature": 1})
+    assert base != llm_cache.cache_key("model-b", "system", "user", {"temperature": 1})
+    assert base != llm_cache.cache_key("model-a", "system", "user 2", {"temperature": 1})
+    assert base != llm_cache.cache_key("model-a", "system", "user", {"temperature": 0})
+
+def test_round_trip_through_database():
+    key = llm_cache.cache_key("model-a", "system", "user", {})
+    llm_cache.put(key, {"positive": ["You listen well"]}, "themes")
+    assert llm_cache.get(key) == {"positive": ["You listen well"]}
+
+def test_expired_entries_are_misses():
+    key = llm_cache.cache_key("model-a", "system", "user", {})
+    llm_cache.put(key, "report", "report", ttl_seconds=-1)
+    assert llm_cache.get(key) is None
+
+def test_purge_process_removes_only_its_entries():
+    kept = llm_cache.cache_key("model-a", "system", "kept", {})
+    purged = llm_cache.cache_key("model-a", "system", "purged", {})
+    llm_cache.put(kept, "a", "report", process_id="p1")
+    llm_cache.put(purged, "b", "report", process_id="p2")
+    assert llm_cache.purge_process("p2") == 1
+    assert llm_cache.get(purged) is None
+    assert llm_cache.get(kept) == "a"
+
+def test_entries_purged_by_another_process_are_not_served():
+    key = llm_cache.cache_key("model-a", "system", "user", {})
+    llm_cache.put(key, "themes", "themes", process_id="p1")
+    # Another OS process (the web app) purges the process's rows
+    db.execute("DELETE FROM llm_cache_entry WHERE process_id=?", ["p1"])
+    assert llm_cache.get(key) is None
@@ -0,0 +1,52 @@
+import threading
+
+from llm_limiter import BACKGROUND, INTERACTIVE, PriorityLimiter
+import llm_limiter
+
+def test_interactive_waiters_are_served_first():
+    limiter = PriorityLimiter(1)
+    running = limiter.acquire(BACKGROUND)
+    background = limiter.enqueue(BACKGROUND)
+    interactive = limiter.enqueue(INTERACTIVE)
+    assert limiter.position(interactive) == 0 and limiter.position(background) == 1
+    limiter.release(running)
+    assert interactive.granted and not background.granted
+
+def test_background_cannot_use_reserved_slots():
+    limiter = PriorityLimiter(3, reserved_interactive=1)
+    held = [limiter.acquire(BACKGROUND) for _ in range(2)]
+    assert limiter.acquire(BACKGROUND, timeout=0.01) is None
+    assert limiter.acquire(INTERACTIVE, timeout=0.01) is not None
+    stats = limiter.stats()
+    assert stats[BACKGROUND]["active"] == 2 and stats[BACKGROUND]["abandoned"] == 1
+    assert len(held) == 2
+
+def test_wait_timeout_keeps_queue_place():
+    limiter = PriorityLimiter(1)
+    running = limiter.acquire(INTERACTIVE)
+    first = limiter.enqueue(INTERACTIVE)
+    assert not limiter.wait(first, timeout=0.01)
+    second = limiter.enqueue(INTERACTIVE)
+    limiter.release(running)
+    assert limiter.wait(first, timeout=1) and not second.granted
+    assert limiter.stats()[INTERACTIVE]["queued"] == 1
+
+def test_nested_slots_hold_one_slot(monkeypatch):
+    monkeypatch.setattr(llm_limiter, "limiter", PriorityLimiter(1))
+    done = threading.Event()
+
+    @llm_limiter.limited(BACKGROUND)
+    def inner():
+        return "ok"
+
+    @llm_limiter.limited(BACKGROUND)
+    def outer():
+        result = inner()
+        done.set()
+        return result
+
+    thread = threading.Thread(target=outer)
+    thread.start()
+    assert done.wait(1)
+    thread.join()
+    assert llm_limiter.stats()[BACKGROUND]["acquired"] == 1
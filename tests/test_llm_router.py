@@ -0,0 +1,46 @@
+import asyncio
+import json
+
+import pytest
+from langchain_core.messages import AIMessage
+
+import llm_router
+from llm_functions import _HedgedLLM, _ainvoke_llm
+
+def test_cache_hits_are_not_recorded_as_model_calls():
+    model = "test/cache-hit-model"
+    assert llm_router.call("themes", model, None, lambda m, fallback: "cached", 5) == "cached"
+    assert llm_router.health(model).snapshot()["calls"] == 0
+
+    def real_call(m, fallback):
+        llm_router.note_model_call()
+        return "answer"
+
+    assert llm_router.call("themes", model, None, real_call, 5) == "answer"
+    assert llm_router.health(model).snapshot()["calls"] == 1
+
+def test_async_model_call_is_recorded_from_a_child_task():
+    model = "test/async-model"
+
+    async def fn(m, fallback):
+        async def invoke():
+            llm_router.note_model_call()
+            return "answer"
+        return await asyncio.create_task(invoke())
+
+    assert asyncio.run(llm_router.acall("themes", model, None, fn, 5)) == "answer"
+    assert llm_router.health(model).snapshot()["calls"] == 1
+
+class _FakeLLM:
+    def __init__(self, model_name, content):
+        self.model_name, self.content = model_name, content
+        self.temperature, self.max_tokens, self.model_kwargs = 0, 100, {}
+
+    async def ainvoke(self, messages, **kwargs):
+        return AIMessage(self.content, response_metadata={"model_name": self.model_name})
+
+@pytest.mark.usefixtures("empty_db")
+def test_hedged_request_falls_back_when_the_first_answer_does_not_parse():
+    llm = _HedgedLLM(_FakeLLM("test/hedge-primary", "not json"), _FakeLLM("test/hedge-secondary", '{"ok": true}'))
+    assert asyncio.run(_ainvoke_llm(llm, [("system", "s"), ("user", "u")], "themes", json.loads)) == {"ok": True}
+    assert llm_router.health("test/hedge-primary").snapshot()["error_rate"] == 1.0
@@ -0,0 +1,36 @@
+import pytest
+
+from models import db
+import llm_telemetry
+
+@pytest.fixture(autouse=True)
+def flushed(empty_db):
+    llm_telemetry.flush()
+    empty_db.execute("DELETE FROM llm_calls")
+
+def test_calls_are_buffered_until_flush():
+    llm_telemetry.record_call("themes", "google/gemini-2.0-flash-001", False, 120.0, 1000, 200)
+    assert db.q("SELECT COUNT(*) AS n FROM llm_calls")[0]["n"] == 0
+    llm_telemetry.flush()
+    row = db.q("SELECT * FROM llm_calls")[0]
+    assert row["task"] == "themes" and row["outcome"] == "ok"
+    assert row["cost_usd"] == pytest.approx((1000 * 0.10 + 200 * 0.40) / 1_000_000)
+
+def test_task_percentiles_and_rates():
+    for latency in range(1, 101):
+        llm_telemetry.record_call("themes", "m", latency > 90, float(latency), outcome="parse_error" if latency <= 10 else "ok")
+    llm_telemetry.flush()
+    stats = llm_telemetry.task_latency_stats()[0]
+    assert (stats["calls"], stats["p50_ms"], stats["p95_ms"], stats["p99_ms"]) == (100, 50, 95, 99)
+    assert stats["fallback_rate"] == pytest.approx(0.1)
+    assert stats["parse_error_rate"] == pytest.approx(0.1)
+
+def test_model_breakdown():
+    llm_telemetry.record_call("report", "a", False, 100.0, 10, 5)
+    llm_telemetry.record_call("report", "a", False, 300.0, 10, 5, outcome="error")
+    llm_telemetry.record_call("report", "b", True, 50.0)
+    llm_telemetry.flush()
+    stats = {row["model"]: row for row in llm_telemetry.model_stats()}
+    assert stats["a"]["calls"] == 2 and stats["a"]["success_rate"] == 0.5
+    assert stats["a"]["avg_latency_ms"] == 200 and stats["a"]["prompt_tokens"] == 20
+    assert stats["b"]["calls"] == 1
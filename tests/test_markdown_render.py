@@ -0,0 +1,14 @@
+from markdown_render import render_markdown
+
+def test_report_markdown_is_rendered():
+    html = render_markdown("**Introduction:**\nWell done.\n\n## Action Plan\n- **Continue**: listening\n  - in meetings\n- Start\n1. one\n2. two")
+    assert html == ("<p><strong>Introduction:</strong>\nWell done.</p><h2>Action Plan</h2>"
+                    "<ul><li><strong>Continue</strong>: listening<ul><li>in meetings</li></ul></li><li>Start</li></ul>"
+                    "<ol><li>one</li><li>two</li></ol>")
+
+def test_html_and_unsafe_links_are_not_passed_through():
+    html = render_markdown('<script>alert(1)</script> [x](javascript:alert(1)) [ok](https://feedback-to.me/?a="b") `<i>`')
+    assert "<script>" not in html and "&lt;script&gt;" in html
+    assert '<a href="https://feedback-to.me/?a=&quot;b&quot;">ok</a>' in html
+    assert "<code>&lt;i&gt;</code>" in html
+    assert 'href="javascript' not in html
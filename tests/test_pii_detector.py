@@ -0,0 +1,31 @@
+import pytest
+
+import llm_functions
+from llm_functions import ThemesResponse
+from pii_detector import might_identify
+
+@pytest.mark.parametrize("theme", [
+    "You helped John from Marketing with the Q4 campaign",
+    "You mentored sarah through onboarding",
+    "You missed the deadline on 12/03",
+    "You were late to every Monday standup",
+    "Your talk at the AWS summit was inspiring",
+    "You covered for him while he was ill",
+])
+def test_identifying_themes_are_flagged(theme):
+    assert might_identify(theme)
+
+@pytest.mark.parametrize("theme", [
+    "You are a good listener",
+    "You support your co-workers when they are struggling",
+    "Your Excel models are thorough",
+    "You could delegate more. You take on too much",
+])
+def test_generic_themes_are_cleared(theme):
+    assert not might_identify(theme)
+
+def test_prescreen_splits_themes():
+    themes = ThemesResponse(positive=["You are a good listener", "You helped Priya a lot"], negative=[], neutral=[])
+    flagged, cleared = llm_functions._prescreen_themes(themes)
+    assert flagged.positive == ["You helped Priya a lot"]
+    assert cleared.positive == ["You are a good listener"]
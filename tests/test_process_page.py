@@ -0,0 +1,43 @@
+import json
+from datetime import datetime, timedelta
+
+import bcrypt
+import pytest
+from starlette.testclient import TestClient
+
+from main import app
+import email_outbox
+from models import feedback_process_tb, feedback_request_tb, users
+
+pytestmark = pytest.mark.usefixtures("empty_db")
+
+@pytest.fixture
+def client():
+    users.insert({"id": "owner", "first_name": "Sam", "email": "owner@example.com", "role": None, "company": None,
+                  "team": None, "created_at": datetime.now(), "is_confirmed": True,
+                  "pwd": bcrypt.hashpw(b"correct horse", bcrypt.gensalt()).decode()})
+    client = TestClient(app)
+    client.post("/login", data={"email": "owner@example.com", "pwd": "correct horse"}, follow_redirects=False)
+    return client
+
+def test_process_page_renders_with_an_unsent_request(client):
+    feedback_process_tb.insert({"id": "p1", "process_title": "Review", "user_id": "owner", "created_at": datetime.now(),
+                                "min_submissions_required": 3, "qualities": json.dumps(["Communication"]), "feedback_count": 0})
+    feedback_request_tb.insert({"token": "req-1", "email": "peer@example.com", "user_type": "peer", "process_id": "p1",
+                                "expiry": datetime.now() + timedelta(days=1)})
+    response = client.get("/feedback-process/p1")
+    assert response.status_code == 200
+    assert "peer@example.com" in response.text
+
+def test_dead_lettered_invite_is_shown_with_its_error(client, monkeypatch):
+    monkeypatch.setattr(email_outbox, "EMAIL_MAX_ATTEMPTS", 1)
+    feedback_process_tb.insert({"id": "p2", "process_title": "Review", "user_id": "owner", "created_at": datetime.now(),
+                                "min_submissions_required": 3, "qualities": json.dumps(["Communication"]), "feedback_count": 0})
+    feedback_request_tb.insert({"token": "req-2", "email": "gone@example.com", "user_type": "peer", "process_id": "p2",
+                                "expiry": datetime.now() + timedelta(days=1)})
+    email_outbox.queue_invites("p2", "form/token=", "Sam")
+    assert "every 5s" in client.get("/feedback-process/p2/email-status/req-2").text
+    email_outbox.mark_failed(email_outbox.claim_emails()[0], "mailbox unavailable")
+    response = client.get("/feedback-process/p2")
+    assert "Email could not be delivered: mailbox unavailable" in response.text
+    assert "Send email" in client.get("/feedback-process/p2/email-status/req-2").text
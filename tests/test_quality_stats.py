@@ -0,0 +1,64 @@
+import json
+import statistics
+from datetime import datetime, timedelta
+
+import pytest
+
+from models import feedback_submission_tb, feedback_request_tb
+import quality_stats
+
+pytestmark = pytest.mark.usefixtures("empty_db")
+
+PROCESS_ID = "quality-stats-test"
+
+def _submit(i, role, ratings):
+    token = f"{PROCESS_ID}-{i}"
+    feedback_request_tb.insert({"token": token, "email": f"{i}@example.com", "user_type": role, "process_id": PROCESS_ID,
+                                "expiry": datetime.now() + timedelta(days=1), "completed_at": datetime.now()})
+    feedback_submission_tb.insert({"id": token, "request_id": token, "feedback_text": "", "ratings": json.dumps(ratings),
+                                   "process_id": PROCESS_ID, "created_at": datetime.now()})
+    quality_stats.add_ratings(PROCESS_ID, role, ratings)
+    return token
+
+def _expected(values):
+    return {"average": round(statistics.fmean(values), 2), "variance": round(statistics.pvariance(values), 2),
+            "count": len(values), "min": min(values), "max": max(values)}
+
+def _check(stats, values):
+    assert {k: stats[k] for k in ("average", "variance", "count", "min", "max")} == _expected(values)
+
+def test_incremental_stats_match_recomputation():
+    peer, supervisor = [3, 7, 5, 8, 2], [6, 4]
+    for i, value in enumerate(peer):
+        _submit(i, "peer", {"Communication": value})
+    for i, value in enumerate(supervisor, start=10):
+        _submit(i, "supervisor", {"Communication": value})
+    by_role, overall = quality_stats.process_quality_stats(PROCESS_ID, ["Communication", "Leadership"])
+    _check(by_role["peer"]["Communication"], peer)
+    _check(by_role["supervisor"]["Communication"], supervisor)
+    _check(overall["Communication"], peer + supervisor)
+    assert "Leadership" not in overall and by_role["report"] == {}
+
+def test_removing_a_submission_reverses_it():
+    tokens = [_submit(i, "peer", {"Communication": value}) for i, value in enumerate([1, 4, 6, 8])]
+    removed = feedback_submission_tb[tokens[0]]
+    feedback_submission_tb.delete(removed.id)
+    quality_stats.remove_ratings(PROCESS_ID, "peer", removed.ratings)
+    by_role, _ = quality_stats.process_quality_stats(PROCESS_ID, ["Communication"])
+    _check(by_role["peer"]["Communication"], [4, 6, 8])
+
+def test_missing_aggregates_are_rebuilt_from_submissions():
+    for i, value in enumerate([2, 5, 5]):
+        _submit(i, "report", {"Communication": value})
+    quality_stats.delete_process_stats(PROCESS_ID)
+    by_role, _ = quality_stats.process_quality_stats(PROCESS_ID, ["Communication"])
+    _check(by_role["report"]["Communication"], [2, 5, 5])
+
+def test_process_without_ratings_is_rebuilt_only_once(monkeypatch):
+    _submit(0, "peer", {})
+    rebuilds = []
+    rebuild = quality_stats.rebuild_process_stats
+    monkeypatch.setattr(quality_stats, "rebuild_process_stats", lambda process_id: rebuilds.append(process_id) or rebuild(process_id))
+    for _ in range(3):
+        assert quality_stats.process_quality_stats(PROCESS_ID, ["Communication"]) == ({role: {} for role in quality_stats.ROLES}, {})
+    assert rebuilds == [PROCESS_ID]
@@ -0,0 +1,111 @@
+import asyncio
+import threading
+from datetime import datetime
+
+import pytest
+
+from models import db, feedback_process_tb
+import report_jobs
+
+PROCESS_ID = "report-jobs-test"
+
+@pytest.fixture(autouse=True)
+def process():
+    db.execute("DELETE FROM feedback_process WHERE id=?", [PROCESS_ID])
+    feedback_process_tb.insert({"id": PROCESS_ID, "process_title": "Test", "user_id": "u1", "created_at": datetime.now(),
+                                "min_submissions_required": 1, "qualities": "[]", "feedback_count": 0})
+    yield
+    report_jobs._jobs.pop(PROCESS_ID, None)
+    db.execute("DELETE FROM feedback_process WHERE id=?", [PROCESS_ID])
+
+def test_concurrent_requests_share_one_generation(monkeypatch):
+    release, calls = threading.Event(), []
+
+    async def fake_stream(feedback_input, process_id=None, queue_status=False):
+        calls.append(process_id)
+        yield "# Report\n"
+        await asyncio.to_thread(release.wait, 5)
+        yield "Done."
+
+    monkeypatch.setattr(report_jobs, "astream_completed_feedback_report", fake_stream)
+    first = report_jobs.start_report_job(PROCESS_ID, lambda process_id: "input")
+    second = report_jobs.start_report_job(PROCESS_ID, lambda process_id: "input")
+    assert first is second
+    release.set()
+    assert first.wait(5) and first.status == report_jobs.DONE
+    assert calls == [PROCESS_ID]
+    assert feedback_process_tb[PROCESS_ID].feedback_report == "# Report\nDone."
+    assert [update["status"] for update in first.follow()][-1] == report_jobs.DONE
+
+def test_stored_report_is_returned_without_generating(monkeypatch):
+    feedback_process_tb.update({"feedback_report": "Stored"}, PROCESS_ID)
+    monkeypatch.setattr(report_jobs, "astream_completed_feedback_report", pytest.fail)
+    job = report_jobs.start_report_job(PROCESS_ID, lambda process_id: "input")
+    assert job.snapshot()["status"] == report_jobs.DONE and job.snapshot()["text"] == "Stored"
+
+def test_failed_job_is_reported_and_can_be_retried(monkeypatch):
+    async def failing_stream(feedback_input, process_id=None, queue_status=False):
+        raise RuntimeError("all models failed")
+        yield
+
+    monkeypatch.setattr(report_jobs, "astream_completed_feedback_report", failing_stream)
+    job = report_jobs.start_report_job(PROCESS_ID, lambda process_id: "input")
+    assert job.wait(5) and report_jobs.get_report_job(PROCESS_ID).status == report_jobs.FAILED
+    assert report_jobs.start_report_job(PROCESS_ID, lambda process_id: "input") is not job
+
+def test_async_followers_see_every_stage(monkeypatch):
+    release = threading.Event()
+
+    async def fake_stream(feedback_input, process_id=None, queue_status=False):
+        yield report_jobs.QueueStatus(position=2, waited_seconds=0.0)
+        await asyncio.to_thread(release.wait, 5)
+        yield "Report"
+
+    async def follow(job):
+        statuses = []
+        async for update in job.afollow():
+            statuses.append(update["status"])
+            release.set()
+        return statuses
+
+    monkeypatch.setattr(report_jobs, "astream_completed_feedback_report", fake_stream)
+    job = report_jobs.start_report_job(PROCESS_ID, lambda process_id: "input")
+    statuses = asyncio.run(asyncio.wait_for(follow(job), 5))
+    assert statuses[-1] == report_jobs.DONE and job.result == "Report"
+    assert job._listeners == []
+
+def test_report_is_only_regenerated_when_its_input_changes(monkeypatch):
+    calls = []
+
+    async def fake_stream(feedback_input, process_id=None, queue_status=False):
+        calls.append(feedback_input)
+        yield f"Report for {feedback_input}"
+
+    monkeypatch.setattr(report_jobs, "astream_completed_feedback_report", fake_stream)
+    first = report_jobs.report_fingerprint("input v1")
+    job = report_jobs.start_report_job(PROCESS_ID, lambda process_id: "input v1", first)
+    assert job.wait(5) and feedback_process_tb[PROCESS_ID].report_input_fingerprint == first
+
+    same = report_jobs.start_report_job(PROCESS_ID, lambda process_id: "input v1", first)
+    assert same.status == report_jobs.DONE and calls == ["input v1"]
+
+    changed = report_jobs.start_report_job(PROCESS_ID, lambda process_id: "input v2", report_jobs.report_fingerprint("input v2"))
+    assert changed.wait(5) and calls == ["input v1", "input v2"]
+    assert feedback_process_tb[PROCESS_ID].feedback_report == "Report for input v2"
+
+def test_existing_report_is_not_overwritten():
+    feedback_process_tb.update({"feedback_report": "First"}, PROCESS_ID)
+    assert report_jobs._store_report(PROCESS_ID, "prompt", "Second") == "First"
+
+def test_current_fingerprint_is_cached_until_the_input_version_changes():
+    builds = []
+    def build(process_id):
+        builds.append(process_id)
+        return f"input {len(builds)}"
+
+    first = report_jobs.current_report_fingerprint(PROCESS_ID, build)
+    assert report_jobs.current_report_fingerprint(PROCESS_ID, build) == first and len(builds) == 1
+    report_jobs.bump_report_input_version(PROCESS_ID)
+    assert report_jobs.current_report_fingerprint(PROCESS_ID, build) != first and len(builds) == 2
+    report_jobs.current_report_fingerprint(PROCESS_ID, build, settings="other")
+    assert len(builds) == 3
@@ -0,0 +1,28 @@
+import asyncio
+
+import llm_functions
+
+def test_sections_are_summarized_in_parallel_and_in_order(monkeypatch):
+    barrier = asyncio.Barrier(3)
+
+    async def fake_route(task, fn, **kwargs):
+        assert task == "summary"
+        await asyncio.wait_for(barrier.wait(), 5)  # only passes if all three sections are in flight at once
+        return await fn(None)
+
+    async def fake_invoke(task, llm, messages, parse, *args):
+        return f"summary of {messages[-1][1].split()[-1]}"
+
+    monkeypatch.setattr(llm_functions, "_aroute", fake_route)
+    monkeypatch.setattr(llm_functions, "_ainvoke_llm_cached", fake_invoke)
+    sections = {"Peer": "data peers", "Supervisor": "data supervisors", "Report": "data reports"}
+    summaries = llm_functions.summarize_report_sections(sections, use_cache=False)
+    assert list(summaries) == ["Peer", "Supervisor", "Report"]
+    assert summaries["Peer"] == "summary of peers"
+
+def test_failed_section_is_kept_unsummarized(monkeypatch):
+    async def failing_route(task, fn, **kwargs):
+        raise RuntimeError("all models failed")
+
+    monkeypatch.setattr(llm_functions, "_aroute", failing_route)
+    assert llm_functions.summarize_report_sections({"Peer": "raw data"}) == {"Peer": "raw data"}
@@ -0,0 +1,46 @@
+from fasthtml.common import to_xml
+
+from report_preview import preview_from_stats, report_preview_section
+
+def _stats(average, std_dev=1.0, low=1, high=8, count=4):
+    return {"average": average, "std_dev": std_dev, "min": low, "max": high, "count": count, "variance": std_dev ** 2}
+
+def test_highlights_best_worst_gap_and_spread():
+    by_role = {
+        "peer": {"Communication": _stats(7.0), "Delegation": _stats(3.0)},
+        "supervisor": {"Communication": _stats(6.5), "Delegation": _stats(5.0)},
+        "report": {},
+    }
+    overall = {"Communication": _stats(6.8, std_dev=0.5, low=6, high=8),
+               "Delegation": _stats(3.8, std_dev=2.1, low=1, high=7)}
+    preview = preview_from_stats(by_role, overall, {"peer": 4, "supervisor": 4}, [])
+    assert preview["respondents"] == 8
+    assert preview["rows"][1]["gap"] == 2.0
+    assert preview["highlights"] == [
+        "Highest rated: Communication (average 6.8)",
+        "Lowest rated: Delegation (average 3.8)",
+        "Biggest difference between groups: Delegation (supervisors 5.0 vs peers 3.0)",
+        "Least agreement: Delegation (ratings from 1 to 7)",
+    ]
+
+def test_theme_counts_are_per_respondent():
+    themes = [("Clear communicator", "positive", "s1"), ("Clear communicator", "positive", "s2"),
+              ("Misses deadlines", "negative", "s1")]
+    preview = preview_from_stats({}, {}, {"peer": 2}, themes)
+    assert preview["themes"]["positive"][0]["support"] == 2
+    assert preview["rows"] == [] and preview["highlights"] == []
+
+def test_roles_with_too_few_respondents_are_not_shown():
+    by_role = {"peer": {"Communication": _stats(4.0)}, "supervisor": {"Communication": _stats(8.0, std_dev=0, low=8, high=8, count=1)}}
+    overall = {"Communication": _stats(4.8, std_dev=1.6, low=3, high=8, count=5)}
+    preview = preview_from_stats(by_role, overall, {"peer": 4, "supervisor": 1}, [], min_respondents=3)
+    assert preview["rows"][0]["by_role"] == {"peer": 4.0} and preview["rows"][0]["gap"] == 0.0
+    assert not any("supervisor" in highlight for highlight in preview["highlights"])
+    assert "Supervisors" not in to_xml(report_preview_section(preview))
+
+def test_ranges_are_hidden_until_enough_responses():
+    overall = {"Communication": _stats(5.0, low=2, high=8, count=2)}
+    preview = preview_from_stats({"peer": {"Communication": _stats(5.0, count=2)}}, overall, {"peer": 2}, [], min_respondents=3)
+    assert not preview["ranges_shown"] and preview["rows"][0]["by_role"] == {}
+    assert not any("Least agreement" in highlight for highlight in preview["highlights"])
+    assert "2–8" not in to_xml(report_preview_section(preview))
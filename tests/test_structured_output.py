@@ -0,0 +1,32 @@
+import pytest
+from langchain_core.exceptions import OutputParserException
+
+from llm_functions import _structured_output, _strict_schema, AnonymizedThemesResponse, ThemesResponse
+
+def test_clean_and_fenced_json_parse():
+    structured = _structured_output(ThemesResponse)
+    assert structured.parse('{"positive": ["a"], "negative": [], "neutral": []}').positive == ["a"]
+    assert structured.parse('```json\n{"positive": [], "negative": ["b"], "neutral": []}\n```').negative == ["b"]
+
+def test_sloppy_json_is_repaired():
+    content = '''Here are the themes:
+```json
+{"themes": [{"original": "You lead well", "anonymized": "You lead well",
+             "needs_anonymization": false, "sentiment": "Positive ",},],}
+```'''
+    result = _structured_output(AnonymizedThemesResponse).parse(content)
+    assert result.themes[0].sentiment == "positive"
+
+def test_unrepairable_output_raises_parser_error():
+    with pytest.raises(OutputParserException):
+        _structured_output(ThemesResponse).parse('{"positive": ["a"')
+
+def test_structured_output_is_built_once():
+    assert _structured_output(ThemesResponse) is _structured_output(ThemesResponse)
+
+def test_strict_schema_inlines_refs():
+    schema = _strict_schema(AnonymizedThemesResponse.model_json_schema())
+    theme = schema["properties"]["themes"]["items"]
+    assert "$defs" not in schema and "$ref" not in theme
+    assert theme["additionalProperties"] is False
+    assert set(theme["required"]) == {"original", "anonymized", "needs_anonymization", "sentiment"}
@@ -0,0 +1,35 @@
+import llm_functions
+from llm_functions import merge_chunk_themes, split_feedback_text
+
+def test_split_keeps_paragraphs_whole_and_chunks_bounded():
+    paragraphs = [f"Paragraph {i}. " + "You explain decisions well. " * 20 for i in range(10)]
+    chunks = split_feedback_text("\n\n".join(paragraphs), 1500)
+    assert len(chunks) > 1 and all(len(chunk) <= 1500 for chunk in chunks)
+    assert [p.strip() for chunk in chunks for p in chunk.split("\n\n")] == [p.strip() for p in paragraphs]
+
+def test_split_breaks_oversized_paragraphs_between_sentences_then_words():
+    chunks = split_feedback_text("Short sentence. " * 50 + "x" * 10 + " word" * 200, 300)
+    assert all(len(chunk) <= 300 for chunk in chunks)
+    assert " ".join(chunks).split() == ("Short sentence. " * 50 + "x" * 10 + " word" * 200).split()
+
+def test_merge_drops_repeats_across_chunks():
+    merged = merge_chunk_themes([
+        {"positive": ["You communicate clearly", "You mentor new starters"], "negative": [], "neutral": None},
+        {"positive": ["you communicate clearly."], "negative": ["You miss deadlines"]},
+    ])
+    assert merged == {"positive": ["You communicate clearly", "You mentor new starters"],
+                      "negative": ["You miss deadlines"], "neutral": []}
+
+def test_long_feedback_is_extracted_per_chunk(monkeypatch):
+    seen = []
+
+    async def fake_chunk(chunk, mode, process_id, use_cache):
+        seen.append(chunk)
+        return {"positive": [f"You are a strong writer of section {len(seen)}"], "negative": [], "neutral": []}
+
+    monkeypatch.setattr(llm_functions, "_aextract_chunk_themes", fake_chunk)
+    monkeypatch.setattr(llm_functions, "THEME_CHUNK_MIN_CHARS", 1000)
+    monkeypatch.setattr(llm_functions, "THEME_CHUNK_CHARS", 600)
+    text = "\n\n".join("You are a good listener. " * 20 for _ in range(4))
+    result = llm_functions.convert_feedback_text_to_themes(text, mode="single", use_cache=False)
+    assert len(seen) == 4 and len(result["positive"]) >= 1
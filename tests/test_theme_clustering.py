@@ -0,0 +1,23 @@
+from theme_clustering import summarize_themes, format_theme_summary, cluster_themes
+
+def test_near_duplicates_are_merged_with_support_counts():
+    summaries = summarize_themes([
+        ("You communicate clearly", "r1"),
+        ("You communicate very clearly in meetings", "r2"),
+        ("You communicate clearly", "r2"),
+        ("Your code reviews are thorough", "r3"),
+    ])
+    assert summaries[0]["theme"] == "You communicate clearly"
+    assert summaries[0]["support"] == 2  # r2 raised it twice but counts once
+    assert len(summaries[0]["variants"]) == 3
+    assert [s["theme"] for s in summaries[1:]] == ["Your code reviews are thorough"]
+
+def test_unrelated_themes_stay_separate():
+    assert len(cluster_themes(["You miss deadlines", "You support junior colleagues", "Your presentations are engaging"])) == 3
+
+def test_format_includes_respondent_totals():
+    summaries = [{"theme": "You communicate clearly", "support": 7, "variants": []}]
+    assert format_theme_summary(summaries, 12) == "- You communicate clearly (mentioned by 7 of 12 respondents)"
+
+def test_empty_input():
+    assert summarize_themes([]) == []
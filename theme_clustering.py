@@ -0,0 +1,142 @@
+"""
+Merges near-duplicate feedback themes before they go into the report prompt.
+
+With many respondents the extracted themes repeat the same point in slightly
+different words ("You communicate clearly", "You communicate very clearly in
+meetings"). Themes are embedded as TF-IDF vectors over word tokens and
+character trigram shingles, compared by cosine similarity, and grouped
+greedily around the most-connected theme. Each cluster is reported once with
+the number of distinct respondents who raised it.
+"""
+
+import re
+from collections import defaultdict
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from config import THEME_CLUSTER_THRESHOLD
+
+_TOKEN_RE = re.compile(r"[a-z0-9']+")
+_STOPWORDS = frozenset({
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "is", "it", "of", "on",
+    "or", "that", "the", "their", "them", "they", "this", "to", "very", "was", "were", "with",
+    "you", "your", "you're", "really", "always", "often",
+})
+# Rows of the similarity matrix computed at a time. Only each row's neighbour indices are
+# kept, so peak memory is one block of similarities plus the similar pairs, never n x n.
+_BLOCK_ROWS = 1024
+
+
+def _features(text: str) -> Tuple[List[str], List[str]]:
+    """Returns the content words and character trigram shingles of a theme."""
+    words = [w for w in _TOKEN_RE.findall(text.lower()) if w not in _STOPWORDS]
+    joined = f" {' '.join(words)} "
+    shingles = [joined[i:i + 3] for i in range(len(joined) - 2)]
+    return words, shingles
+
+
+def _tfidf(documents: List[List[str]]) -> np.ndarray:
+    """Builds an L2-normalised TF-IDF matrix (documents x vocabulary) for tokenised documents."""
+    vocabulary: Dict[str, int] = {}
+    rows, cols = [], []
+    for row, tokens in enumerate(documents):
+        for token in tokens:
+            rows.append(row)
+            cols.append(vocabulary.setdefault(token, len(vocabulary)))
+
+    matrix = np.zeros((len(documents), max(len(vocabulary), 1)), dtype=np.float32)
+    np.add.at(matrix, (np.array(rows, dtype=np.intp), np.array(cols, dtype=np.intp)), 1.0)
+    document_frequency = np.count_nonzero(matrix, axis=0)
+    matrix *= np.log((1 + len(documents)) / (1 + document_frequency)).astype(np.float32) + 1
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix
+
+
+def theme_vectors(themes: Sequence[str]) -> np.ndarray:
+    """
+    Embeds themes so that the dot product of two rows is their similarity:
+    the mean of their word and shingle cosine similarities.
+    """
+    features = [_features(theme) for theme in themes]
+    words = _tfidf([f[0] for f in features])
+    shingles = _tfidf([f[1] for f in features])
+    return np.hstack([words, shingles]) * np.float32(np.sqrt(0.5))
+
+
+def cluster_themes(themes: Sequence[str], threshold: float = THEME_CLUSTER_THRESHOLD) -> List[np.ndarray]:
+    """
+    Groups near-duplicate themes.
+
+    Each cluster is led by the unassigned theme with the most neighbours at or above
+    the similarity threshold, and takes all of that theme's unassigned neighbours.
+
+    Args:
+        themes: Theme texts to cluster.
+        threshold: Minimum similarity (0-1) for two themes to be merged.
+
+    Returns:
+        Arrays of theme indices, one per cluster, each starting with its representative theme.
+    """
+    n = len(themes)
+    if n == 0:
+        return []
+    vectors = theme_vectors(themes)
+    neighbours: List[np.ndarray] = []
+    for start in range(0, n, _BLOCK_ROWS):
+        block = vectors[start:start + _BLOCK_ROWS] @ vectors.T >= threshold
+        block[np.arange(len(block)), np.arange(start, start + len(block))] = True
+        neighbours.extend(np.flatnonzero(row) for row in block)
+
+    degree = np.array([len(row) for row in neighbours])
+    unassigned = np.ones(n, dtype=bool)
+    clusters = []
+    for leader in np.argsort(-degree, kind="stable"):
+        if not unassigned[leader]:
+            continue
+        members = neighbours[leader][unassigned[neighbours[leader]]]
+        unassigned[members] = False
+        clusters.append(np.concatenate(([leader], members[members != leader])))
+    return clusters
+
+
+def summarize_themes(themes: Sequence[Tuple[str, str]], threshold: float = THEME_CLUSTER_THRESHOLD) -> List[Dict]:
+    """
+    Clusters themes and counts how many distinct respondents raised each one.
+
+    Args:
+        themes: (theme text, respondent id) pairs, e.g. theme and feedback submission id.
+        threshold: Minimum similarity (0-1) for two themes to be merged.
+
+    Returns:
+        Dictionaries with the representative "theme", its "support" (distinct respondents)
+        and the merged "variants", ordered by support, most supported first.
+    """
+    texts = [text for text, _ in themes]
+    summaries = []
+    for members in cluster_themes(texts, threshold):
+        respondents = {themes[i][1] for i in members}
+        summaries.append({
+            "theme": texts[members[0]],
+            "support": len(respondents),
+            "variants": [texts[i] for i in members],
+        })
+    summaries.sort(key=lambda s: -s["support"])
+    return summaries
+
+
+def format_theme_summary(summaries: List[Dict], total_respondents: int) -> str:
+    """Formats clustered themes as prompt lines with their support counts."""
+    return "\n".join(
+        f"- {s['theme']} (mentioned by {s['support']} of {total_respondents} respondents)"
+        for s in summaries
+    )
+
+
+def group_by_sentiment(rows: Sequence[Tuple[str, str, str]]) -> Dict[str, List[Tuple[str, str]]]:
+    """Splits (theme, sentiment, respondent id) rows into per-sentiment (theme, respondent id) lists."""
+    grouped = defaultdict(list)
+    for theme, sentiment, respondent in rows:
+        grouped[sentiment].append((theme, respondent))
+    return grouped
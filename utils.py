@@ -20,6 +20,14 @@ logging.basicConfig(
     format='%(asctime)s - %(levelname)s - %(message)s'
 )
 logger = logging.getLogger(__name__)
+
+def generate_external_link(url):
+    """Find the base domain env var, if it exists, and return the link with the base domain as as a string"""
+    base_domain = os.environ.get("BASE_URL")
+    if base_domain:
+        return f"https://{base_domain}/{url}"
+    return url
+
 # ------------------------------
 # FastHTML Beforeware for Auth
 # ------------------------------
@@ -119,4 +127,5 @@ beforeware = Beforeware(auth_before, skip=[r'/',
                                             r'/send-reset-email',
                                             r'/reset-password/.*',
                                             r'/auth/.*',  # OAuth routes
+                                            r'/health',
                                                   r'/static/.*'])
@@ -0,0 +1,164 @@
+#!/usr/bin/env python
+"""
+Background worker for the job queue defined in jobs.py.
+
+Runs the slow parts of feedback submission (LLM theme extraction) outside
+the web request, and delivers the email outbox (see email_outbox.py). Start
+it alongside the web app with:
+
+    python -m worker
+
+SIGINT/SIGTERM stop the worker from claiming new jobs; the job in progress is
+finished before the process exits.
+"""
+
+import asyncio
+import secrets
+import signal
+import threading
+import time
+import traceback
+from datetime import datetime
+from html import unescape
+
+from models import db, users, feedback_process_tb, feedback_submission_tb, feedback_themes_tb
+from llm_functions import convert_feedback_text_to_themes, warm_llm_clients, close_llm_clients, hedge_stats, structured_output_stats, pii_prescreen_stats
+import llm_telemetry
+import llm_limiter
+from jobs import claim_job, complete_job, fail_job, prune_jobs
+from email_outbox import adeliver_due, prune_outbox, queue_report_ready_email
+from report_jobs import bump_report_input_version
+from config import JOB_MAX_ATTEMPTS, JOB_POLL_INTERVAL_SECONDS, EMAIL_OUTBOX_POLL_INTERVAL_SECONDS
+from utils import logger
+
+HANDLERS = {}
+
+def handler(kind: str):
+    """Registers a function as the handler for a job kind."""
+    def register(fn):
+        HANDLERS[kind] = fn
+        return fn
+    return register
+
+@handler("extract_themes")
+def extract_themes(payload: dict):
+    """Extracts themes from a stored submission and writes them to feedback_themes_tb."""
+    submission = feedback_submission_tb[payload["submission_id"]]
+    # Submissions are stored HTML-escaped; the model should see the original text
+    feedback_themes = convert_feedback_text_to_themes(unescape(submission.feedback_text), process_id=submission.process_id)
+    if feedback_themes is None:
+        raise RuntimeError(f"Theme extraction failed for submission {submission.id}")
+    store_submission_themes(submission.id, feedback_themes)
+
+def store_submission_themes(submission_id: str, feedback_themes: dict):
+    """
+    Replaces a submission's rows in feedback_themes_tb with the given themes, in one
+    transaction, and marks its extraction as done (so an empty result isn't retried).
+    """
+    with db.conn:
+        # Clear rows from any earlier partial attempt so retries stay idempotent
+        db.execute("DELETE FROM feedback_theme WHERE feedback_id=?", [submission_id])
+        for sentiment in ["positive", "negative", "neutral"]:
+            for theme in feedback_themes.get(sentiment, []):
+                feedback_themes_tb.insert({
+                    "id": secrets.token_hex(8),
+                    "feedback_id": submission_id,
+                    "theme": theme,
+                    "sentiment": sentiment,
+                    "created_at": datetime.now()
+                })
+        feedback_submission_tb.update({"themes_extracted_at": datetime.now().isoformat()}, submission_id)
+        bump_report_input_version(feedback_submission_tb[submission_id].process_id)
+    logger.info(f"Stored themes for submission {submission_id}")
+
+@handler("report_ready_email")
+def report_ready_email(payload: dict):
+    """
+    Queues the report-ready notification for a process owner. New submissions queue
+    it directly in the email outbox; this handles jobs enqueued before that.
+    """
+    process = feedback_process_tb[payload["process_id"]]
+    if process.feedback_report:
+        logger.debug(f"Report already generated for process {process.id}, skipping notification")
+        return
+    process_owner = users("id=?", (process.user_id,))[0]
+    with db.conn:
+        queue_report_ready_email(process_owner.email, process_owner.first_name)
+    logger.info(f"Queued report ready notification for {process_owner.email}")
+
+def process_job(job: dict):
+    """Runs a claimed job and records the outcome in the queue."""
+    if job["attempts"] > JOB_MAX_ATTEMPTS:
+        # Reclaimed after its visibility timeout too many times (e.g. it keeps crashing the worker)
+        fail_job(job, "Exceeded maximum attempts")
+        return
+
+    logger.debug(f"Processing {job['kind']} job {job['id']} (attempt {job['attempts']})")
+    try:
+        HANDLERS[job["kind"]](job["payload"])
+    except Exception as e:
+        logger.debug(traceback.format_exc())
+        fail_job(job, str(e))
+    else:
+        complete_job(job["id"])
+
+def run_outbox_delivery(stop: threading.Event, poll_interval: float = EMAIL_OUTBOX_POLL_INTERVAL_SECONDS):
+    """
+    Delivers the email outbox until stop is set, pruning old emails hourly. Runs on
+    its own thread with its own event loop, so emails aren't held up behind slow LLM jobs.
+    """
+    loop = asyncio.new_event_loop()
+    last_prune = 0.0
+    try:
+        while not stop.is_set():
+            if time.monotonic() - last_prune > 3600:
+                last_prune = time.monotonic()
+                try:
+                    prune_outbox()
+                except Exception as e:
+                    logger.error(f"Email outbox pruning failed: {str(e)}")
+            try:
+                claimed = loop.run_until_complete(adeliver_due())
+            except Exception as e:
+                logger.error(f"Email outbox delivery failed: {str(e)}")
+                claimed = 0
+            if not claimed:
+                stop.wait(poll_interval)
+    finally:
+        loop.close()
+
+def run_worker(poll_interval: float = JOB_POLL_INTERVAL_SECONDS):
+    """Claims and processes jobs, and delivers queued emails, until SIGINT/SIGTERM is received."""
+    stop = threading.Event()
+
+    def request_stop(signum, frame):
+        logger.info(f"Received signal {signum}, draining worker")
+        stop.set()
+
+    signal.signal(signal.SIGINT, request_stop)
+    signal.signal(signal.SIGTERM, request_stop)
+
+    warm_llm_clients()
+    outbox_thread = threading.Thread(target=run_outbox_delivery, args=(stop,), name="email-outbox", daemon=True)
+    outbox_thread.start()
+    logger.info(f"Worker started, handling: {', '.join(HANDLERS)} and the email outbox")
+    last_prune = 0.0
+    while not stop.is_set():
+        if time.monotonic() - last_prune > 3600:
+            last_prune = time.monotonic()
+            try:
+                prune_jobs()
+            except Exception as e:
+                logger.error(f"Job pruning failed: {str(e)}")
+        job = claim_job(list(HANDLERS))
+        if job is None:
+            stop.wait(poll_interval)
+            continue
+        process_job(job)
+    outbox_thread.join()
+    close_llm_clients()
+    llm_telemetry.flush()
+    logger.info(f"Worker stopped (hedging: {hedge_stats()}, structured output: {structured_output_stats()}, PII screen: {pii_prescreen_stats()}, limiter: {llm_limiter.stats()})")
+
+if __name__ == "__main__":
+    run_worker()